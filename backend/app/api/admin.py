@@ -0,0 +1,206 @@
+import os
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response, PlainTextResponse
+from app.schemas.admin import ProfileCaptureRequest, PhaseTimingRequest, ShardRingUpdate, RoomHandoff
+from app.models.game import Game
+from app.services.bot_service import bot_service
+from app.services.career import get_career_store
+from app.services.game_service import game_service
+from app.services.journal import JournalError, get_journal
+from app.services.profiling import profiler, pstats_text
+from app.services.room_concurrency import room_locks, idempotency_cache
+from app.services.sharding import shard
+from app.services.tracing_service import tracer
+from app.websocket.game_handler import manager
+
+# WebSocket close code for sockets in a room that moved; clients reconnect
+ROOM_MOVED_CLOSE_CODE = 1012  # "Service restart"
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Allows the request only with a matching X-Admin-Token header.
+    
+    Admin endpoints are disabled entirely when ADMIN_TOKEN is not set.
+    """
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.post("/profiling/captures")
+async def arm_capture(request: ProfileCaptureRequest):
+    """Profiles the next `count` requests for a route template or room."""
+    capture = profiler.arm(
+        request.target_type,
+        request.target,
+        request.count,
+        mode=request.mode,
+        interval=request.interval_ms / 1000,
+    )
+    return {"capture_id": capture.id, "remaining": capture.remaining}
+
+
+@router.get("/profiling/captures")
+async def list_captures():
+    """Lists armed captures and completed results."""
+    return {
+        "armed": [
+            {
+                "id": c.id,
+                "target_type": c.target_type,
+                "target": c.target,
+                "mode": c.mode,
+                "remaining": c.remaining,
+            }
+            for c in profiler.list_captures()
+        ],
+        "results": [r.summary() for r in profiler.list_results()],
+    }
+
+
+@router.delete("/profiling/captures/{capture_id}")
+async def disarm_capture(capture_id: str):
+    """Cancels an armed capture."""
+    if not profiler.disarm(capture_id):
+        raise HTTPException(status_code=404, detail="Capture not found")
+    return {"message": "Capture disarmed"}
+
+
+@router.get("/profiling/results/{result_id}")
+async def download_result(result_id: str, format: Optional[str] = None):
+    """Downloads a profile: `prof` (pstats file) or `text` for cProfile captures,
+    `collapsed` (flamegraph.pl / speedscope input) for sampling captures."""
+    result = profiler.get_result(result_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Result not found")
+    fmt = format or ("prof" if result.mode == "cprofile" else "collapsed")
+    if fmt not in result.summary()["formats"]:
+        raise HTTPException(status_code=400, detail=f"Format {fmt} not available for {result.mode} captures")
+    if fmt == "text":
+        return PlainTextResponse(pstats_text(result))
+    filename = f"{result.id}.{'prof' if fmt == 'prof' else 'folded'}"
+    return Response(
+        content=result.data,
+        media_type="application/octet-stream" if fmt == "prof" else "text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/profiling/phases")
+async def set_phase_timing(request: PhaseTimingRequest):
+    """Turns select_power phase timing on or off."""
+    if request.reset:
+        profiler.reset_phases()
+    profiler.set_phase_timing(request.enabled)
+    return {"enabled": profiler.phase_timing}
+
+
+@router.get("/profiling/phases")
+async def get_phase_timing():
+    """Returns aggregated phase timings."""
+    return {"enabled": profiler.phase_timing, "phases": profiler.phase_summary()}
+
+
+@router.get("/tracing/rooms/{room_id}")
+async def export_room_trace(room_id: str):
+    """Buffered turn traces for a room in Chrome trace event format
+    (open in Perfetto or chrome://tracing)."""
+    if not tracer.get_turns(room_id):
+        raise HTTPException(status_code=404, detail="No traces for room")
+    return tracer.export_chrome_trace(room_id)
+
+
+@router.get("/tracing/summary")
+async def tracing_summary():
+    """Where completed turn time goes across all rooms."""
+    return tracer.summary()
+
+
+@router.get("/shard")
+async def shard_info():
+    """This worker's name, ring membership and room count."""
+    return {
+        "node": shard.node,
+        "nodes": shard.ring.nodes if shard.ring else [],
+        "rooms": len(game_service.games),
+    }
+
+
+@router.put("/shard/ring")
+async def update_shard_ring(request: ShardRingUpdate):
+    """Replaces the ring used to pick ids for rooms created here."""
+    try:
+        shard.set_nodes(request.nodes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"node": shard.node, "nodes": shard.ring.nodes}
+
+
+@router.get("/shard/rooms")
+async def list_shard_rooms():
+    """Ids of every room held by this worker."""
+    return {"room_ids": list(game_service.games)}
+
+
+@router.post("/shard/rooms/{room_id}/handoff")
+async def hand_off_room(room_id: str):
+    """Removes a room from this worker and returns it for its new owner.
+    
+    Waits for any in-flight action on the room, then closes the room's
+    sockets so clients reconnect (through the router) to the new owner.
+    """
+    async with room_locks.hold(room_id):
+        game = game_service.get_game(room_id)
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
+        seat = bot_service.seats.get(room_id)
+        handoff = {
+            "game": game.to_dict(),
+            "bot": {
+                "player_name": seat.player_name,
+                "policy": seat.policy.name,
+                "think_time": seat.think_time,
+            } if seat else None,
+            "idempotency": idempotency_cache.export(room_id),
+            "career": get_career_store().export_room(room_id),
+        }
+        game_service.hand_off_game(room_id)
+    await manager.close_room(room_id, ROOM_MOVED_CLOSE_CODE, "Room moved")
+    return handoff
+
+
+@router.post("/shard/rooms")
+async def take_over_room(handoff: RoomHandoff):
+    """Adds a room handed off by another worker."""
+    game = Game.from_dict(handoff.game)
+    game_service.restore_game(game)
+    journal = get_journal()
+    if journal is not None:
+        journal.checkpoint(game)
+    idempotency_cache.load(game.room_id, handoff.idempotency)
+    get_career_store().load_room(game.room_id, handoff.career)
+    if handoff.bot:
+        bot_service.add_seat(game.room_id, **handoff.bot)
+    return {"room_id": game.room_id, "version": game.version}
+
+
+@router.get("/journal/rooms/{room_id}")
+async def replay_room(room_id: str, version: Optional[int] = None, at: Optional[float] = None):
+    """Rebuilds a room from the journal as of `version` or Unix time `at` (latest by default)."""
+    journal = get_journal()
+    if journal is None:
+        raise HTTPException(status_code=404, detail="Journal is disabled")
+    try:
+        game = journal.replay(room_id, version=version, at=at)
+    except JournalError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if game is None:
+        raise HTTPException(status_code=404, detail="Game not found in journal")
+    return game.to_dict()
@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.services.analytics import DIMENSIONS, get_shot_store
+
+router = APIRouter()
+
+
+def _group_by(group_by: str) -> List[str]:
+    dimensions = [name.strip() for name in group_by.split(",") if name.strip()]
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dimension: {', '.join(unknown)}")
+    return dimensions
+
+
+def _filters(**values: Optional[str]) -> Dict[str, str]:
+    return {name: value for name, value in values.items() if value is not None}
+
+
+# The scans below are plain defs: Starlette runs them in its threadpool, so a
+# long query doesn't stall the event loop (sockets, heartbeats, game actions)
+
+@router.get("/shots")
+def shot_aggregates(
+    group_by: str = "zone,contest",
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    archetype: Optional[str] = None,
+    subtype: Optional[str] = None,
+    zone: Optional[str] = None,
+    contest: Optional[str] = None,
+    player: Optional[str] = None,
+):
+    """Attempts, makes, FG% and points per shot for every shot taken, grouped
+    by comma-separated dimensions (archetype, subtype, zone, contest, player)."""
+    rows = get_shot_store().query(
+        _group_by(group_by),
+        since=since,
+        until=until,
+        filters=_filters(archetype=archetype, subtype=subtype, zone=zone, contest=contest, player=player),
+    )
+    return {"rows": rows}
+
+
+@router.get("/trend")
+def shot_trend(
+    interval: float = Query(default=3600, gt=0),
+    group_by: str = "",
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    archetype: Optional[str] = None,
+    subtype: Optional[str] = None,
+    zone: Optional[str] = None,
+    contest: Optional[str] = None,
+    player: Optional[str] = None,
+):
+    """Shot efficiency per `interval` seconds (rows labelled with their start time)."""
+    rows = get_shot_store().trend(
+        interval,
+        _group_by(group_by),
+        since=since,
+        until=until,
+        filters=_filters(archetype=archetype, subtype=subtype, zone=zone, contest=contest, player=player),
+    )
+    return {"rows": rows}
+
+
+@router.get("/dashboard")
+async def dashboard():
+    """Rollups kept current on every shot: by zone x contest, subtype, archetype and hour."""
+    return {"rollups": get_shot_store().dashboard()}
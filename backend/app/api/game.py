@@ -1,16 +1,30 @@
-from fastapi import APIRouter, HTTPException
+import json
+import time
+from typing import Callable, Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from app.services.game_service import game_service
 from app.services.coach_ai_service import get_coach_service
-from app.websocket.game_handler import manager
+from app.websocket.game_handler import GAME_STATE_FRAME_PREFIX, manager
+from app.services.profiling import profiler
+from app.services.tracing_service import tracer
+from app.services.long_poll import version_watcher, MAX_POLL_TIMEOUT
+from app.services.bot_service import bot_service, POLICIES
+from app.services.room_concurrency import room_locks, idempotency_cache, IdempotencyKeyConflict
+from app.services.journal import get_journal
+from app.services.replay_export import MEDIA_TYPES, iter_replay
+from app.services.career import get_career_store
 from app.schemas.game import (
     GameCreate,
+    BotGameCreate,
     GameStateResponse,
     ShotRequest,
     DefenseRequest,
     PowerRequest,
-    PlayerSchema
+    BulkGameRequest,
+    RoomListResponse,
 )
-from app.models.game import Game
+from app.models.game import Game, GameState
 from app.models.shot_record import ShotRecord
 from app.models.shot_archetypes import ShotArchetype
 from app.models.offense import ShotType
@@ -18,55 +32,123 @@ from app.models.offense import ShotType
 router = APIRouter()
 
 
-def game_to_response(game: Game) -> GameStateResponse:
-    """Converts Game model to response schema."""
-    from app.schemas.game import ShotRecordSchema, DefenseStateSchema
-    
-    # Convert shot history
-    shot_history = [
-        ShotRecordSchema(
-            archetype=s.archetype.value,
-            subtype=s.subtype,
-            zone=s.zone.value,
-            contest_level=s.contest_level.value,
-            made=s.made,
-            points=s.points,
-            turn_number=s.turn_number
-        )
-        for s in game.shot_history
-    ]
+def game_state_data(game: Game) -> dict:
+    """Builds the GameStateResponse payload as plain JSON-ready data.
     
-    # Convert defense state
+    The game is already consistent, so the wire form is built directly
+    instead of validating a schema object per field on every broadcast.
+    """
     defense_state = None
     if game.defense_state:
-        defense_state = DefenseStateSchema(
-            contest_distribution={
+        defense_state = {
+            "contest_distribution": {
                 zone.value: contest.value
                 for zone, contest in game.defense_state.contest_distribution.items()
             },
-            help_frequency=game.defense_state.help_frequency,
-            foul_rate=game.defense_state.foul_rate
-        )
+            "help_frequency": game.defense_state.help_frequency,
+            "foul_rate": game.defense_state.foul_rate,
+            "summary": None,
+        }
+    
+    winner = game.get_winner()
+    return {
+        "room_id": game.room_id,
+        "player_one": {"name": game.player_one.name, "score": game.player_one.score},
+        "player_two": {"name": game.player_two.name, "score": game.player_two.score},
+        "current_offensive_player": game.current_offensive_player.name,
+        "current_defensive_player": game.current_defensive_player.name,
+        "state": game.state,
+        "shot_type": game.shot_type.value if game.shot_type else None,
+        "defense_type": game.defense_type.value if game.defense_type else None,
+        "power": game.power,
+        "shot_result": game.shot_result,
+        "animation_finished": game.animation_finished,
+        "game_over": game.is_game_over(),
+        "winner": {"name": winner.name, "score": winner.score} if winner else None,
+        "shot_history": [
+            {
+                "archetype": s.archetype.value,
+                "subtype": s.subtype,
+                "zone": s.zone.value,
+                "contest_level": s.contest_level.value,
+                "made": s.made,
+                "points": s.points,
+                "turn_number": s.turn_number,
+            }
+            for s in game.shot_history
+        ],
+        "defense_state": defense_state,
+    }
+
+
+def game_to_response(game: Game) -> GameStateResponse:
+    """Converts Game model to response schema."""
+    return GameStateResponse.model_validate(game_state_data(game))
+
+
+class CachedGameState:
+    """A game's serialized state for one version."""
+    __slots__ = ("version", "data", "_body", "_frame")
+    
+    def __init__(self, version: int, data: dict):
+        self.version = version
+        self.data = data  # Shared by every response and broadcast of this version
+        self._body = None
+        self._frame = None
+    
+    @property
+    def body(self) -> bytes:
+        """JSON body for GET responses."""
+        if self._body is None:
+            self._body = json.dumps(self.data, separators=(",", ":")).encode()
+        return self._body
     
-    return GameStateResponse(
-        room_id=game.room_id,
-        player_one=PlayerSchema(name=game.player_one.name, score=game.player_one.score),
-        player_two=PlayerSchema(name=game.player_two.name, score=game.player_two.score),
-        current_offensive_player=game.current_offensive_player.name,
-        current_defensive_player=game.current_defensive_player.name,
-        state=game.state,
-        shot_type=game.shot_type,
-        defense_type=game.defense_type,
-        power=game.power,
-        shot_result=game.shot_result,
-        animation_finished=game.animation_finished,
-        game_over=game.is_game_over(),
-        winner=PlayerSchema(name=winner.name, score=winner.score) if (winner := game.get_winner()) else None,
-        shot_history=shot_history,
-        defense_state=defense_state
+    @property
+    def frame(self) -> str:
+        """WebSocket game_state message, serialized once for every socket.
+        
+        `seq` is the game version, which clients send back to resume.
+        """
+        if self._frame is None:
+            self._frame = f'{GAME_STATE_FRAME_PREFIX}{self.version},"data":' + self.body.decode() + "}"
+        return self._frame
+
+
+def cached_game_state(game: Game) -> CachedGameState:
+    """Returns the memoized response for the game's current version."""
+    cached = game.response_cache
+    if cached is None or cached.version != game.version:
+        cached = game.response_cache = CachedGameState(game.version, game_state_data(game))
+    return cached
+
+
+def game_etag(game: Game) -> str:
+    """Strong ETag for the game's current version."""
+    return f'"{game.version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value matches `etag`."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def game_state_response(game: Game) -> Response:
+    """Serialized state with its ETag."""
+    return Response(
+        content=cached_game_state(game).body,
+        media_type="application/json",
+        headers={"ETag": game_etag(game)},
     )
 
 
+def game_state_frame(game: Game) -> str:
+    """Serialized WebSocket game_state message for the game's current version."""
+    return cached_game_state(game).frame
+
+
 @router.post("/create", response_model=GameStateResponse)
 async def create_game(game_create: GameCreate):
     """Creates a new game."""
@@ -77,54 +159,217 @@ async def create_game(game_create: GameCreate):
     game = game_service.get_game(room_id)
     if not game:
         raise HTTPException(status_code=500, detail="Failed to create game")
-    return game_to_response(game)
+    return cached_game_state(game).data
+
+
+@router.post("/create-bot", response_model=GameStateResponse)
+async def create_bot_game(game_create: BotGameCreate):
+    """Creates a game where player two is a server-side bot."""
+    if game_create.policy not in POLICIES:
+        raise HTTPException(status_code=400, detail=f"Unknown bot policy. Available: {sorted(POLICIES)}")
+    bot_name = game_create.bot_name
+    if bot_name.strip().casefold() == game_create.player_name.strip().casefold():
+        bot_name = f"{bot_name} (bot)"
+    room_id = game_service.create_game(game_create.player_name, bot_name)
+    bot_service.add_seat(
+        room_id,
+        bot_name,
+        policy=game_create.policy,
+        think_time=game_create.think_time_ms / 1000,
+    )
+    return cached_game_state(game_service.get_game(room_id)).data
+
+
+@router.post("/bulk")
+async def bulk_game_state(request: BulkGameRequest):
+    """Gets the state of many rooms in one request.
+    
+    Returns {"games": [...], "missing": [room ids not found]}.
+    """
+    bodies, missing = [], []
+    for room_id in dict.fromkeys(request.room_ids):
+        game = game_service.get_game(room_id)
+        if game:
+            bodies.append(cached_game_state(game).body)
+        else:
+            missing.append(room_id)
+    content = b'{"games":[' + b",".join(bodies) + b'],"missing":' + json.dumps(missing).encode() + b"}"
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/rooms", response_model=RoomListResponse)
+async def list_rooms(
+    state: Optional[GameState] = None,
+    active_since: Optional[float] = Query(default=None, description="Only rooms changed at or after this Unix time"),
+    player: Optional[str] = Query(default=None, description="Only rooms with this player (case-insensitive)"),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page")
+):
+    """Lists rooms, most recently active first, using GameService's indexes."""
+    before = None
+    if cursor:
+        updated_at, _, room_id = cursor.partition(":")
+        try:
+            before = (float(updated_at), room_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    room_ids = game_service.index.list_rooms(
+        state=state.value if state else None,
+        active_since=active_since,
+        player=player,
+        limit=limit,
+        before=before,
+    )
+    rooms = []
+    for room_id in room_ids:
+        game = game_service.games[room_id]
+        rooms.append({
+            "room_id": room_id,
+            "state": game.state,
+            "player_one": {"name": game.player_one.name, "score": game.player_one.score},
+            "player_two": {"name": game.player_two.name, "score": game.player_two.score},
+            "version": game.version,
+            "created_at": game.created_at,
+            "updated_at": game.updated_at,
+        })
+    next_cursor = None
+    if len(room_ids) == limit:
+        updated_at, room_id = game_service.index.key_of(room_ids[-1])
+        next_cursor = f"{updated_at!r}:{room_id}"
+    return {"rooms": rooms, "next_cursor": next_cursor}
 
 
 @router.get("/{room_id}", response_model=GameStateResponse)
-async def get_game_state(room_id: str):
-    """Gets current game state."""
+async def get_game_state(room_id: str, if_none_match: Optional[str] = Header(default=None)):
+    """Gets current game state. Returns 304 if If-None-Match matches the ETag."""
     game = game_service.get_game(room_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
-    return game_to_response(game)
+    etag = game_etag(game)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return game_state_response(game)
 
 
-@router.post("/{room_id}/shot")
-async def select_shot(room_id: str, shot_request: ShotRequest):
-    """Selects a shot type. Supports both legacy (shot_type) and new (archetype) formats."""
-    import json
-    import os
+@router.get("/{room_id}/replay")
+async def get_replay(
+    room_id: str,
+    format: str = Query(default="ndjson", pattern="^(ndjson|binary)$"),
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1),
+):
+    """Streams every recorded action and outcome of a game, from the journal.
     
-    # #region agent log
-    log_data = {
-        "location": "game.py:93",
-        "message": "select_shot endpoint entry",
-        "data": {
-            "room_id": room_id,
-            "has_shot_type": shot_request.shot_type is not None,
-            "has_archetype": shot_request.archetype is not None,
-            "shot_type": str(shot_request.shot_type) if shot_request.shot_type else None,
-            "archetype": str(shot_request.archetype) if shot_request.archetype else None
-        },
-        "timestamp": int(os.times().elapsed * 1000) if hasattr(os.times(), 'elapsed') else 0,
-        "runId": "run1",
-        "hypothesisId": "SHOT_ERROR"
-    }
-    try:
-        with open("/Users/rohanparekh99/basketball_game/Multiplayer-Basketball-Game/.cursor/debug.log", "a") as f:
-            f.write(json.dumps(log_data) + "\n")
-    except:
-        pass
-    # #endregion
+    `offset` / `limit` select a range of actions (by sequence number), so
+    long games can be fetched in pieces.
+    """
+    journal = get_journal()
+    if journal is None:
+        raise HTTPException(status_code=404, detail="Replays are not recorded (JOURNAL_DIR is not set)")
+    if not journal.has_records(room_id):
+        raise HTTPException(status_code=404, detail="Game not found")
+    extension = "ndjson" if format == "ndjson" else "bin"
+    return StreamingResponse(
+        iter_replay(journal, room_id, format=format, offset=offset, limit=limit),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{room_id}.replay.{extension}"'},
+    )
+
+
+@router.get("/{room_id}/poll", response_model=GameStateResponse)
+async def poll_game_state(
+    room_id: str,
+    since: int = Query(ge=0, description="Version (ETag) the client already has"),
+    timeout: float = Query(default=25.0, gt=0, le=MAX_POLL_TIMEOUT)
+):
+    """Long-poll: returns the state once its version moves past `since`,
+    or 304 when `timeout` seconds pass without a change."""
+    game = game_service.get_game(room_id)
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if game.version <= since:
+        await version_watcher.wait_past(room_id, since, timeout)
+        game = game_service.get_game(room_id)
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
+        if game.version <= since:
+            return Response(status_code=304, headers={"ETag": game_etag(game)})
+    return game_state_response(game)
+
+
+async def apply_action(
+    room_id: str,
+    action: str,
+    idempotency_key: Optional[str],
+    mutate: Callable[[], bool],
+    error: str,
+    message: str,
+    span: str
+) -> dict:
+    """Runs a GameService action under the room's lock and broadcasts the result.
     
+    A retried Idempotency-Key gets the original response back instead of the
+    action being applied (or rejected) a second time. The action is traced as
+    the `span` server span once the lock is held; waiting for it is traced
+    separately.
+    """
+    contended = room_locks.locked(room_id)
+    waiting_since = time.time()
+    async with room_locks.hold(room_id):
+        if contended:
+            tracer.record_lock_wait(room_id, waiting_since, time.time())
+        with tracer.request_span(room_id, span):
+            if idempotency_key:
+                try:
+                    cached = idempotency_cache.get(room_id, action, idempotency_key)
+                except IdempotencyKeyConflict as e:
+                    raise HTTPException(status_code=422, detail=str(e))
+                if cached is not None:
+                    return cached
+            
+            if not mutate():
+                raise HTTPException(status_code=400, detail=error)
+            game = game_service.get_game(room_id)
+            with profiler.phase(f"{action}.serialization"):
+                response = {"message": message, "game_state": cached_game_state(game).data}
+                state_frame = game_state_frame(game)
+            if idempotency_key:
+                idempotency_cache.put(room_id, action, idempotency_key, response)
+            # Broadcast update via WebSocket. Only queued, so a slow socket
+            # doesn't hold the lock; publishing under it keeps frames in
+            # version order.
+            await manager.publish(room_id, state_frame)
+            return response
+
+
+async def apply_bot_move(room_id: str, action: str, mutate: Callable[[], bool]) -> bool:
+    """BotService.run_move: a bot seat's shot, defense or power through
+    apply_action; False if the move no longer applies."""
+    try:
+        await apply_action(
+            room_id, f"select_{action}", None, mutate,
+            error="Bot move no longer applies",
+            message="Bot moved",
+            span=f"bot-{action}",
+        )
+    except HTTPException:
+        return False
+    return True
+
+
+@router.post("/{room_id}/shot")
+async def select_shot(
+    room_id: str,
+    shot_request: ShotRequest,
+    idempotency_key: Optional[str] = Header(default=None)
+):
+    """Selects a shot type. Supports both legacy (shot_type) and new (archetype) formats."""
     # Backward compatibility: if shot_type is provided, use it
     if shot_request.shot_type:
-        success = game_service.select_shot(room_id, shot_request.shot_type)
+        shot_type = shot_request.shot_type
     elif shot_request.archetype:
         # New format: map archetype to legacy shot_type for now
-        from app.models.shot_archetypes import ShotArchetype
-        from app.models.offense import ShotType
-        
         archetype_map = {
             ShotArchetype.RIM: ShotType.LAYUP,
             ShotArchetype.PAINT: ShotType.MIDRANGE,
@@ -132,146 +377,84 @@ async def select_shot(room_id: str, shot_request: ShotRequest):
             ShotArchetype.THREE: ShotType.THREE_POINTER,
             ShotArchetype.DEEP: ShotType.HALF_COURT,
         }
-        mapped_type = archetype_map.get(shot_request.archetype, ShotType.MIDRANGE)
-        success = game_service.select_shot(room_id, mapped_type)
+        shot_type = archetype_map.get(shot_request.archetype, ShotType.MIDRANGE)
     else:
-        # #region agent log
-        log_data = {
-            "location": "game.py:113",
-            "message": "select_shot: Neither shot_type nor archetype provided",
-            "data": {},
-            "timestamp": int(os.times().elapsed * 1000) if hasattr(os.times(), 'elapsed') else 0,
-            "runId": "run1",
-            "hypothesisId": "SHOT_ERROR"
-        }
-        try:
-            with open("/Users/rohanparekh99/basketball_game/Multiplayer-Basketball-Game/.cursor/debug.log", "a") as f:
-                f.write(json.dumps(log_data) + "\n")
-        except:
-            pass
-        # #endregion
         raise HTTPException(status_code=400, detail="Either shot_type or archetype must be provided")
     
-    # #region agent log
-    log_data = {
-        "location": "game.py:116",
-        "message": "select_shot: select_shot result",
-        "data": {
-            "success": success,
-            "room_id": room_id
-        },
-        "timestamp": int(os.times().elapsed * 1000) if hasattr(os.times(), 'elapsed') else 0,
-        "runId": "run1",
-        "hypothesisId": "SHOT_ERROR"
-    }
-    try:
-        with open("/Users/rohanparekh99/basketball_game/Multiplayer-Basketball-Game/.cursor/debug.log", "a") as f:
-            f.write(json.dumps(log_data) + "\n")
-    except:
-        pass
-    # #endregion
-    
-    if not success:
-        # #region agent log
-        log_data = {
-            "location": "game.py:130",
-            "message": "select_shot: Invalid shot selection error",
-            "data": {
-                "room_id": room_id,
-                "success": success
-            },
-            "timestamp": int(os.times().elapsed * 1000) if hasattr(os.times(), 'elapsed') else 0,
-            "runId": "run1",
-            "hypothesisId": "SHOT_ERROR"
-        }
-        try:
-            with open("/Users/rohanparekh99/basketball_game/Multiplayer-Basketball-Game/.cursor/debug.log", "a") as f:
-                f.write(json.dumps(log_data) + "\n")
-        except:
-            pass
-        # #endregion
-        raise HTTPException(status_code=400, detail="Invalid shot selection")
-    game = game_service.get_game(room_id)
-    game_state = game_to_response(game)
-    # Broadcast update via WebSocket
-    await manager.broadcast_to_room(room_id, {
-        "type": "game_state",
-        "data": game_state.model_dump()
-    })
-    return {"message": "Shot selected", "game_state": game_state}
+    return await apply_action(
+        room_id, "select_shot", idempotency_key,
+        lambda: game_service.select_shot(room_id, shot_type),
+        error="Invalid shot selection",
+        message="Shot selected",
+        span="shot",
+    )
 
 
 @router.post("/{room_id}/defense")
-async def select_defense(room_id: str, defense_request: DefenseRequest):
+async def select_defense(
+    room_id: str,
+    defense_request: DefenseRequest,
+    idempotency_key: Optional[str] = Header(default=None)
+):
     """Selects a defense type."""
-    success = game_service.select_defense(room_id, defense_request.defense_type)
-    if not success:
-        raise HTTPException(status_code=400, detail="Invalid defense selection")
-    game = game_service.get_game(room_id)
-    game_state = game_to_response(game)
-    # Broadcast update via WebSocket
-    await manager.broadcast_to_room(room_id, {
-        "type": "game_state",
-        "data": game_state.model_dump()
-    })
-    return {"message": "Defense selected", "game_state": game_state}
+    return await apply_action(
+        room_id, "select_defense", idempotency_key,
+        lambda: game_service.select_defense(room_id, defense_request.defense_type),
+        error="Invalid defense selection",
+        message="Defense selected",
+        span="defense",
+    )
 
 
 @router.post("/{room_id}/power")
-async def select_power(room_id: str, power_request: PowerRequest):
+async def select_power(
+    room_id: str,
+    power_request: PowerRequest,
+    idempotency_key: Optional[str] = Header(default=None)
+):
     """Selects power and calculates shot result. Now supports timing data."""
-    success = game_service.select_power(
-        room_id, 
-        power_request.power,
-        timing_grade=power_request.timing_grade,
-        timing_error=power_request.timing_error
+    return await apply_action(
+        room_id, "select_power", idempotency_key,
+        lambda: game_service.select_power(
+            room_id, 
+            power_request.power,
+            timing_grade=power_request.timing_grade,
+            timing_error=power_request.timing_error
+        ),
+        error="Invalid power selection",
+        message="Power selected, shot calculated",
+        span="power",
     )
-    if not success:
-        raise HTTPException(status_code=400, detail="Invalid power selection")
-    game = game_service.get_game(room_id)
-    game_state = game_to_response(game)
-    # Broadcast update via WebSocket
-    await manager.broadcast_to_room(room_id, {
-        "type": "game_state",
-        "data": game_state.model_dump()
-    })
-    return {"message": "Power selected, shot calculated", "game_state": game_state}
 
 
 @router.post("/{room_id}/animation-finished")
-async def finish_animation(room_id: str):
+async def finish_animation(room_id: str, idempotency_key: Optional[str] = Header(default=None)):
     """Marks animation as finished."""
-    success = game_service.finish_animation(room_id)
-    if not success:
-        raise HTTPException(status_code=400, detail="Invalid state")
-    game = game_service.get_game(room_id)
-    game_state = game_to_response(game)
-    # Broadcast update via WebSocket
-    await manager.broadcast_to_room(room_id, {
-        "type": "game_state",
-        "data": game_state.model_dump()
-    })
-    return {"message": "Animation finished", "game_state": game_state}
+    return await apply_action(
+        room_id, "finish_animation", idempotency_key,
+        lambda: game_service.finish_animation(room_id),
+        error="Invalid state",
+        message="Animation finished",
+        span="animation-finished",
+    )
 
 
 @router.post("/{room_id}/next-turn")
-async def next_turn(room_id: str):
+async def next_turn(room_id: str, idempotency_key: Optional[str] = Header(default=None)):
     """Moves to next turn."""
-    success = game_service.next_turn(room_id)
-    if not success:
-        raise HTTPException(status_code=400, detail="Invalid state")
-    game = game_service.get_game(room_id)
-    game_state = game_to_response(game)
-    # Broadcast update via WebSocket
-    await manager.broadcast_to_room(room_id, {
-        "type": "game_state",
-        "data": game_state.model_dump()
-    })
-    return {"message": "Next turn", "game_state": game_state}
+    return await apply_action(
+        room_id, "next_turn", idempotency_key,
+        lambda: game_service.next_turn(room_id),
+        error="Invalid state",
+        message="Next turn",
+        span="next-turn",
+    )
 
 
 def game_to_coach_state(game: Game) -> dict:
     """Convert Game to state dict for coach AI."""
+    # Career tendencies of the player on offense, if already cached
+    career = get_career_store().cached(game.current_offensive_player.name)
     return {
         "player_one": {
             "name": game.player_one.name,
@@ -323,6 +506,7 @@ def game_to_coach_state(game: Game) -> dict:
             "foul_rate": game.defense_state.foul_rate if game.defense_state else 0.1,
         } if game.defense_state else {},
         "current_offensive_player": game.current_offensive_player.name,
+        "career": career.tendencies() if career is not None else None,
     }
 
 
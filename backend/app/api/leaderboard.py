@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.services.leaderboard import get_leaderboard
+
+router = APIRouter()
+
+
+@router.get("")
+async def top_players(
+    limit: int = Query(default=10, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+):
+    """Players by rating, best first."""
+    board = get_leaderboard()
+    return {"players": board.top(limit, offset), "total": len(board)}
+
+
+@router.get("/players/{name}")
+async def player_rating(name: str):
+    """A player's rating, record and rank."""
+    entry = get_leaderboard().player(name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Player has no rated games")
+    return entry
+
+
+@router.get("/players/{name}/around")
+async def players_around(name: str, radius: int = Query(default=5, ge=0, le=50)):
+    """The players ranked just above and below a player."""
+    entries = get_leaderboard().around(name, radius)
+    if entries is None:
+        raise HTTPException(status_code=404, detail="Player has no rated games")
+    return {"players": entries}
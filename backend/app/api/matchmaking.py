@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException
+from app.schemas.matchmaking import MatchmakingRequest
+from app.services.matchmaking_service import get_matchmaking_service
+
+router = APIRouter()
+
+
+@router.post("/tickets")
+async def join_queue(request: MatchmakingRequest):
+    """Queues a player. Connect to /ws/matchmaking/{ticket_id} to be told when
+    a game is found; the ticket may already be matched in the response."""
+    ticket = get_matchmaking_service().enqueue(request.player_name, request.skill)
+    return ticket.to_dict()
+
+
+@router.get("/tickets/{ticket_id}")
+async def get_ticket(ticket_id: str):
+    """Gets a ticket's status (and room_id once matched)."""
+    ticket = get_matchmaking_service().get_ticket(ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket.to_dict()
+
+
+@router.delete("/tickets/{ticket_id}")
+async def leave_queue(ticket_id: str):
+    """Cancels a queued ticket."""
+    ticket = get_matchmaking_service().cancel(ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    if ticket.status != "cancelled":
+        raise HTTPException(status_code=409, detail=f"Ticket already {ticket.status}")
+    return ticket.to_dict()
+
+
+@router.get("/stats")
+async def queue_stats():
+    """Queue depth per skill bucket and recent wait times."""
+    return get_matchmaking_service().stats()
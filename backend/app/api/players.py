@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.services.career import get_career_store
+
+router = APIRouter()
+
+
+@router.get("/{name}/career")
+def career_profile(name: str):
+    """A player's career record and shot tendencies (empty if they have none).
+    
+    Read from the database rather than the cache, which misses games finished
+    on other workers; a plain def, so the read runs in the threadpool.
+    """
+    return get_career_store().load(name).to_dict()
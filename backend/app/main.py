@@ -1,16 +1,141 @@
+import os
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from app.api import game
-from app.websocket import game_handler
+from app.models.events import ServiceError
+from app.api import game, admin, matchmaking, analytics, leaderboard, players
+from app.websocket import game_handler, matchmaking_handler
+from app.websocket.heartbeat import heartbeats
+from app.websocket.spectators import spectators
+from app.services.event_log import get_event_log
+from app.services.metrics import metrics, MetricsMiddleware
+from app.services.profiling import ProfilingMiddleware
+from app.services.game_service import game_service
+from app.services.tracing_service import tracer
+from app.services.long_poll import version_watcher
+from app.services.matchmaking_service import get_matchmaking_service
+from app.services.bot_service import bot_service
+from app.services.room_concurrency import idempotency_cache
+from app.services.backplane import get_backplane
+from app.services.snapshot import SnapshotError, restore_rooms, save_rooms
+from app.services.journal import get_journal
+from app.services.analytics import get_shot_store
+from app.services.leaderboard import RESULTS_CHANNEL, get_leaderboard
+from app.services.career import get_career_store
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+async def deliver_frame(room_id: str, frame: str) -> None:
+    """Backplane subscriber: game results for the leaderboard, else room frames."""
+    if room_id == RESULTS_CHANNEL:
+        get_leaderboard().apply_frame(frame)
+    else:
+        await game_handler.manager.send_frame(room_id, frame)
+
+
+@contextmanager
+def report_failure(service: str):
+    """Logs an exception from `service` as a ServiceError and carries on.
+    
+    Used around each shutdown step, so one failure doesn't skip the rest.
+    """
+    try:
+        yield
+    except Exception as e:
+        get_event_log().emit(ServiceError(service=service, error_type=type(e).__name__, message=str(e)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Starts background services on startup and flushes them on shutdown."""
+    event_log = get_event_log()
+    event_log.start()
+    game_service.add_listener(tracer.on_game_event)
+    game_service.add_listener(version_watcher.on_game_event)
+    game_service.add_listener(bot_service.on_game_event)
+    game_service.add_listener(idempotency_cache.on_game_event)
+    shot_store = get_shot_store()
+    game_service.add_listener(shot_store.on_game_event)
+    career_store = get_career_store()
+    game_service.add_listener(career_store.on_game_event)
+    career_store.start()
+    bot_service.run_move = game.apply_bot_move
+    backplane = get_backplane()
+    backplane.subscriber = deliver_frame
+    await backplane.start()
+    leaderboard_service = get_leaderboard()
+    if backplane.transport != "memory":
+        # Every worker rates every game, so any of them can serve the leaderboard
+        leaderboard_service.publish = backplane.publish
+    game_service.add_listener(leaderboard_service.on_game_event)
+    leaderboard_service.start()
+    journal = get_journal()
+    if journal is not None:
+        game_service.add_listener(journal.on_game_event)
+        journal.start()
+    snapshot_path = os.getenv("SNAPSHOT_PATH")
+    restored = False
+    if snapshot_path and os.path.exists(snapshot_path):
+        try:
+            restore_rooms(snapshot_path)
+            restored = True
+        except SnapshotError as e:
+            event_log.emit(ServiceError(
+                service="snapshot",
+                error_type="SnapshotError",
+                message=f"Not restoring rooms from {snapshot_path}: {e}",
+            ))
+        if restored and journal is not None:
+            # From here on the journal covers a crash; a stale snapshot must not
+            os.remove(snapshot_path)
+    if journal is not None and not restored:
+        game_service.restore_games(journal.recover())
+    matchmaking_service = get_matchmaking_service()
+    matchmaking_service.notifier = matchmaking_handler.lobby.notify
+    matchmaking_service.start()
+    heartbeats.start()
+    spectators.start()
+    yield
+    with report_failure("spectators"):
+        await spectators.stop()
+    with report_failure("heartbeats"):
+        await heartbeats.stop()
+    with report_failure("matchmaking"):
+        await matchmaking_service.stop()
+    if snapshot_path:
+        with report_failure("snapshot"):
+            save_rooms(snapshot_path)
+    game_service.remove_listener(leaderboard_service.on_game_event)
+    with report_failure("leaderboard"):
+        leaderboard_service.stop()
+    with report_failure("backplane"):
+        await backplane.stop()
+    if journal is not None:
+        game_service.remove_listener(journal.on_game_event)
+        with report_failure("journal"):
+            journal.stop()
+    game_service.remove_listener(career_store.on_game_event)
+    with report_failure("career"):
+        career_store.close()
+    game_service.remove_listener(shot_store.on_game_event)
+    with report_failure("analytics"):
+        shot_store.close()
+    game_service.remove_listener(idempotency_cache.on_game_event)
+    game_service.remove_listener(bot_service.on_game_event)
+    game_service.remove_listener(version_watcher.on_game_event)
+    game_service.remove_listener(tracer.on_game_event)
+    event_log.stop()
+
+
 app = FastAPI(
     title="Basketball Game API",
     description="Multiplayer basketball game backend",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend
@@ -20,16 +145,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(game.router, prefix="/api/game", tags=["game"])
+app.include_router(matchmaking.router, prefix="/api/matchmaking", tags=["matchmaking"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(leaderboard.router, prefix="/api/leaderboard", tags=["leaderboard"])
+app.include_router(players.router, prefix="/api/players", tags=["players"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 # WebSocket endpoint
 @app.websocket("/ws/game/{room_id}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str):
     await game_handler.handle_game_websocket(websocket, room_id)
 
+@app.websocket("/ws/game/{room_id}/spectate")
+async def spectator_websocket(websocket: WebSocket, room_id: str):
+    await game_handler.handle_spectator_websocket(websocket, room_id)
+
+@app.websocket("/ws/matchmaking/{ticket_id}")
+async def matchmaking_websocket(websocket: WebSocket, ticket_id: str):
+    await matchmaking_handler.handle_matchmaking_websocket(websocket, ticket_id)
+
 @app.get("/")
 async def root():
     return {"message": "Basketball Game API", "version": "1.0.0"}
@@ -38,3 +179,8 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text-format metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
@@ -30,4 +30,28 @@ class DefenseState:
     
     # Summary for UI (calculated by DefenseAIService)
     summary: Optional[Dict[str, Any]] = field(default=None)  # {perimeter_pressure: float, rim_protection: float, scheme: str}
-
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "contest_distribution": {
+                zone.value: level.value for zone, level in self.contest_distribution.items()
+            },
+            "help_frequency": self.help_frequency,
+            "help_zones": [zone.value for zone in self.help_zones],
+            "foul_rate": self.foul_rate,
+            "personality": self.personality.value if self.personality else None,
+            "summary": self.summary,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DefenseState":
+        return cls(
+            contest_distribution={
+                ShotZone(zone): ContestLevel(level) for zone, level in data["contest_distribution"].items()
+            },
+            help_frequency=data["help_frequency"],
+            help_zones=[ShotZone(zone) for zone in data["help_zones"]],
+            foul_rate=data["foul_rate"],
+            personality=DefensePersonality(data["personality"]) if data["personality"] else None,
+            summary=data["summary"],
+        )
@@ -0,0 +1,136 @@
+import time
+from dataclasses import dataclass, field, asdict
+from typing import ClassVar, Optional, Dict, Any
+
+
+@dataclass(kw_only=True)
+class GameEvent:
+    """Base class for structured events emitted by the game services."""
+    event_type: ClassVar[str] = "event"
+    room_id: str = ""
+    timestamp: float = field(default_factory=time.time)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns a JSON-serializable dict with the event type."""
+        data = {"event": self.event_type}
+        for key, value in asdict(self).items():
+            data[key] = value.value if hasattr(value, "value") else value
+        return data
+
+
+@dataclass(kw_only=True)
+class GameTransitionEvent(GameEvent):
+    """Event for an action that moved a game between GameStates."""
+    from_state: Optional[str] = None
+    to_state: str
+
+
+@dataclass(kw_only=True)
+class GameCreated(GameTransitionEvent):
+    event_type: ClassVar[str] = "game_created"
+    player_one: str
+    player_two: str
+
+
+@dataclass(kw_only=True)
+class ShotSelected(GameTransitionEvent):
+    event_type: ClassVar[str] = "shot_selected"
+    player: str
+    shot_type: str
+
+
+@dataclass(kw_only=True)
+class DefenseSelected(GameTransitionEvent):
+    event_type: ClassVar[str] = "defense_selected"
+    player: str
+    defense_type: str
+
+
+@dataclass(kw_only=True)
+class ShotResolved(GameTransitionEvent):
+    event_type: ClassVar[str] = "shot_resolved"
+    player: str
+    power: int
+    timing_grade: Optional[str] = None
+    timing_error: Optional[float] = None
+    archetype: str
+    subtype: str
+    zone: str
+    contest_level: str
+    points: int  # Value of the shot (2 or 3), scored only if made
+    make_probability: float
+    made: bool
+
+
+@dataclass(kw_only=True)
+class AnimationFinished(GameTransitionEvent):
+    event_type: ClassVar[str] = "animation_finished"
+    points_scored: int
+    player_one_score: int
+    player_two_score: int
+
+
+@dataclass(kw_only=True)
+class TurnAdvanced(GameTransitionEvent):
+    event_type: ClassVar[str] = "turn_advanced"
+    offensive_player: str
+
+
+@dataclass(kw_only=True)
+class GameOver(GameTransitionEvent):
+    event_type: ClassVar[str] = "game_over"
+    winner: str
+    loser: str
+    player_one_score: int
+    player_two_score: int
+
+
+@dataclass(kw_only=True)
+class GameDeleted(GameEvent):
+    event_type: ClassVar[str] = "game_deleted"
+
+
+@dataclass(kw_only=True)
+class RoomHandedOff(GameEvent):
+    """The room left this worker for another one; its game goes on there."""
+    event_type: ClassVar[str] = "room_handed_off"
+
+
+@dataclass(kw_only=True)
+class ActionRejected(GameEvent):
+    """An action that was refused because of the game's current state."""
+    event_type: ClassVar[str] = "action_rejected"
+    action: str
+    reason: str
+    state: Optional[str] = None
+
+
+@dataclass(kw_only=True)
+class ServiceError(GameEvent):
+    """A background or lifecycle step of a service failed; the app carried on."""
+    event_type: ClassVar[str] = "service_error"
+    service: str
+    error_type: str
+    message: str
+
+
+@dataclass(kw_only=True)
+class CoachInitialized(GameEvent):
+    event_type: ClassVar[str] = "coach_initialized"
+    use_llm: bool
+    model: Optional[str] = None
+    detail: Optional[str] = None
+
+
+@dataclass(kw_only=True)
+class CoachAdviceServed(GameEvent):
+    event_type: ClassVar[str] = "coach_advice_served"
+    source: str  # "cache", "llm" or "rule_based"
+    latency_ms: float
+
+
+@dataclass(kw_only=True)
+class CoachError(GameEvent):
+    event_type: ClassVar[str] = "coach_error"
+    error_type: str
+    message: str
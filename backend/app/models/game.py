@@ -1,5 +1,6 @@
+import time
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Any, Optional, List
 from enum import Enum
 from app.models.player import Player
 from app.models.offense import ShotType
@@ -34,6 +35,11 @@ class Game:
     room_id: str = ""
     shot_history: List[ShotRecord] = field(default_factory=list)  # Last 10-20 shots across both players
     defense_state: Optional[DefenseState] = None
+    version: int = 0  # Bumped by GameService on every mutation
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = 0.0  # Time of the last mutation
+    # Serialized state memoized by the API layer for `version`
+    response_cache: Optional[Any] = field(default=None, repr=False, compare=False)
     
     def __post_init__(self):
         """Initialize current players."""
@@ -69,4 +75,45 @@ class Game:
         if not self.is_game_over():
             return None
         return self.player_one if self.player_one.score > self.player_two.score else self.player_two
-
+    
+    def to_dict(self) -> dict:
+        """Full game state as JSON-ready data, for moving a game between processes."""
+        return {
+            "room_id": self.room_id,
+            "player_one": self.player_one.to_dict(),
+            "player_two": self.player_two.to_dict(),
+            "offense": "player_one" if self.current_offensive_player is self.player_one else "player_two",
+            "state": self.state,
+            "shot_type": self.shot_type.value if self.shot_type else None,
+            "defense_type": self.defense_type.value if self.defense_type else None,
+            "power": self.power,
+            "shot_result": self.shot_result,
+            "animation_finished": self.animation_finished,
+            "shot_history": [record.to_dict() for record in self.shot_history],
+            "defense_state": self.defense_state.to_dict() if self.defense_state else None,
+            "version": self.version,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "Game":
+        game = cls(
+            player_one=Player.from_dict(data["player_one"]),
+            player_two=Player.from_dict(data["player_two"]),
+            state=data["state"],
+            shot_type=ShotType(data["shot_type"]) if data["shot_type"] else None,
+            defense_type=DefenseType(data["defense_type"]) if data["defense_type"] else None,
+            power=data["power"],
+            shot_result=data["shot_result"],
+            animation_finished=data["animation_finished"],
+            room_id=data["room_id"],
+            shot_history=[ShotRecord.from_dict(record) for record in data["shot_history"]],
+            defense_state=DefenseState.from_dict(data["defense_state"]) if data["defense_state"] else None,
+            version=data["version"],
+            created_at=data["created_at"],
+            updated_at=data["updated_at"],
+        )
+        if data["offense"] == "player_two":
+            game.swap_players()
+        return game
@@ -38,6 +38,13 @@ class Offense:
         "heave": 0.05,
     }
     
+    # Make % multipliers applied to the open-look percentage when contested
+    CONTEST_MULTIPLIERS = {
+        "open": 1.0,
+        "light": 0.85,  # 15% reduction
+        "heavy": 0.70,  # 30% reduction
+    }
+    
     def __init__(self):
         self.make_percentage: float = 0.0
     
@@ -165,17 +172,12 @@ class Offense:
         player: "Player"
     ) -> float:
         """Make % if shot is contested (always lower than open)."""
-        from app.models.shot_archetypes import ContestLevel, DribbleState
+        from app.models.shot_archetypes import DribbleState
         
         p_open = self._calculate_make_if_open(archetype, subtype, player, DribbleState.CATCH_AND_SHOOT)
         
         # Contest penalties
-        if contest_level == ContestLevel.LIGHT:
-            return p_open * 0.85  # 15% reduction
-        elif contest_level == ContestLevel.HEAVY:
-            return p_open * 0.70  # 30% reduction
-        else:
-            return p_open
+        return p_open * self.CONTEST_MULTIPLIERS.get(contest_level.value, 1.0)
     
     def _get_base_percentage(self, archetype: "ShotArchetype", subtype: str) -> float:
         """Get baseline percentage for archetype/subtype."""
@@ -50,6 +50,21 @@ class Player:
         if len(self.shot_history) > 20:
             self.shot_history = self.shot_history[-20:]
     
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "score": self.score,
+            "shot_history": [record.to_dict() for record in self.shot_history],
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "Player":
+        return cls(
+            name=data["name"],
+            score=data["score"],
+            shot_history=[ShotRecord.from_dict(record) for record in data["shot_history"]],
+        )
+    
     def __eq__(self, other: object) -> bool:
         """Checks if two players are equal by name."""
         if not isinstance(other, Player):
@@ -13,4 +13,27 @@ class ShotRecord:
     made: bool
     points: int  # 2 or 3
     turn_number: int  # Which turn in the game
+    
+    def to_dict(self) -> dict:
+        return {
+            "archetype": self.archetype.value,
+            "subtype": self.subtype,
+            "zone": self.zone.value,
+            "contest_level": self.contest_level.value,
+            "made": self.made,
+            "points": self.points,
+            "turn_number": self.turn_number,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "ShotRecord":
+        return cls(
+            archetype=ShotArchetype(data["archetype"]),
+            subtype=data["subtype"],
+            zone=ShotZone(data["zone"]),
+            contest_level=ContestLevel(data["contest_level"]),
+            made=data["made"],
+            points=data["points"],
+            turn_number=data["turn_number"],
+        )
 
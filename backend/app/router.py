@@ -0,0 +1,746 @@
+"""Front process that runs several backend workers and routes rooms to them.
+
+    python -m app.router --workers 4 --port 8000
+
+Game state lives in each worker's memory, so every request and WebSocket for
+a room has to reach the same process. Workers are `uvicorn app.main:app`
+processes on Unix sockets that know the ring through SHARD_NODES / SHARD_NODE
+(app.services.sharding). The router sends each room's traffic to its owner,
+spreads room creation round-robin (a worker only hands out ids it owns),
+keeps matchmaking and leaderboard reads on one lobby worker and fans bulk fetches, room listings
+and shot analytics out to every worker. It also runs the backplane broker
+(app.services.backplane) that carries room broadcasts between workers.
+
+Workers can be added and removed while running (`POST /router/workers`,
+`DELETE /router/workers/{name}`, with X-Admin-Token). Rooms whose owner
+changes are handed off through the workers' /admin/shard endpoints, and
+their requests wait at the router until the move is done. Queued
+matchmaking tickets stay with the lobby worker and are lost if it is removed.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import uvicorn
+import websockets
+from dotenv import load_dotenv
+
+from app.services.backplane import BackplaneBroker
+from app.services.sharding import HashRing
+
+logger = logging.getLogger("uvicorn.error")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Headers = List[Tuple[bytes, bytes]]
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+# Per-connection headers that are never forwarded
+HOP_BY_HOP = {b"connection", b"keep-alive", b"proxy-connection", b"te", b"trailer", b"transfer-encoding", b"upgrade"}
+# Request headers the upstream connection sets itself
+REQUEST_SKIP = HOP_BY_HOP | {b"host", b"content-length"}
+
+ROOM_PATH = re.compile(r"^/(?:api|ws)/game/([^/]+)")
+# /api/game/<name> routes that are not rooms
+GAME_COLLECTION_PATHS = {"create", "create-bot", "bulk", "rooms"}
+
+
+class UpstreamResponse:
+    """Status and headers from a worker; the body is streamed from `body`."""
+    
+    def __init__(self, status: int, headers: Headers, body: AsyncIterator[bytes]):
+        self.status = status
+        self.headers = headers
+        self.body = body
+    
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.body])
+
+
+class UpstreamPool:
+    """Keep-alive HTTP/1.1 connections to one worker's Unix socket.
+    
+    A minimal client on asyncio streams, like scripts.load_test's, so the
+    router needs nothing beyond uvicorn and websockets.
+    """
+    
+    MAX_IDLE = 64
+    # uvicorn closes keep-alive connections after 5 seconds by default
+    IDLE_REOPEN_SECONDS = 4.0
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._idle: Deque[Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]] = deque()
+    
+    def _take(self) -> Optional[Connection]:
+        now = time.monotonic()
+        while self._idle:
+            reader, writer, last_used = self._idle.pop()
+            if not writer.is_closing() and now - last_used < self.IDLE_REOPEN_SECONDS:
+                return reader, writer
+            writer.close()
+        return None
+    
+    def _release(self, connection: Connection, keep_alive: bool) -> None:
+        reader, writer = connection
+        if keep_alive and len(self._idle) < self.MAX_IDLE and not writer.is_closing():
+            self._idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+    
+    async def request(self, method: str, target: str, headers: Headers, body: bytes = b"") -> UpstreamResponse:
+        connection = self._take()
+        reused = connection is not None
+        if connection is None:
+            connection = await asyncio.open_unix_connection(self.path)
+        try:
+            return await self._send(connection, method, target, headers, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            connection[1].close()
+            if not reused:
+                raise
+            # The worker dropped an idle keep-alive connection before reading
+            # the request; retry once on a fresh connection
+            connection = await asyncio.open_unix_connection(self.path)
+            return await self._send(connection, method, target, headers, body)
+    
+    async def _send(
+        self,
+        connection: Connection,
+        method: str,
+        target: str,
+        headers: Headers,
+        body: bytes
+    ) -> UpstreamResponse:
+        reader, writer = connection
+        head = [f"{method} {target} HTTP/1.1\r\nhost: worker\r\ncontent-length: {len(body)}\r\n".encode()]
+        head.extend(name + b": " + value + b"\r\n" for name, value in headers)
+        writer.write(b"".join(head) + b"\r\n" + body)
+        await writer.drain()
+        
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Worker closed the connection")
+        status = int(status_line.split()[1])
+        response_headers: Headers = []
+        length, chunked, keep_alive = None, False, True
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            name, value = name.strip().lower(), value.strip()
+            response_headers.append((name, value))
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = value.lower() == b"chunked"
+            elif name == b"connection":
+                keep_alive = value.lower() != b"close"
+        
+        if method == "HEAD" or status in (204, 304):
+            length, chunked = 0, False
+        return UpstreamResponse(status, response_headers, self._body(connection, length, chunked, keep_alive))
+    
+    async def _body(
+        self,
+        connection: Connection,
+        length: Optional[int],
+        chunked: bool,
+        keep_alive: bool
+    ) -> AsyncIterator[bytes]:
+        """Yields the body and returns the connection to the pool once it's read."""
+        reader = connection[0]
+        try:
+            if chunked:
+                while True:
+                    size = int((await reader.readline()).split(b";")[0], 16)
+                    if not size:
+                        while await reader.readline() not in (b"\r\n", b"\n", b""):
+                            pass  # Trailers
+                        break
+                    yield await reader.readexactly(size)
+                    await reader.readexactly(2)
+            elif length is None:
+                keep_alive = False
+                while chunk := await reader.read(65536):
+                    yield chunk
+            elif length:
+                yield await reader.readexactly(length)
+        except BaseException:
+            keep_alive = False
+            raise
+        finally:
+            self._release(connection, keep_alive)
+    
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+class Worker:
+    """A backend worker process and the connection pool to its socket."""
+    
+    def __init__(self, name: str, socket_path: str, process: asyncio.subprocess.Process):
+        self.name = name
+        self.socket_path = socket_path
+        self.process = process
+        self.pool = UpstreamPool(socket_path)
+
+
+class ShardRouter:
+    """ASGI app that proxies each room's requests to the worker that owns it."""
+    
+    START_TIMEOUT = 15.0
+    STOP_TIMEOUT = 10.0
+    MIGRATION_CONCURRENCY = 16
+    
+    def __init__(self, workers: int, log_level: str = "warning"):
+        self.initial_workers = workers
+        self.log_level = log_level
+        # Workers get the operator's ADMIN_TOKEN, or a private one so the
+        # router can still reach their /admin/shard endpoints
+        self.admin_token = os.getenv("ADMIN_TOKEN") or secrets.token_urlsafe(24)
+        self.workers: Dict[str, Worker] = {}
+        self.ring = HashRing()
+        self.lobby: Optional[str] = None  # Worker running matchmaking
+        self._socket_dir = tempfile.mkdtemp(prefix="basketball-shards-")
+        self.broker = BackplaneBroker(os.path.join(self._socket_dir, "backplane.sock"))
+        self._names = itertools.count()
+        self._round_robin = itertools.count()
+        self._membership_lock = asyncio.Lock()
+        # Set while the ring is being switched; room requests wait on it
+        self._resharding: Optional[asyncio.Event] = None
+        # room_id -> set when the room's handoff to its new owner finishes
+        self._moving: Dict[str, asyncio.Event] = {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+    
+    # Worker processes
+    
+    async def start(self) -> None:
+        await self.broker.start()
+        names = [self._new_name() for _ in range(self.initial_workers)]
+        workers = await asyncio.gather(*(self._spawn(name, names) for name in names))
+        self.workers = {worker.name: worker for worker in workers}
+        self.ring = HashRing(names)
+        self.lobby = names[0]
+    
+    async def stop(self) -> None:
+        await asyncio.gather(*(self._stop_worker(worker) for worker in self.workers.values()))
+        self.workers.clear()
+        await self.broker.stop()
+        shutil.rmtree(self._socket_dir, ignore_errors=True)
+    
+    def _new_name(self) -> str:
+        return f"worker-{next(self._names)}"
+    
+    async def _spawn(self, name: str, nodes: List[str]) -> Worker:
+        """Starts a worker and waits until it answers /health."""
+        socket_path = os.path.join(self._socket_dir, f"{name}.sock")
+        env = {
+            **os.environ,
+            "SHARD_NODE": name,
+            "SHARD_NODES": ",".join(nodes),
+            "ADMIN_TOKEN": self.admin_token,
+            "BACKPLANE": f"unix:{self.broker.path}",
+        }
+        if os.getenv("SNAPSHOT_PATH"):
+            # Worker names repeat across router restarts, so each worker
+            # restores its own rooms
+            env["SNAPSHOT_PATH"] = f"{os.environ['SNAPSHOT_PATH']}.{name}"
+        if os.getenv("JOURNAL_DIR"):
+            env["JOURNAL_DIR"] = os.path.join(os.environ["JOURNAL_DIR"], name)
+        if os.getenv("ANALYTICS_DIR"):
+            env["ANALYTICS_DIR"] = os.path.join(os.environ["ANALYTICS_DIR"], name)
+        if os.getenv("LEADERBOARD_PATH"):
+            env["LEADERBOARD_PATH"] = f"{os.environ['LEADERBOARD_PATH']}.{name}"
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "app.main:app", "--uds", socket_path,
+            "--log-level", self.log_level,
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        worker = Worker(name, socket_path, process)
+        deadline = time.monotonic() + self.START_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.returncode is not None:
+                raise RuntimeError(f"{name} exited with status {process.returncode}")
+            try:
+                response = await worker.pool.request("GET", "/health", [])
+                await response.read()
+                if response.status == 200:
+                    return worker
+            except OSError:
+                pass
+            await asyncio.sleep(0.1)
+        await self._stop_worker(worker)
+        raise RuntimeError(f"{name} did not start")
+    
+    async def _stop_worker(self, worker: Worker) -> None:
+        worker.pool.close()
+        if worker.process.returncode is None:
+            worker.process.terminate()
+            try:
+                await asyncio.wait_for(worker.process.wait(), self.STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                worker.process.kill()
+                await worker.process.wait()
+    
+    # Membership changes
+    
+    async def add_worker(self) -> Tuple[str, int]:
+        """Starts a worker, gives it its share of the ring and moves its rooms
+        to it. Returns the worker name and the number of rooms moved."""
+        async with self._membership_lock:
+            name = self._new_name()
+            nodes = self.ring.nodes + [name]
+            self.workers[name] = await self._spawn(name, nodes)
+            return name, await self._reshard(nodes)
+    
+    async def remove_worker(self, name: str) -> int:
+        """Moves a worker's rooms to the rest of the ring and stops it.
+        Returns the number of rooms moved."""
+        async with self._membership_lock:
+            if name not in self.workers:
+                raise KeyError(name)
+            if len(self.ring.nodes) == 1:
+                raise ValueError("Cannot remove the last worker")
+            nodes = [node for node in self.ring.nodes if node != name]
+            moved = await self._reshard(nodes)
+            if self.lobby == name:
+                self.lobby = nodes[0]
+            await self._stop_worker(self.workers.pop(name))
+            return moved
+    
+    async def _reshard(self, nodes: List[str]) -> int:
+        """Switches to a ring of `nodes` and hands off every room whose owner changed.
+        
+        Room requests are held while workers get the new ring and list their
+        rooms (so none can create a room under the old ring unnoticed), then
+        only requests for rooms still being moved wait.
+        """
+        ring = HashRing(nodes)
+        moves: List[Tuple[str, Worker, Worker]] = []
+        resharding = self._resharding = asyncio.Event()
+        try:
+            members = [worker for worker in self.workers.values() if worker.name in nodes]
+            await asyncio.gather(*(
+                self._admin(worker, "PUT", "/admin/shard/ring", {"nodes": nodes}) for worker in members
+            ))
+            workers = list(self.workers.values())
+            listings = await asyncio.gather(*(self._admin(worker, "GET", "/admin/shard/rooms") for worker in workers))
+            for worker, (_, listing) in zip(workers, listings):
+                for room_id in listing["room_ids"]:
+                    owner = ring.node_for(room_id)
+                    if owner != worker.name:
+                        moves.append((room_id, worker, self.workers[owner]))
+                        self._moving[room_id] = asyncio.Event()
+            self.ring = ring
+        finally:
+            self._resharding = None
+            resharding.set()
+        
+        semaphore = asyncio.Semaphore(self.MIGRATION_CONCURRENCY)
+        
+        async def move(room_id: str, source: Worker, target: Worker) -> None:
+            async with semaphore:
+                try:
+                    await self._move_room(room_id, source, target)
+                finally:
+                    self._moving.pop(room_id).set()
+        
+        await asyncio.gather(*(move(*entry) for entry in moves))
+        return len(moves)
+    
+    async def _move_room(self, room_id: str, source: Worker, target: Worker) -> None:
+        status, handoff = await self._admin(source, "POST", f"/admin/shard/rooms/{room_id}/handoff")
+        if status == 404:
+            return  # Deleted since the listing
+        if status != 200:
+            logger.error("Handoff of room %s from %s failed with %s", room_id, source.name, status)
+            return
+        status, _ = await self._admin(target, "POST", "/admin/shard/rooms", handoff)
+        if status != 200:
+            # Don't lose the game: give it back, though the ring now points elsewhere
+            logger.error("Room %s could not move to %s (%s); returned to %s", room_id, target.name, status, source.name)
+            await self._admin(source, "POST", "/admin/shard/rooms", handoff)
+    
+    async def _admin(self, worker: Worker, method: str, path: str, payload: Optional[dict] = None):
+        """Calls a worker admin endpoint; returns (status, decoded JSON body)."""
+        body = json.dumps(payload).encode() if payload is not None else b""
+        headers = [(b"x-admin-token", self.admin_token.encode()), (b"content-type", b"application/json")]
+        response = await worker.pool.request(method, path, headers, body)
+        data = await response.read()
+        return response.status, json.loads(data) if data else None
+    
+    # Routing
+    
+    async def _worker_for(self, path: str) -> Worker:
+        """Owner of the room in `path`, the lobby for matchmaking and the
+        leaderboard, else the next worker round-robin. Waits while the room is
+        being moved."""
+        if path.startswith(("/api/matchmaking", "/ws/matchmaking", "/api/leaderboard")):
+            return self.workers[self.lobby]
+        match = ROOM_PATH.match(path)
+        if match is None:
+            return self._next_worker()
+        resharding = self._resharding
+        if resharding is not None:
+            await resharding.wait()
+        room_id = match.group(1)
+        if room_id in GAME_COLLECTION_PATHS:
+            return self._next_worker()
+        moving = self._moving.get(room_id)
+        if moving is not None:
+            await moving.wait()
+        return self.workers[self.ring.node_for(room_id)]
+    
+    def _next_worker(self) -> Worker:
+        nodes = self.ring.nodes
+        return self.workers[nodes[next(self._round_robin) % len(nodes)]]
+    
+    async def _http(self, scope, receive, send) -> None:
+        path = scope["path"]
+        body = await _read_body(receive)
+        if path.startswith("/router/"):
+            await self._router_endpoint(scope, body, send)
+            return
+        pinned = _header(scope, b"x-shard")
+        if pinned is not None:
+            # Lets operators reach one worker's /metrics or /admin endpoints
+            worker = self.workers.get(pinned)
+            if worker is None:
+                await _send_json(send, 404, {"detail": f"Unknown worker {pinned}"})
+                return
+        elif path == "/api/game/bulk" and scope["method"] == "POST":
+            await self._bulk(scope, body, send)
+            return
+        elif path == "/api/game/rooms" and scope["method"] == "GET":
+            await self._list_rooms(scope, send)
+            return
+        elif path.startswith("/api/analytics/") and scope["method"] == "GET":
+            await self._analytics(scope, send)
+            return
+        else:
+            worker = await self._worker_for(path)
+        await self._forward(worker, scope, body, send)
+    
+    async def _forward(self, worker: Worker, scope, body: bytes, send) -> None:
+        try:
+            response = await worker.pool.request(scope["method"], _target(scope), _request_headers(scope), body)
+        except OSError:
+            await _send_json(send, 502, {"detail": f"Worker {worker.name} unavailable"})
+            return
+        headers = [(name, value) for name, value in response.headers if name not in HOP_BY_HOP]
+        headers.append((b"x-shard", worker.name.encode()))
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        try:
+            async for chunk in response.body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            await response.body.aclose()
+        await send({"type": "http.response.body", "body": b""})
+    
+    async def _bulk(self, scope, body: bytes, send) -> None:
+        """Splits a bulk fetch by owner and merges the results in request order."""
+        try:
+            room_ids = json.loads(body)["room_ids"]
+            valid = isinstance(room_ids, list) and all(isinstance(room_id, str) for room_id in room_ids)
+        except (ValueError, KeyError, TypeError):
+            valid = False
+        if not valid or len(room_ids) > 500:
+            # Any worker gives the validation error
+            await self._forward(self._next_worker(), scope, body, send)
+            return
+        
+        groups: Dict[str, List[str]] = {}
+        for room_id in room_ids:
+            groups.setdefault((await self._worker_for(f"/api/game/{room_id}")).name, []).append(room_id)
+        headers = _request_headers(scope)
+        results = await asyncio.gather(*(
+            self._fetch(self.workers[name], "POST", "/api/game/bulk", headers, json.dumps({"room_ids": ids}).encode())
+            for name, ids in groups.items()
+        ))
+        games, missing = {}, set()
+        for status, data in results:
+            if status != 200:
+                await _send_json(send, status, data)
+                return
+            games.update((game["room_id"], game) for game in data["games"])
+            missing.update(data["missing"])
+        await _send_json(send, 200, {
+            "games": [games[room_id] for room_id in room_ids if room_id in games],
+            "missing": [room_id for room_id in room_ids if room_id in missing],
+        })
+    
+    async def _list_rooms(self, scope, send) -> None:
+        """Merges every worker's newest-first page into one page.
+        
+        The cursor is an (updated_at, room_id) key, so it means the same thing
+        on every worker and paging continues across the merged listing.
+        """
+        query = parse_qs(scope["query_string"].decode())
+        try:
+            limit = int(query.get("limit", ["50"])[0])
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= 200:
+            await self._forward(self._next_worker(), scope, b"", send)
+            return
+        
+        headers = _request_headers(scope)
+        results = await asyncio.gather(*(
+            self._fetch(worker, "GET", _target(scope), headers) for worker in list(self.workers.values())
+        ))
+        rooms, more = [], False
+        for status, data in results:
+            if status != 200:
+                await _send_json(send, status, data)
+                return
+            rooms.extend(data["rooms"])
+            more = more or data["next_cursor"] is not None
+        rooms.sort(key=lambda room: (room["updated_at"], room["room_id"]), reverse=True)
+        more = more or len(rooms) > limit
+        rooms = rooms[:limit]
+        next_cursor = None
+        if more:
+            next_cursor = f"{rooms[-1]['updated_at']!r}:{rooms[-1]['room_id']}"
+        await _send_json(send, 200, {"rooms": rooms, "next_cursor": next_cursor})
+    
+    async def _analytics(self, scope, send) -> None:
+        """Sums every worker's shot aggregates (each worker stores its own rooms' shots)."""
+        headers = _request_headers(scope)
+        results = await asyncio.gather(*(
+            self._fetch(worker, "GET", _target(scope), headers) for worker in list(self.workers.values())
+        ))
+        for status, data in results:
+            if status != 200:
+                await _send_json(send, status, data)
+                return
+        if "rollups" in results[0][1]:
+            names = results[0][1]["rollups"]
+            merged = {"rollups": {name: _merge_aggregates([data["rollups"][name] for _, data in results]) for name in names}}
+        else:
+            merged = {"rows": _merge_aggregates([data["rows"] for _, data in results])}
+        await _send_json(send, 200, merged)
+    
+    async def _fetch(self, worker: Worker, method: str, target: str, headers: Headers, body: bytes = b""):
+        response = await worker.pool.request(method, target, headers, body)
+        data = await response.read()
+        return response.status, json.loads(data) if data else None
+    
+    async def _router_endpoint(self, scope, body: bytes, send) -> None:
+        """Worker membership: GET/POST /router/workers, DELETE /router/workers/{name}."""
+        expected = os.getenv("ADMIN_TOKEN")
+        token = _header(scope, b"x-admin-token")
+        if not expected:
+            await _send_json(send, 403, {"detail": "Admin endpoints are disabled"})
+            return
+        if not token or not secrets.compare_digest(token, expected):
+            await _send_json(send, 403, {"detail": "Invalid admin token"})
+            return
+        
+        method, path = scope["method"], scope["path"].rstrip("/")
+        if path == "/router/workers" and method == "GET":
+            await _send_json(send, 200, await self._describe())
+        elif path == "/router/workers" and method == "POST":
+            try:
+                name, moved = await self.add_worker()
+            except RuntimeError as e:
+                await _send_json(send, 500, {"detail": str(e)})
+                return
+            await _send_json(send, 200, {"worker": name, "rooms_moved": moved})
+        elif path.startswith("/router/workers/") and method == "DELETE":
+            name = path.rsplit("/", 1)[1]
+            try:
+                moved = await self.remove_worker(name)
+            except KeyError:
+                await _send_json(send, 404, {"detail": f"Unknown worker {name}"})
+                return
+            except ValueError as e:
+                await _send_json(send, 400, {"detail": str(e)})
+                return
+            await _send_json(send, 200, {"worker": name, "rooms_moved": moved})
+        else:
+            await _send_json(send, 404, {"detail": "Not Found"})
+    
+    async def _describe(self) -> dict:
+        workers = list(self.workers.values())
+        infos = await asyncio.gather(
+            *(self._admin(worker, "GET", "/admin/shard") for worker in workers),
+            return_exceptions=True,
+        )
+        return {
+            "lobby": self.lobby,
+            "ring": self.ring.nodes,
+            "rooms_moving": len(self._moving),
+            "workers": [
+                {
+                    "name": worker.name,
+                    "pid": worker.process.pid,
+                    "alive": worker.process.returncode is None,
+                    "rooms": info[1]["rooms"] if isinstance(info, tuple) else None,
+                }
+                for worker, info in zip(workers, infos)
+            ],
+        }
+    
+    # WebSockets
+    
+    async def _websocket(self, scope, receive, send) -> None:
+        """Relays a WebSocket to the room's owner, passing its close code back
+        so clients reconnect when their room moves."""
+        await receive()  # websocket.connect
+        worker = await self._worker_for(scope["path"])
+        try:
+            upstream = await websockets.unix_connect(worker.socket_path, f"ws://worker{_target(scope)}")
+        except Exception:
+            await send({"type": "websocket.close", "code": 1011})
+            return
+        await send({"type": "websocket.accept"})
+        
+        async def client_to_worker() -> None:
+            while True:
+                message = await receive()
+                if message["type"] != "websocket.receive":
+                    return
+                await upstream.send(message["text"] if message.get("text") is not None else message["bytes"])
+        
+        async def worker_to_client() -> None:
+            try:
+                async for data in upstream:
+                    key = "text" if isinstance(data, str) else "bytes"
+                    await send({"type": "websocket.send", key: data})
+            except websockets.ConnectionClosed:
+                pass
+        
+        from_client = asyncio.ensure_future(client_to_worker())
+        from_worker = asyncio.ensure_future(worker_to_client())
+        done, pending = await asyncio.wait((from_client, from_worker), return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.exception()  # Retrieved so a dropped client isn't reported as an error
+        if from_client in done:
+            await upstream.close()
+        else:
+            code = upstream.close_code
+            if code in (None, 1005):
+                code = 1000
+            elif code == 1006:
+                code = 1011
+            try:
+                await send({"type": "websocket.close", "code": code, "reason": upstream.close_reason or ""})
+            except Exception:
+                pass
+    
+    async def _lifespan(self, receive, send) -> None:
+        await receive()  # lifespan.startup
+        try:
+            await self.start()
+        except Exception as e:
+            await self.stop()
+            await send({"type": "lifespan.startup.failed", "message": str(e)})
+            return
+        await send({"type": "lifespan.startup.complete"})
+        await receive()  # lifespan.shutdown
+        await self.stop()
+        await send({"type": "lifespan.shutdown.complete"})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+_MEASURES = ("attempts", "makes", "points", "fg_pct", "points_per_shot")
+
+
+def _merge_aggregates(row_lists: List[List[dict]]) -> List[dict]:
+    """Adds up analytics rows with the same dimension values and recomputes the rates."""
+    merged: Dict[tuple, dict] = {}
+    for rows in row_lists:
+        for row in rows:
+            key = tuple((name, value) for name, value in row.items() if name not in _MEASURES)
+            total = merged.get(key)
+            if total is None:
+                merged[key] = dict(row)
+            else:
+                for name in ("attempts", "makes", "points"):
+                    total[name] += row[name]
+    for row in merged.values():
+        row["fg_pct"] = row["makes"] / row["attempts"]
+        row["points_per_shot"] = row["points"] / row["attempts"]
+    return [merged[key] for key in sorted(merged)]
+
+
+def _target(scope) -> str:
+    """Path and query string as sent by the client."""
+    path = scope.get("raw_path") or scope["path"].encode()
+    if scope["query_string"]:
+        path += b"?" + scope["query_string"]
+    return path.decode("latin-1")
+
+
+def _request_headers(scope) -> Headers:
+    headers = [(name, value) for name, value in scope["headers"] if name not in REQUEST_SKIP]
+    if scope.get("client"):
+        headers.append((b"x-forwarded-for", scope["client"][0].encode()))
+    return headers
+
+
+async def _send_json(send, status: int, data) -> None:
+    body = json.dumps(data).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run backend workers behind a room-affinity router")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args(argv)
+    
+    load_dotenv()
+    uvicorn.run(ShardRouter(args.workers, log_level=args.log_level), host=args.host, port=args.port, log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
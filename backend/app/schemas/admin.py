@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+
+
+class ProfileCaptureRequest(BaseModel):
+    """Schema for arming a profile capture."""
+    target_type: Literal["route", "room"]
+    target: str  # Route template (e.g. "/api/game/{room_id}/power") or room_id
+    count: int = Field(default=1, ge=1, le=1000)
+    mode: Literal["cprofile", "sampling"] = "cprofile"
+    interval_ms: float = Field(default=1.0, gt=0)  # Sampling interval
+
+
+class PhaseTimingRequest(BaseModel):
+    """Schema for toggling phase timing."""
+    enabled: bool
+    reset: bool = False
+
+
+class ShardRingUpdate(BaseModel):
+    """Schema for replacing a worker's view of the shard ring."""
+    nodes: List[str] = Field(min_length=1)
+
+
+class RoomHandoff(BaseModel):
+    """Schema for a room moving between workers (from the handoff endpoint)."""
+    game: Dict[str, Any]  # Game.to_dict()
+    bot: Optional[Dict[str, Any]] = None  # BotService.add_seat arguments
+    idempotency: List[List[Any]] = []  # IdempotencyCache.export()
+    career: Dict[str, List[List[Any]]] = {}  # CareerStore.export_room()
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Any
 from app.models.offense import ShotType
 from app.models.defense import DefenseType
@@ -16,8 +16,17 @@ class PlayerSchema(BaseModel):
 
 class GameCreate(BaseModel):
     """Schema for creating a new game."""
-    player_one_name: str = "Player 1"
-    player_two_name: str = "Player 2"
+    # Bounded so names fit the u16 length prefixes of snapshots and replay exports
+    player_one_name: str = Field(default="Player 1", max_length=50)
+    player_two_name: str = Field(default="Player 2", max_length=50)
+
+
+class BotGameCreate(BaseModel):
+    """Schema for creating a single-player game against a server-side bot."""
+    player_name: str = Field(default="Player 1", max_length=50)
+    bot_name: str = Field(default="Bot", max_length=50)
+    policy: str = "greedy"  # Key in bot_service.POLICIES
+    think_time_ms: int = Field(default=800, ge=0, le=10000)
 
 
 class ShotRequest(BaseModel):
@@ -39,7 +48,7 @@ class DefenseRequest(BaseModel):
 
 class PowerRequest(BaseModel):
     """Schema for power selection. Now supports timing data."""
-    power: int
+    power: int = Field(ge=0, le=100)
     # Timing data from frontend timing meter
     timing_grade: Optional[str] = None  # "PERFECT", "GOOD", "MISS"
     timing_error: Optional[float] = None  # 0.0 to 1.0
@@ -95,3 +104,24 @@ class GameResponse(BaseModel):
     message: str
     game_state: GameStateResponse
 
+
+class BulkGameRequest(BaseModel):
+    """Schema for fetching many rooms at once."""
+    room_ids: list[str] = Field(max_length=500)
+
+
+class RoomSummarySchema(BaseModel):
+    """Schema for a room in listings."""
+    room_id: str
+    state: str
+    player_one: PlayerSchema
+    player_two: PlayerSchema
+    version: int
+    created_at: float
+    updated_at: float
+
+
+class RoomListResponse(BaseModel):
+    """Schema for a page of rooms, most recently active first."""
+    rooms: list[RoomSummarySchema]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class MatchmakingRequest(BaseModel):
+    """Schema for joining the matchmaking queue."""
+    player_name: str = Field(min_length=1, max_length=50)
+    skill: Optional[int] = Field(default=None, ge=0, le=5000)  # Omit to match with anyone unrated
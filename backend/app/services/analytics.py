@@ -0,0 +1,454 @@
+"""Columnar store of every shot taken, with aggregate queries and rollups.
+
+Each resolved shot is appended as one row across typed columns (timestamp,
+archetype, subtype, zone, contest, made, points, player). Rows fill
+fixed-size partitions; sealed partitions beyond MAX_RESIDENT are spilled to
+files and read back through memory maps, so memory stays bounded however
+many shots are stored.
+
+Queries scan columns with C-level iteration (zip / compress / Counter over
+arrays and memoryviews) rather than per-row Python code, and skip whole
+partitions outside the requested time range. The dashboard rollups are
+maintained on every append, so reading them costs nothing.
+
+Appends run on the event loop; query and trend may run on other threads.
+A scan takes a snapshot of the partitions and their row counts under the
+store's lock, so rows appended (or partitions sealed and spilled) while it
+runs are not seen, and close() waits for running scans before unmapping.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from itertools import compress, repeat
+from operator import and_, eq, floordiv
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.models.events import GameEvent, ShotResolved
+from app.services.metrics import metrics
+from app.services.snapshot import ARCHETYPES, CONTESTS, SUBTYPES, ZONES
+
+# Column name -> array typecode. Stored in this order in spilled files, the
+# 8-byte column first so every column stays aligned.
+COLUMNS = (
+    ("timestamp", "d"),
+    ("player", "I"),
+    ("archetype", "B"),
+    ("subtype", "B"),
+    ("zone", "B"),
+    ("contest", "B"),
+    ("made", "B"),
+    ("points", "B"),
+)
+# Columns that can be grouped and filtered by, with their code tables
+# ("player" uses the store's name table)
+DIMENSIONS = {
+    "archetype": [archetype.value for archetype in ARCHETYPES],
+    "subtype": SUBTYPES,
+    "zone": [zone.value for zone in ZONES],
+    "contest": [contest.value for contest in CONTESTS],
+    "player": None,
+}
+_CODES = {
+    name: {value: code for code, value in enumerate(values)}
+    for name, values in DIMENSIONS.items()
+    if values is not None
+}
+HOUR = 3600
+
+# Dashboard rollups: name -> dimensions ("hour" buckets the timestamp)
+ROLLUPS = {
+    "zone_contest": ("zone", "contest"),
+    "subtype": ("subtype",),
+    "archetype": ("archetype",),
+    "hourly": ("hour",),
+}
+
+SHOTS_STORED = metrics.counter("analytics_shots_total", "Shots appended to the analytics store")
+metrics.gauge("analytics_mapped_partitions", "Analytics partitions spilled to memory-mapped files").set_function(
+    lambda: len(shot_store.mapped) if shot_store is not None else 0
+)
+
+_MAGIC = b"BBSHOTS\x00"
+# magic, format version, padding, row count
+_PARTITION_HEADER = struct.Struct("<8sHHI")
+FORMAT_VERSION = 1
+
+
+class Partition:
+    """A run of shots, column by column, in timestamp order."""
+    
+    def __init__(self, columns: Dict[str, Sequence], mapped: Optional[mmap.mmap] = None, path: Optional[str] = None):
+        self.columns = columns
+        self.mapped = mapped
+        self.path = path
+    
+    @classmethod
+    def empty(cls) -> "Partition":
+        return cls({name: array(typecode) for name, typecode in COLUMNS})
+    
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+    
+    def append(self, row: Tuple) -> None:
+        for (name, _), value in zip(COLUMNS, row):
+            self.columns[name].append(value)
+    
+    def span(self, since: Optional[float], until: Optional[float], rows: int) -> Tuple[int, int]:
+        """Range of the first `rows` rows with since <= timestamp < until."""
+        timestamps = self.columns["timestamp"]
+        start = 0 if since is None else bisect_left(timestamps, since, 0, rows)
+        stop = rows if until is None else bisect_left(timestamps, until, 0, rows)
+        return start, stop
+    
+    def spill(self, path: str) -> "Partition":
+        """Writes the columns to `path` and returns the memory-mapped partition."""
+        with open(path, "wb") as f:
+            f.write(_PARTITION_HEADER.pack(_MAGIC, FORMAT_VERSION, 0, len(self)))
+            for name, _ in COLUMNS:
+                column = self.columns[name]
+                if sys.byteorder != "little":
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                f.write(column.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return Partition.load(path)
+    
+    @classmethod
+    def load(cls, path: str) -> "Partition":
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, rows = _PARTITION_HEADER.unpack_from(mapped)
+        if magic != _MAGIC or version != FORMAT_VERSION:
+            mapped.close()
+            raise ValueError(f"{path} is not a shot partition")
+        view = memoryview(mapped)
+        columns = {}
+        offset = _PARTITION_HEADER.size
+        for name, typecode in COLUMNS:
+            size = rows * array(typecode).itemsize
+            columns[name] = view[offset:offset + size].cast(typecode)
+            offset += size
+        return cls(columns, mapped, path)
+    
+    def close(self) -> None:
+        if self.mapped is not None:
+            for column in self.columns.values():
+                column.release()
+            self.mapped.close()
+            self.mapped = None
+
+
+class Aggregate:
+    """Attempts, makes and points scored per group key."""
+    __slots__ = ("attempts", "makes", "points")
+    
+    def __init__(self):
+        self.attempts: Counter = Counter()
+        self.makes: Counter = Counter()
+        self.points: Counter = Counter()
+    
+    def add(self, key: Tuple, made: int, points: int) -> None:
+        self.attempts[key] += 1
+        if made:
+            self.makes[key] += 1
+            self.points[key] += points
+
+
+class ShotStore:
+    """Append-only columnar shot table with aggregate queries.
+    
+    Partitions hold ROWS shots. Once more than MAX_RESIDENT sealed
+    partitions are in memory, the oldest is written to `directory` and
+    memory-mapped. A store opened on a directory with partition files
+    serves them (and their rollups) as history.
+    """
+    
+    ROWS = 65536
+    MAX_RESIDENT = 4
+    
+    def __init__(self, directory: Optional[str] = None, rows: Optional[int] = None, max_resident: Optional[int] = None):
+        self.directory = directory
+        self.rows = rows or self.ROWS
+        self.max_resident = self.MAX_RESIDENT if max_resident is None else max_resident
+        self.mapped: List[Partition] = []  # Spilled, oldest first
+        self.resident: List[Partition] = []  # Sealed but in memory
+        self.active = Partition.empty()
+        self.players: List[str] = []
+        self._player_ids: Dict[str, int] = {}
+        self.rollups: Dict[str, Aggregate] = {name: Aggregate() for name in ROLLUPS}
+        # Guards the partition lists and the active partition's row count
+        # against scans on other threads; reentrant for close()'s spills
+        self._lock = threading.Condition(threading.RLock())
+        self._scans = 0
+        if directory is not None:
+            self._load()
+    
+    # Writing
+    
+    def on_game_event(self, event: GameEvent) -> None:
+        """GameService listener: stores each resolved shot."""
+        if isinstance(event, ShotResolved):
+            self.append(
+                event.timestamp,
+                event.player,
+                event.archetype,
+                event.subtype,
+                event.zone,
+                event.contest_level,
+                event.made,
+                event.points,
+            )
+    
+    def append(
+        self,
+        timestamp: float,
+        player: str,
+        archetype: str,
+        subtype: str,
+        zone: str,
+        contest: str,
+        made: bool,
+        points: int,
+    ) -> None:
+        player_id = self._player_ids.get(player)
+        if player_id is None:
+            player_id = self._player_ids[player] = len(self.players)
+            self.players.append(player)
+        codes = _CODES
+        row = (
+            timestamp,
+            player_id,
+            codes["archetype"][archetype],
+            codes["subtype"][subtype],
+            codes["zone"][zone],
+            codes["contest"][contest],
+            int(made),
+            points,
+        )
+        with self._lock:
+            self.active.append(row)
+        self._roll_up(row)
+        SHOTS_STORED.inc()
+        if len(self.active) >= self.rows:
+            self._seal()
+    
+    def _roll_up(self, row: Tuple) -> None:
+        timestamp, _, archetype, subtype, zone, contest, made, points = row
+        rollups = self.rollups
+        rollups["zone_contest"].add((zone, contest), made, points)
+        rollups["subtype"].add((subtype,), made, points)
+        rollups["archetype"].add((archetype,), made, points)
+        rollups["hourly"].add((int(timestamp // HOUR),), made, points)
+    
+    def _seal(self) -> None:
+        with self._lock:
+            self.resident.append(self.active)
+            self.active = Partition.empty()
+        while len(self.resident) > self.max_resident:
+            self._spill(self.resident[0])
+    
+    def _spill(self, partition: Partition) -> None:
+        """Writes a resident (or, on close, the active) partition to a file and maps it."""
+        if self.directory is None:
+            # Nowhere configured to keep them: spill to a scratch directory
+            self.directory = tempfile.mkdtemp(prefix="shot-store-")
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"shots-{len(self.mapped):08d}.col")
+        mapped = partition.spill(path)
+        # Swap in one step, so a scan sees the rows exactly once
+        with self._lock:
+            self.mapped.append(mapped)
+            if self.resident and self.resident[0] is partition:
+                self.resident.pop(0)
+        self._save_players()
+    
+    def _save_players(self) -> None:
+        path = os.path.join(self.directory, "players.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.players, f)
+        os.replace(path + ".tmp", path)
+    
+    def _load(self) -> None:
+        """Maps the partitions spilled by an earlier run and rebuilds the rollups."""
+        if not os.path.isdir(self.directory):
+            return
+        players_path = os.path.join(self.directory, "players.json")
+        if os.path.exists(players_path):
+            with open(players_path, encoding="utf-8") as f:
+                self.players = json.load(f)
+            self._player_ids = {name: index for index, name in enumerate(self.players)}
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith("shots-") and name.endswith(".col"))
+        self.mapped = [Partition.load(os.path.join(self.directory, name)) for name in names]
+        partitions = [(partition, len(partition)) for partition in self.mapped]
+        for name, dimensions in ROLLUPS.items():
+            self.rollups[name] = self._aggregate(dimensions, partitions)
+    
+    def close(self) -> None:
+        """Spills the unsealed rows (when a directory is configured) and unmaps
+        files, once running scans have finished."""
+        with self._lock:
+            self._lock.wait_for(lambda: not self._scans)
+            if self.directory is not None:
+                for partition in self.resident + ([self.active] if len(self.active) else []):
+                    self._spill(partition)
+                self.resident = []
+                self.active = Partition.empty()
+            for partition in self.mapped:
+                partition.close()
+            self.mapped = []
+    
+    # Queries
+    
+    @contextmanager
+    def _scan(self) -> Iterator[List[Tuple[Partition, int]]]:
+        """Every partition with its row count as of now; close() waits for the scan."""
+        with self._lock:
+            self._scans += 1
+            partitions = [(partition, len(partition)) for partition in self.mapped + self.resident + [self.active]]
+        try:
+            yield partitions
+        finally:
+            with self._lock:
+                self._scans -= 1
+                if not self._scans:
+                    self._lock.notify_all()
+    
+    def _aggregate(
+        self,
+        group_by: Sequence[str],
+        partitions: Iterable[Tuple[Partition, int]],
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        where: Optional[Dict[str, int]] = None,
+        interval: float = HOUR,
+    ) -> Aggregate:
+        result = Aggregate()
+        for partition, rows in partitions:
+            start, stop = partition.span(since, until, rows)
+            if start >= stop:
+                continue
+            columns = partition.columns
+            made = columns["made"][start:stop]
+            points = columns["points"][start:stop]
+            keyed = []
+            for dimension in group_by:
+                if dimension == "hour":
+                    keyed.append(map(int, map(floordiv, columns["timestamp"][start:stop], repeat(interval))))
+                else:
+                    keyed.append(columns[dimension][start:stop])
+            keys = list(zip(*keyed)) if keyed else [()] * (stop - start)
+            if where:
+                selector = None
+                for dimension, code in where.items():
+                    matches = map(eq, columns[dimension][start:stop], repeat(code))
+                    selector = matches if selector is None else map(and_, selector, matches)
+                selector = bytes(selector)
+                keys = list(compress(keys, selector))
+                made = bytes(compress(made, selector))
+                points = bytes(compress(points, selector))
+            result.attempts.update(keys)
+            result.makes.update(compress(keys, made))
+            for (key, value), count in Counter(compress(zip(keys, points), made)).items():
+                result.points[key] += value * count
+        return result
+    
+    def _where(self, filters: Dict[str, str]) -> Optional[Dict[str, int]]:
+        """Filter values as column codes; None if a value never occurs."""
+        where = {}
+        for dimension, value in filters.items():
+            if dimension == "player":
+                code = self._player_ids.get(value)
+            else:
+                code = _CODES[dimension].get(value)
+            if code is None:
+                return None
+            where[dimension] = code
+        return where
+    
+    def _label(self, dimension: str, code: int, interval: float = HOUR) -> Any:
+        if dimension == "hour":
+            return code * interval
+        if dimension == "player":
+            return self.players[code]
+        return DIMENSIONS[dimension][code]
+    
+    def _rows(self, group_by: Sequence[str], aggregate: Aggregate, interval: float = HOUR) -> List[Dict[str, Any]]:
+        rows = []
+        for key in sorted(aggregate.attempts):
+            attempts = aggregate.attempts[key]
+            makes = aggregate.makes[key]
+            points = aggregate.points[key]
+            row = {
+                ("time" if dimension == "hour" else dimension): self._label(dimension, code, interval)
+                for dimension, code in zip(group_by, key)
+            }
+            row.update(
+                attempts=attempts,
+                makes=makes,
+                points=points,
+                fg_pct=makes / attempts,
+                points_per_shot=points / attempts,
+            )
+            rows.append(row)
+        return rows
+    
+    def query(
+        self,
+        group_by: Sequence[str] = (),
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        filters: Optional[Dict[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Attempts, makes, FG%, points and points per shot for each group.
+        
+        `group_by` and `filters` use DIMENSIONS names; filter values are
+        the enum values (or player names).
+        """
+        where = self._where(filters or {})
+        if where is None:
+            return []
+        with self._scan() as partitions:
+            aggregate = self._aggregate(group_by, partitions, since, until, where)
+        return self._rows(group_by, aggregate)
+    
+    def trend(
+        self,
+        interval: float = HOUR,
+        group_by: Sequence[str] = (),
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        filters: Optional[Dict[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Like query, with rows per `interval` seconds (labelled "time")."""
+        where = self._where(filters or {})
+        if where is None:
+            return []
+        dimensions = ("hour", *group_by)
+        with self._scan() as partitions:
+            aggregate = self._aggregate(dimensions, partitions, since, until, where, interval)
+        return self._rows(dimensions, aggregate, interval)
+    
+    def dashboard(self) -> Dict[str, List[Dict[str, Any]]]:
+        """The incrementally maintained rollups."""
+        return {name: self._rows(ROLLUPS[name], self.rollups[name]) for name in ROLLUPS}
+
+
+# Singleton instance (configured from ANALYTICS_DIR on first use, after .env is loaded)
+shot_store: Optional[ShotStore] = None
+
+
+def get_shot_store() -> ShotStore:
+    """Get or create the shot store."""
+    global shot_store
+    if shot_store is None:
+        shot_store = ShotStore(os.getenv("ANALYTICS_DIR") or None)
+    return shot_store
@@ -0,0 +1,297 @@
+"""Broadcast backplane: carries room frames to the sockets on every worker.
+
+A state change is serialized once into a frame and published for its room.
+The publishing worker queues it for its own sockets; the backplane carries
+it to every other worker, which fans it out to its local sockets. Publishing
+never waits for a socket, so it is safe under a room's lock.
+
+Frames for a room are delivered in publish order: each room has one
+publisher at a time (its owning worker), the broker relays each connection's
+frames in the order it read them, and receiving workers send a room's frames
+to its sockets one after another.
+"""
+import asyncio
+import contextvars
+import os
+import struct
+import sys
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+from app.services.metrics import metrics
+
+FRAMES_PUBLISHED = metrics.counter(
+    "backplane_frames_published_total",
+    "Room frames handed to the backplane",
+    ("transport",),
+)
+FRAMES_RECEIVED = metrics.counter(
+    "backplane_frames_received_total",
+    "Room frames received from other workers",
+    ("transport",),
+)
+FRAMES_DROPPED = metrics.counter(
+    "backplane_frames_dropped_total",
+    "Frames that could not be sent to the broker",
+    ("transport",),
+)
+
+# Delivers a frame to the local sockets in a room
+Subscriber = Callable[[str, str], Awaitable[None]]
+
+# Wire format: total length, room id length, room id, frame (UTF-8)
+_HEADER = struct.Struct(">IH")
+
+
+def encode_frame(room_id: str, frame: str) -> bytes:
+    room = room_id.encode()
+    payload = frame.encode()
+    return _HEADER.pack(2 + len(room) + len(payload), len(room)) + room + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Reads one encoded frame, header included (so the broker can relay it as is)."""
+    head = await reader.readexactly(_HEADER.size)
+    length, _ = _HEADER.unpack(head)
+    return head + await reader.readexactly(length - 2)
+
+
+def decode_frame(data: bytes):
+    """Returns (room_id, frame) from an encoded frame."""
+    _, room_length = _HEADER.unpack_from(data)
+    start = _HEADER.size
+    return data[start:start + room_length].decode(), data[start + room_length:].decode()
+
+
+class Backplane:
+    """Publishes room frames to every worker's subscriber."""
+    transport = "base"
+    
+    def __init__(self):
+        self.subscriber: Optional[Subscriber] = None
+        # room_id -> frames not yet sent to local sockets, with the context a
+        # frame was queued in if it differs from its delivery task's
+        self._pending: Dict[str, Deque[Tuple[str, Optional[contextvars.Context]]]] = {}
+        self._deliveries: Set[asyncio.Task] = set()
+    
+    async def start(self) -> None:
+        pass
+    
+    async def stop(self) -> None:
+        pass
+    
+    async def publish(self, room_id: str, frame: str) -> None:
+        """Sends a frame to the room's sockets on this worker and every other one.
+        
+        Returns once the frame is queued, without waiting for any socket.
+        """
+        FRAMES_PUBLISHED.inc(self.transport)
+        self._send_remote(room_id, frame)
+        self._queue(room_id, frame)
+    
+    async def drain(self) -> None:
+        """Waits until every queued frame has been delivered to local sockets."""
+        while self._deliveries:
+            for task in list(self._deliveries):
+                try:
+                    await task
+                except Exception:
+                    # A failed delivery has nothing left to wait for
+                    pass
+    
+    def _send_remote(self, room_id: str, frame: str) -> None:
+        pass
+    
+    def _receive(self, room_id: str, frame: str) -> None:
+        """Queues a frame from another worker behind the room's earlier ones."""
+        FRAMES_RECEIVED.inc(self.transport)
+        self._queue(room_id, frame)
+    
+    def _queue(self, room_id: str, frame: str) -> None:
+        """Queues a frame for the local sockets behind the room's earlier ones.
+        
+        Rooms are delivered concurrently; a room's frames one at a time, each
+        in the context it was queued from (so a request's broadcast is traced
+        on that request's turn).
+        """
+        pending = self._pending.get(room_id)
+        if pending is not None:
+            pending.append((frame, contextvars.copy_context()))
+            return
+        # The delivery task starts in this context, so the first frame needs no copy
+        self._pending[room_id] = deque([(frame, None)])
+        task = asyncio.get_running_loop().create_task(self._deliver(room_id))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+    
+    async def _deliver(self, room_id: str) -> None:
+        pending = self._pending[room_id]
+        loop = asyncio.get_running_loop()
+        try:
+            while pending:
+                frame, context = pending.popleft()
+                if self.subscriber is None:
+                    continue
+                if context is None:
+                    await self.subscriber(room_id, frame)
+                else:
+                    await loop.create_task(self.subscriber(room_id, frame), context=context)
+        finally:
+            del self._pending[room_id]
+
+
+class InProcessBackplane(Backplane):
+    """Single-process deployments: local delivery only."""
+    transport = "memory"
+
+
+class UnixSocketBackplane(Backplane):
+    """Relays frames through a BackplaneBroker on a Unix socket.
+    
+    Publishing only writes to the socket buffer. If the broker is unreachable
+    frames for other workers are dropped (and counted) while the connection
+    is retried in the background.
+    """
+    transport = "unix"
+    
+    RECONNECT_DELAY = 0.5
+    
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+    
+    async def start(self) -> None:
+        if self._reader_task is None:
+            self._reader_task = asyncio.get_running_loop().create_task(self._run())
+            # Give the first connection a moment so early frames aren't dropped
+            try:
+                await asyncio.wait_for(self._connected.wait(), 5.0)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def stop(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+    
+    def _send_remote(self, room_id: str, frame: str) -> None:
+        if self._writer is None or self._writer.is_closing():
+            FRAMES_DROPPED.inc(self.transport)
+            return
+        self._writer.write(encode_frame(room_id, frame))
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(self.RECONNECT_DELAY)
+                continue
+            self._connected.set()
+            try:
+                while True:
+                    self._receive(*decode_frame(await read_frame(reader)))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            finally:
+                self._writer.close()
+                self._writer = None
+                self._connected.clear()
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+
+class BackplaneBroker:
+    """Relays every frame a worker sends to all the other connected workers.
+    
+    Frames are forwarded without decoding. A worker whose socket buffer grows
+    past MAX_BUFFERED (it stopped reading) is disconnected rather than letting
+    the broker's memory grow; it reconnects and carries on from new frames.
+    """
+    
+    MAX_BUFFERED = 16 * 1024 * 1024
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+    
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+    
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                data = await read_frame(reader)
+                for other in list(self._writers):
+                    if other is writer:
+                        continue
+                    if other.transport.get_write_buffer_size() > self.MAX_BUFFERED:
+                        self._writers.discard(other)
+                        other.close()
+                        continue
+                    other.write(data)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+def create_backplane(spec: str) -> Backplane:
+    """Builds a backplane from a spec: "memory" or "unix:<broker socket path>"."""
+    if spec in ("memory", ""):
+        return InProcessBackplane()
+    if spec.startswith("unix:"):
+        return UnixSocketBackplane(spec[len("unix:"):])
+    raise ValueError(f"Unknown backplane: {spec}")
+
+
+# Singleton instance (configured from BACKPLANE on first use, after .env is loaded)
+backplane: Optional[Backplane] = None
+
+
+def get_backplane() -> Backplane:
+    """Get or create the backplane instance."""
+    global backplane
+    if backplane is None:
+        backplane = create_backplane(os.getenv("BACKPLANE", "memory"))
+    return backplane
+
+
+async def _serve_broker(path: str) -> None:
+    broker = BackplaneBroker(path)
+    await broker.start()
+    print(f"Backplane broker listening on {path}", file=sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await broker.stop()
+
+
+if __name__ == "__main__":
+    # python -m app.services.backplane /tmp/basketball-backplane.sock
+    try:
+        asyncio.run(_serve_broker(sys.argv[1] if len(sys.argv) > 1 else "/tmp/basketball-backplane.sock"))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,258 @@
+"""Server-side bot opponents.
+
+A bot seat is a Player in a room whose decisions are made by a policy. Seats
+are driven by GameService transition events: when a transition hands the
+bot a decision, a single loop.call_later timer is armed for its think time.
+No task runs per seat, so thousands of idle seats cost only their entries in
+a dict.
+
+When the timer fires, the move goes through the same path as an HTTP action
+(apply_action): under the room's lock, with tracing and state checks, and
+published in version order with the room's other frames.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple, Type
+
+from app.models.defense import DefenseType
+from app.models.events import GameEvent, GameTransitionEvent, GameDeleted, RoomHandedOff
+from app.models.game import Game, GameState
+from app.models.offense import Offense, ShotType
+from app.models.shot_archetypes import ShotArchetype, ShotZone
+from app.services.game_service import game_service
+from app.services.metrics import metrics
+from app.services.room_concurrency import room_locks
+
+BOT_ACTIONS = metrics.counter(
+    "bot_actions_total",
+    "Decisions made by bot seats",
+    ("policy", "action"),
+)
+BOT_DECISION_TIME = metrics.histogram(
+    "bot_decision_seconds",
+    "Time spent choosing and applying a bot action",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+
+SHOT_TYPES = [ShotType.LAYUP, ShotType.MIDRANGE, ShotType.THREE_POINTER, ShotType.HALF_COURT]
+DEFENSE_TYPES = [DefenseType.CONTEST, DefenseType.BLOCK, DefenseType.STEAL, DefenseType.DEFAULT]
+
+# (power, timing_grade, timing_error)
+PowerChoice = Tuple[int, Optional[str], Optional[float]]
+
+# Runs a move (room_id, action, mutate) under the room's lock and publishes
+# the result; True if mutate applied it
+MoveRunner = Callable[[str, str, Callable[[], bool]], Awaitable[bool]]
+
+
+class BotPolicy:
+    """Decision plug-in for a bot seat."""
+    name = "base"
+    
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+    
+    def choose_shot(self, game: Game) -> ShotType:
+        raise NotImplementedError
+    
+    def choose_defense(self, game: Game) -> DefenseType:
+        raise NotImplementedError
+    
+    def choose_power(self, game: Game) -> PowerChoice:
+        raise NotImplementedError
+
+
+class RandomPolicy(BotPolicy):
+    """Uniformly random choices; a casual opponent."""
+    name = "random"
+    
+    def choose_shot(self, game: Game) -> ShotType:
+        return self.rng.choice(SHOT_TYPES)
+    
+    def choose_defense(self, game: Game) -> DefenseType:
+        return self.rng.choice(DEFENSE_TYPES)
+    
+    def choose_power(self, game: Game) -> PowerChoice:
+        grade = self.rng.choice(["PERFECT", "GOOD", "GOOD", "MISS", "MISS"])
+        return self.rng.randint(20, 80), grade, round(self.rng.random(), 2)
+
+
+class GreedyPolicy(BotPolicy):
+    """Takes the shot with the best expected points against the current
+    defense state and times its release well most of the time."""
+    name = "greedy"
+    
+    PERFECT_RATE = 0.35
+    MISS_RATE = 0.15
+    
+    def __init__(self, rng: Optional[random.Random] = None):
+        super().__init__(rng)
+        self.offense = Offense()
+        # Best shot by (wing contest level, fatigue, streak): the only inputs
+        # to the make percentage that vary between turns
+        self._best_shots: Dict[tuple, ShotType] = {}
+    
+    def choose_shot(self, game: Game) -> ShotType:
+        player = game.current_offensive_player
+        contest = game.defense_state.contest_distribution.get(ShotZone.WING) if game.defense_state else None
+        key = (contest, player.get_fatigue(), player.get_hot_streak())
+        best = self._best_shots.get(key)
+        if best is None:
+            best = self._best_shots[key] = self._best_expected_points(game)
+        return best
+    
+    def _best_expected_points(self, game: Game) -> ShotType:
+        player = game.current_offensive_player
+        best, best_points = SHOT_TYPES[0], -1.0
+        for shot_type in SHOT_TYPES:
+            context = game_service._create_shot_context_from_legacy(
+                shot_type, DefenseType.DEFAULT, game.defense_state
+            )
+            points = 2 if context.archetype in (ShotArchetype.RIM, ShotArchetype.PAINT, ShotArchetype.MIDRANGE) else 3
+            expected = points * self.offense.calculate_make_percentage(context, player, game.defense_state)
+            if expected > best_points:
+                best, best_points = shot_type, expected
+        return best
+    
+    def choose_defense(self, game: Game) -> DefenseType:
+        # Contest jump shots, protect the rim against layups
+        return DefenseType.BLOCK if game.shot_type == ShotType.LAYUP else DefenseType.CONTEST
+    
+    def choose_power(self, game: Game) -> PowerChoice:
+        roll = self.rng.random()
+        if roll < self.PERFECT_RATE:
+            grade = "PERFECT"
+        elif roll < 1 - self.MISS_RATE:
+            grade = "GOOD"
+        else:
+            grade = "MISS"
+        return 50, grade, round(self.rng.random() * 0.5, 2)
+
+
+POLICIES: Dict[str, Type[BotPolicy]] = {
+    RandomPolicy.name: RandomPolicy,
+    GreedyPolicy.name: GreedyPolicy,
+}
+
+
+def register_policy(policy: Type[BotPolicy]) -> None:
+    """Makes a policy class available to create_bot_game by its `name`."""
+    POLICIES[policy.name] = policy
+
+
+@dataclass
+class BotSeat:
+    """A bot playing one side of a room."""
+    room_id: str
+    player_name: str
+    policy: BotPolicy
+    think_time: float  # Mean seconds before acting
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class BotService:
+    """Schedules bot decisions from GameService transition events."""
+    
+    THINK_JITTER = 0.5  # Think time varies by +/- this fraction
+    
+    def __init__(self):
+        self.seats: Dict[str, BotSeat] = {}
+        # Replaced at startup by the API's apply path, which also publishes
+        # the new state; this default only takes the lock
+        self.run_move: MoveRunner = self._run_unpublished
+        self._rng = random.Random()
+        self._moves: Set[asyncio.Task] = set()
+    
+    def add_seat(self, room_id: str, player_name: str, policy: str = "greedy", think_time: float = 1.0) -> BotSeat:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown bot policy: {policy}")
+        seat = BotSeat(room_id, player_name, POLICIES[policy](), think_time)
+        self.seats[room_id] = seat
+        self._schedule(seat)
+        return seat
+    
+    def remove_seat(self, room_id: str) -> None:
+        seat = self.seats.pop(room_id, None)
+        if seat is not None and seat.timer is not None:
+            seat.timer.cancel()
+    
+    def on_game_event(self, event: GameEvent) -> None:
+        """GameService listener: re-arms the seat's timer after each transition."""
+        seat = self.seats.get(event.room_id)
+        if seat is None:
+            return
+        if isinstance(event, (GameDeleted, RoomHandedOff)):
+            self.remove_seat(event.room_id)
+        elif isinstance(event, GameTransitionEvent):
+            if event.to_state == GameState.GAME_OVER.value:
+                self.remove_seat(event.room_id)
+            else:
+                self._schedule(seat)
+    
+    def _pending_action(self, seat: BotSeat, game: Game) -> Optional[str]:
+        """The action the bot owes in the game's current state, if any."""
+        offense = game.current_offensive_player.name == seat.player_name
+        if game.state == GameState.WAITING_FOR_SHOT.value and offense:
+            return "shot"
+        if game.state == GameState.WAITING_FOR_DEFENSE.value and not offense:
+            return "defense"
+        if game.state == GameState.WAITING_FOR_POWER.value and offense:
+            return "power"
+        return None
+    
+    def _schedule(self, seat: BotSeat) -> None:
+        if seat.timer is not None:
+            seat.timer.cancel()
+            seat.timer = None
+        game = game_service.get_game(seat.room_id)
+        if game is None or self._pending_action(seat, game) is None:
+            return
+        delay = seat.think_time * (1 + self._rng.uniform(-self.THINK_JITTER, self.THINK_JITTER))
+        seat.timer = asyncio.get_running_loop().call_later(delay, self._act, seat, game.version)
+    
+    def _act(self, seat: BotSeat, version: int) -> None:
+        seat.timer = None
+        game = game_service.get_game(seat.room_id)
+        if game is None or game.version != version:
+            # Something else moved the game on; the transition re-armed us
+            return
+        action = self._pending_action(seat, game)
+        if action is None:
+            return
+        task = asyncio.get_running_loop().create_task(self._move(seat, action, version))
+        # Keep a reference until the move is done
+        self._moves.add(task)
+        task.add_done_callback(self._moves.discard)
+    
+    async def _move(self, seat: BotSeat, action: str, version: int) -> None:
+        def mutate() -> bool:
+            game = game_service.get_game(seat.room_id)
+            if game is None or game.version != version:
+                # Moved on while we waited for the lock; the transition re-armed us
+                return False
+            start = time.perf_counter()
+            if action == "shot":
+                acted = game_service.select_shot(seat.room_id, seat.policy.choose_shot(game))
+            elif action == "defense":
+                acted = game_service.select_defense(seat.room_id, seat.policy.choose_defense(game))
+            else:
+                power, grade, error = seat.policy.choose_power(game)
+                acted = game_service.select_power(seat.room_id, power, timing_grade=grade, timing_error=error)
+            BOT_DECISION_TIME.observe(time.perf_counter() - start)
+            return acted
+        
+        if await self.run_move(seat.room_id, action, mutate):
+            BOT_ACTIONS.inc(seat.policy.name, action)
+    
+    @staticmethod
+    async def _run_unpublished(room_id: str, action: str, mutate: Callable[[], bool]) -> bool:
+        async with room_locks.hold(room_id):
+            return mutate()
+
+
+# Singleton instance
+bot_service = BotService()
+
+metrics.gauge("bot_seats", "Rooms with a bot seat").set_function(lambda: len(bot_service.seats))
@@ -0,0 +1,413 @@
+"""Career profiles: every player's shooting and results across all their games.
+
+A profile holds games played and won, and attempts and makes per
+(archetype, zone, contest level). Shots are tallied per room as they
+resolve and folded into both players' profiles when the game ends;
+abandoned games don't count. A room moving to another worker takes its
+tallies along (export_room / load_room).
+
+Finished games are queued and written to SQLite by a background thread,
+one transaction per batch, with each player's games in the batch merged
+into one upsert per row. Profiles are read through an LRU cache that
+finished games update in place, and both players' profiles are loaded in
+the background when a game is created, so game creation and the coach
+never wait on disk.
+
+Several workers can share one database file (SQLite serializes their
+writes). A worker's cached profile then misses games finished on other
+workers until it is reloaded, which happens whenever that player starts
+a new game here. The profile API reads through load(), so it only misses
+games still queued on other workers.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.models.events import GameCreated, GameDeleted, GameEvent, GameOver, RoomHandedOff, ServiceError, ShotResolved
+from app.services.event_log import get_event_log
+from app.services.metrics import metrics
+
+CACHE_REQUESTS = metrics.counter(
+    "career_cache_requests_total",
+    "Career profile lookups by cache result",
+    ("result",),
+)
+BATCH_SIZE = metrics.histogram(
+    "career_write_batch_players",
+    "Player profiles updated per SQLite transaction",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+WRITE_SECONDS = metrics.histogram(
+    "career_write_seconds",
+    "Time spent writing a batch of career updates",
+)
+
+# (archetype, zone, contest level)
+SplitKey = Tuple[str, str, str]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    games_played INTEGER NOT NULL DEFAULT 0,
+    games_won INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS shot_splits (
+    name TEXT NOT NULL,
+    archetype TEXT NOT NULL,
+    zone TEXT NOT NULL,
+    contest TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    makes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, archetype, zone, contest)
+) WITHOUT ROWID;
+"""
+
+UPSERT_PLAYER = """
+INSERT INTO players (name, games_played, games_won, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+    games_played = games_played + excluded.games_played,
+    games_won = games_won + excluded.games_won,
+    updated_at = excluded.updated_at
+"""
+
+UPSERT_SPLIT = """
+INSERT INTO shot_splits (name, archetype, zone, contest, attempts, makes) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (name, archetype, zone, contest) DO UPDATE SET
+    attempts = attempts + excluded.attempts,
+    makes = makes + excluded.makes
+"""
+
+
+@dataclass
+class CareerProfile:
+    """A player's career totals (or, while queued, the change to them)."""
+    name: str
+    games_played: int = 0
+    games_won: int = 0
+    updated_at: float = 0.0
+    # (archetype, zone, contest) -> [attempts, makes]
+    splits: Dict[SplitKey, List[int]] = field(default_factory=dict)
+    
+    def add_shot(self, archetype: str, zone: str, contest: str, made: bool) -> None:
+        split = self.splits.get((archetype, zone, contest))
+        if split is None:
+            split = self.splits[(archetype, zone, contest)] = [0, 0]
+        split[0] += 1
+        split[1] += made
+    
+    def merge(self, other: "CareerProfile") -> None:
+        self.games_played += other.games_played
+        self.games_won += other.games_won
+        self.updated_at = max(self.updated_at, other.updated_at)
+        for key, (attempts, makes) in other.splits.items():
+            split = self.splits.get(key)
+            if split is None:
+                self.splits[key] = [attempts, makes]
+            else:
+                split[0] += attempts
+                split[1] += makes
+    
+    def totals(self, dimension: int) -> Dict[str, List[int]]:
+        """[attempts, makes] by archetype (0), zone (1) or contest level (2)."""
+        totals: Dict[str, List[int]] = {}
+        for key, (attempts, makes) in self.splits.items():
+            total = totals.setdefault(key[dimension], [0, 0])
+            total[0] += attempts
+            total[1] += makes
+        return totals
+    
+    def tendencies(self) -> Dict[str, Any]:
+        """Shot mix and FG% by archetype, zone and contest level."""
+        attempts = sum(split[0] for split in self.splits.values())
+        
+        def breakdown(dimension: int) -> Dict[str, Dict[str, float]]:
+            return {
+                value: {
+                    "attempts": total[0],
+                    "makes": total[1],
+                    "fg_pct": round(total[1] / total[0], 3),
+                    "share": round(total[0] / attempts, 3),
+                }
+                for value, total in sorted(self.totals(dimension).items())
+            }
+        
+        return {
+            "by_archetype": breakdown(0),
+            "by_zone": breakdown(1),
+            "by_contest": breakdown(2),
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        attempts = sum(split[0] for split in self.splits.values())
+        makes = sum(split[1] for split in self.splits.values())
+        return {
+            "name": self.name,
+            "games_played": self.games_played,
+            "games_won": self.games_won,
+            "attempts": attempts,
+            "makes": makes,
+            "fg_pct": round(makes / attempts, 3) if attempts else None,
+            **self.tendencies(),
+        }
+
+
+class CareerStore:
+    """Career profiles in SQLite behind a write-behind batch queue and an LRU cache."""
+    
+    def __init__(
+        self,
+        path: str = ":memory:",
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        cache_size: int = 10_000,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA busy_timeout = 5000")
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(SCHEMA)
+        # room_id -> player -> this game's shots
+        self._rooms: Dict[str, Dict[str, CareerProfile]] = {}
+        self._cache: "OrderedDict[str, CareerProfile]" = OrderedDict()
+        # Finished games not yet written, merged per player
+        self._pending: Dict[str, CareerProfile] = {}
+        self._prefetch: List[str] = []
+        # _db_lock covers the connection; _lock the cache and queues. A batch
+        # is taken from _pending and committed under _db_lock, so readers see
+        # each game either in the database or in _pending, never both.
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._writer: Optional[threading.Thread] = None
+    
+    # Updates
+    
+    def on_game_event(self, event: GameEvent) -> None:
+        """GameService listener: tallies shots and folds them in at game over."""
+        if isinstance(event, ShotResolved):
+            players = self._rooms.get(event.room_id)
+            if players is None:
+                players = self._rooms[event.room_id] = {}
+            profile = players.get(event.player)
+            if profile is None:
+                profile = players[event.player] = CareerProfile(event.player)
+            profile.add_shot(event.archetype, event.zone, event.contest_level, event.made)
+        elif isinstance(event, GameOver):
+            players = self._rooms.pop(event.room_id, {})
+            self.record_game(
+                event.winner,
+                event.loser,
+                players.get(event.winner) or CareerProfile(event.winner),
+                players.get(event.loser) or CareerProfile(event.loser),
+                event.timestamp,
+            )
+        elif isinstance(event, GameCreated):
+            self.prefetch((event.player_one, event.player_two))
+        elif isinstance(event, (GameDeleted, RoomHandedOff)):
+            # A handed-off room's tallies were exported with it
+            self._rooms.pop(event.room_id, None)
+    
+    def export_room(self, room_id: str) -> Dict[str, List[List[Any]]]:
+        """A room's shots so far as player -> [archetype, zone, contest, attempts, makes] rows."""
+        return {
+            name: [[*key, attempts, makes] for key, (attempts, makes) in profile.splits.items()]
+            for name, profile in self._rooms.get(room_id, {}).items()
+        }
+    
+    def load_room(self, room_id: str, players: Dict[str, List[List[Any]]]) -> None:
+        """Resumes a room's tallies from another worker's export_room."""
+        room = self._rooms.setdefault(room_id, {})
+        for name, splits in players.items():
+            shots = CareerProfile(name)
+            for archetype, zone, contest, attempts, makes in splits:
+                shots.splits[(archetype, zone, contest)] = [attempts, makes]
+            profile = room.get(name)
+            if profile is None:
+                room[name] = shots
+            else:
+                profile.merge(shots)
+    
+    def record_game(
+        self,
+        winner: str,
+        loser: str,
+        winner_shots: CareerProfile,
+        loser_shots: CareerProfile,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """Queues a finished game; cached profiles reflect it immediately."""
+        timestamp = time.time() if timestamp is None else timestamp
+        winner_shots.games_won = 1
+        for shots in (winner_shots, loser_shots):
+            shots.games_played = 1
+            shots.updated_at = timestamp
+        with self._lock:
+            for name, shots in ((winner, winner_shots), (loser, loser_shots)):
+                cached = self._cache.get(name)
+                if cached is not None:
+                    cached.merge(shots)
+                pending = self._pending.get(name)
+                if pending is None:
+                    pending = self._pending[name] = CareerProfile(name)
+                pending.merge(shots)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+    
+    # Lookups
+    
+    def cached(self, name: str) -> Optional[CareerProfile]:
+        """The cached profile, or None (and a background load) if it isn't cached.
+        
+        Never touches the database, so it's safe on the request path.
+        """
+        with self._lock:
+            profile = self._cache.get(name)
+            if profile is not None:
+                self._cache.move_to_end(name)
+                CACHE_REQUESTS.inc("hit")
+                return profile
+        CACHE_REQUESTS.inc("miss")
+        self.prefetch((name,))
+        return None
+    
+    def get(self, name: str) -> CareerProfile:
+        """The profile, read from the database on a cache miss."""
+        profile = self.cached(name)
+        if profile is None:
+            profile = self.load(name)
+        return profile
+    
+    def prefetch(self, names: Iterable[str]) -> None:
+        """Loads profiles into the cache on the writer thread."""
+        with self._lock:
+            self._prefetch.extend(names)
+        self._wake.set()
+    
+    def load(self, name: str) -> CareerProfile:
+        """The profile read from the database (plus queued games), refreshing the cache."""
+        with self._db_lock:
+            player = self._db.execute(
+                "SELECT games_played, games_won, updated_at FROM players WHERE name = ?", (name,)
+            ).fetchone()
+            splits = self._db.execute(
+                "SELECT archetype, zone, contest, attempts, makes FROM shot_splits WHERE name = ?", (name,)
+            ).fetchall()
+            profile = CareerProfile(name, *player) if player else CareerProfile(name)
+            for archetype, zone, contest, attempts, makes in splits:
+                profile.splits[(archetype, zone, contest)] = [attempts, makes]
+            with self._lock:
+                pending = self._pending.get(name)
+                if pending is not None:
+                    profile.merge(pending)
+                self._cache[name] = profile
+                self._cache.move_to_end(name)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return profile
+    
+    # Writing
+    
+    def start(self) -> None:
+        if self._writer is None:
+            self._stopping = False
+            self._writer = threading.Thread(target=self._run, name="career-writer", daemon=True)
+            self._writer.start()
+    
+    def stop(self) -> None:
+        """Writes every queued game and stops the writer."""
+        if self._writer is not None:
+            self._stopping = True
+            self._wake.set()
+            self._writer.join()
+            self._writer = None
+        self.flush()
+    
+    def close(self) -> None:
+        self.stop()
+        self._db.close()
+    
+    def flush(self) -> int:
+        """Writes the queued games in one transaction; returns the players updated."""
+        with self._db_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            players = [
+                (name, profile.games_played, profile.games_won, profile.updated_at)
+                for name, profile in batch.items()
+            ]
+            splits = [
+                (name, *key, attempts, makes)
+                for name, profile in batch.items()
+                for key, (attempts, makes) in profile.splits.items()
+            ]
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.executemany(UPSERT_PLAYER, players)
+                self._db.executemany(UPSERT_SPLIT, splits)
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                # Put the batch back in front of anything queued since
+                with self._lock:
+                    for name, profile in self._pending.items():
+                        if name in batch:
+                            batch[name].merge(profile)
+                        else:
+                            batch[name] = profile
+                    self._pending = batch
+                raise
+            BATCH_SIZE.observe(len(batch))
+            WRITE_SECONDS.observe(time.perf_counter() - start)
+        return len(batch)
+    
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                get_event_log().emit(ServiceError(service="career", error_type=type(e).__name__, message=f"write failed: {e}"))
+            with self._lock:
+                names, self._prefetch = self._prefetch, []
+            for name in dict.fromkeys(names):
+                try:
+                    self.load(name)
+                except sqlite3.Error as e:
+                    get_event_log().emit(ServiceError(service="career", error_type=type(e).__name__, message=f"load of {name} failed: {e}"))
+            if self._stopping:
+                return
+
+
+# Singleton instance
+career_store: Optional[CareerStore] = None
+
+
+def get_career_store() -> CareerStore:
+    """Get or create the career store (in memory unless CAREER_DB is set)."""
+    global career_store
+    if career_store is None:
+        career_store = CareerStore(
+            path=os.getenv("CAREER_DB", ":memory:"),
+            cache_size=int(os.getenv("CAREER_CACHE_SIZE", "10000")),
+        )
+        metrics.gauge("career_cached_profiles", "Career profiles in the cache").set_function(
+            lambda: len(career_store._cache)
+        )
+    return career_store
@@ -3,6 +3,20 @@ import json
 import time
 from typing import Dict, Tuple, Optional
 from dataclasses import dataclass
+from app.models.events import CoachInitialized, CoachAdviceServed, CoachError
+from app.services.event_log import get_event_log
+from app.services.metrics import metrics
+
+COACH_CACHE_REQUESTS = metrics.counter(
+    "coach_cache_requests_total",
+    "Coach advice cache lookups",
+    ("result",),
+)
+COACH_LLM_LATENCY = metrics.histogram(
+    "coach_llm_latency_seconds",
+    "Latency of Gemini advice calls",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0),
+)
 
 
 @dataclass
@@ -31,6 +45,14 @@ KEEP IT CONCISE. Be direct and brief. No long explanations.
 
 Return JSON: {"recommended_shot": {"archetype": "...", "subtype": "...", "zone": "..."}, "advice_text": "...", "reasoning": "...", "challenge": "..."}"""
     
+    # Shots the rule-based coach picks between on career numbers
+    CAREER_SHOTS = (
+        ("rim", "layup", "restricted", 2),
+        ("midrange", "catch_shoot", "wing", 2),
+        ("three", "wing_catch", "wing", 3),
+    )
+    CAREER_MIN_ATTEMPTS = 20  # Fewer and the league baseline is a better guess
+    
     def __init__(self, api_key: Optional[str] = None):
         """
         Initialize coach service.
@@ -49,7 +71,6 @@ Return JSON: {"recommended_shot": {"archetype": "...", "subtype": "...", "zone":
                 try:
                     models = genai.list_models()
                     available_models = [m.name for m in models if 'generateContent' in m.supported_generation_methods]
-                    print(f"📋 Coach AI: Available Gemini models: {available_models}")
                     
                     # Try gemini-1.0-pro first (most stable), then fallback to others
                     if 'models/gemini-1.0-pro' in available_models:
@@ -63,22 +84,20 @@ Return JSON: {"recommended_shot": {"archetype": "...", "subtype": "...", "zone":
                     else:
                         # Use first available model
                         model_name = available_models[0].replace('models/', '') if available_models else 'gemini-1.0-pro'
-                        print(f"⚠️ Coach AI: Using first available model: {model_name}")
                 except Exception as e:
-                    print(f"⚠️ Coach AI: Could not list models, using default: {e}")
+                    get_event_log().emit(CoachError(error_type=type(e).__name__, message=f"Could not list models: {e}"))
                     model_name = 'gemini-1.0-pro'
                 
                 self.client = genai.GenerativeModel(model_name)
-                print(f"✅ Coach AI: Gemini API initialized successfully (API key: {api_key[:10]}...)")
-                print(f"✅ Coach AI: Using model: {model_name}")
+                get_event_log().emit(CoachInitialized(use_llm=True, model=model_name))
             except ImportError:
-                print("⚠️ Warning: google-generativeai not installed. Coach will use rule-based fallback.")
                 self._use_llm = False
+                get_event_log().emit(CoachInitialized(use_llm=False, detail="google-generativeai not installed"))
             except Exception as e:
-                print(f"❌ Error initializing Gemini API: {e}. Coach will use rule-based fallback.")
                 self._use_llm = False
+                get_event_log().emit(CoachInitialized(use_llm=False, detail=f"Error initializing Gemini API: {e}"))
         else:
-            print("ℹ️ Coach AI: No API key provided. Using rule-based fallback.")
+            get_event_log().emit(CoachInitialized(use_llm=False, detail="No API key provided"))
     
     def _compute_state_hash(self, game_state: Dict) -> str:
         """Compute hash from meaningful game state changes."""
@@ -98,6 +117,7 @@ Return JSON: {"recommended_shot": {"archetype": "...", "subtype": "...", "zone":
                 "p2": game_state.get("player_two", {}).get("score", 0),
             },
             "turn_number": len(game_state.get("shot_history", [])),
+            "career": game_state.get("career"),
         }
         
         state_json = json.dumps(state_snapshot, sort_keys=True)
@@ -120,6 +140,12 @@ Shot History (last 10):
             made = "Made" if shot.get("made") else "Missed"
             prompt += f"{i}. {shot.get('archetype', 'unknown')} from {shot.get('zone', 'unknown')} - {made}\n"
         
+        career = game_state.get("career")
+        if career:
+            prompt += "\nShooter's career (attempts, FG%):\n"
+            for archetype, split in career["by_archetype"].items():
+                prompt += f"- {archetype}: {split['attempts']} attempts, {split['fg_pct']:.0%}\n"
+        
         prompt += "\nAnalyze the situation and recommend the best next shot with reasoning."
         
         return prompt
@@ -181,13 +207,21 @@ Shot History (last 10):
                 subtype = "layup"
                 points = 2
         else:
-            # Default recommendation
+            # Default recommendation: the shooter's best career shot, if known
             archetype = "midrange"
             subtype = "catch_shoot"
             recommended_zone = "wing"
             points = 2
+            best = self._best_career_shot(game_state.get("career"))
+            if best is not None:
+                archetype, subtype, recommended_zone, points = best
         
         probability = 0.42 if archetype == "midrange" else (0.36 if archetype == "three" else 0.62)
+        reasoning = f"The {recommended_zone} zone appears to be the most open based on defense tendencies."
+        career_split = (game_state.get("career") or {}).get("by_archetype", {}).get(archetype)
+        if career_split and career_split["attempts"] >= self.CAREER_MIN_ATTEMPTS:
+            probability = career_split["fg_pct"]
+            reasoning += f" You shoot {probability:.0%} on {archetype} shots over {career_split['attempts']} career attempts."
         expected_points = probability * points
         
         return CoachAdvice(
@@ -197,10 +231,21 @@ Shot History (last 10):
                 "zone": recommended_zone,
             },
             advice_text=f"Take a {archetype} shot from the {recommended_zone}.",
-            reasoning=f"The {recommended_zone} zone appears to be the most open based on defense tendencies. Expected points: {expected_points:.2f}.",
+            reasoning=f"{reasoning} Expected points: {expected_points:.2f}.",
             expected_points=expected_points,
         )
     
+    def _best_career_shot(self, career: Optional[Dict]) -> Optional[Tuple[str, str, str, int]]:
+        """(archetype, subtype, zone, points) with the best career expected points."""
+        if not career:
+            return None
+        best, best_points = None, 0.0
+        for shot in self.CAREER_SHOTS:
+            split = career["by_archetype"].get(shot[0])
+            if split and split["attempts"] >= self.CAREER_MIN_ATTEMPTS and split["fg_pct"] * shot[3] > best_points:
+                best, best_points = shot, split["fg_pct"] * shot[3]
+        return best
+    
     def get_advice(self, game_state: Dict) -> CoachAdvice:
         """Get coach advice for current game state."""
         state_hash = self._compute_state_hash(game_state)
@@ -210,25 +255,33 @@ Shot History (last 10):
         if state_hash in self._cache:
             cached_advice, cached_time = self._cache[state_hash]
             if current_time - cached_time < self._cache_ttl:
+                COACH_CACHE_REQUESTS.inc("hit")
+                get_event_log().emit(CoachAdviceServed(
+                    source="cache",
+                    latency_ms=(time.time() - current_time) * 1000,
+                ))
                 return cached_advice
         
         # Cache miss or expired
+        COACH_CACHE_REQUESTS.inc("miss")
+        source = "rule_based"
         if self._use_llm:
             try:
-                print("🤖 Coach AI: Calling Gemini API...")
                 prompt = self._build_prompt(game_state)
                 # Combine system prompt and user prompt for Gemini
                 full_prompt = f"{self.COACH_SYSTEM_PROMPT}\n\n{prompt}\n\nReturn your response as valid JSON only."
                 
                 import google.generativeai as genai
-                response = self.client.generate_content(
-                    full_prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.7,
+                llm_start = time.perf_counter()
+                try:
+                    response = self.client.generate_content(
+                        full_prompt,
+                        generation_config=genai.types.GenerationConfig(
+                            temperature=0.7,
+                        )
                     )
-                )
-                
-                print(f"✅ Coach AI: Gemini API response received (length: {len(response.text)} chars)")
+                finally:
+                    COACH_LLM_LATENCY.observe(time.perf_counter() - llm_start)
                 
                 # Extract JSON from response (Gemini may wrap it in markdown code blocks)
                 response_text = response.text.strip()
@@ -242,7 +295,6 @@ Shot History (last 10):
                 response_text = response_text.strip()
                 
                 advice_dict = json.loads(response_text)
-                print(f"✅ Coach AI: Successfully parsed JSON response")
                 
                 # Calculate expected_points
                 expected_points = self._calculate_expected_points(
@@ -257,16 +309,19 @@ Shot History (last 10):
                     expected_points=expected_points,
                     challenge=advice_dict.get("challenge"),
                 )
+                source = "llm"
             except Exception as e:
-                print(f"❌ Coach AI: Error calling Gemini API: {e}")
-                print(f"   Error type: {type(e).__name__}")
-                print(f"   Falling back to rule-based advice.")
+                get_event_log().emit(CoachError(error_type=type(e).__name__, message=str(e)))
                 advice = self._get_rule_based_advice(game_state)
         else:
             # Use rule-based fallback
-            print("ℹ️ Coach AI: Using rule-based fallback (no LLM)")
             advice = self._get_rule_based_advice(game_state)
         
+        get_event_log().emit(CoachAdviceServed(
+            source=source,
+            latency_ms=(time.time() - current_time) * 1000,
+        ))
+        
         # Cache it
         self._cache[state_hash] = (advice, current_time)
         
@@ -295,10 +350,6 @@ def get_coach_service() -> CoachAIService:
     if coach_ai_service is None:
         import os
         api_key = os.getenv("GEMINI_API_KEY")
-        if api_key:
-            print(f"🔑 Coach AI: GEMINI_API_KEY found in environment (length: {len(api_key)} chars)")
-        else:
-            print("⚠️ Coach AI: GEMINI_API_KEY not found in environment variables")
         coach_ai_service = CoachAIService(api_key=api_key)
     return coach_ai_service
 
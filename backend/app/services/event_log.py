@@ -0,0 +1,202 @@
+"""Structured event log with a non-blocking emit path and a batched background writer."""
+import json
+import os
+from abc import ABC, abstractmethod
+import queue
+import random
+import sys
+import threading
+from typing import Dict, List, Optional, TextIO
+from app.models.events import GameEvent
+
+
+class EventSink(ABC):
+    """Destination for serialized event lines."""
+    
+    @abstractmethod
+    def write_batch(self, lines: List[str]) -> None:
+        """Writes one batch of JSON lines."""
+    
+    def close(self) -> None:
+        pass
+
+
+class NullSink(EventSink):
+    """Discards every event."""
+    
+    def write_batch(self, lines: List[str]) -> None:
+        pass
+
+
+class StreamSink(EventSink):
+    """Writes JSON lines to a text stream such as stdout."""
+    
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+    
+    def write_batch(self, lines: List[str]) -> None:
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+
+class FileSink(EventSink):
+    """Appends JSON lines to a file, kept open across batches."""
+    
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+    
+    def write_batch(self, lines: List[str]) -> None:
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+    
+    def close(self) -> None:
+        self._file.close()
+
+
+def create_sink(spec: str) -> EventSink:
+    """Builds a sink from a spec: "stdout", "stderr", "none" or "file:<path>"."""
+    if spec == "stdout":
+        return StreamSink(sys.stdout)
+    if spec == "stderr":
+        return StreamSink(sys.stderr)
+    if spec in ("none", ""):
+        return NullSink()
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    raise ValueError(f"Unknown event log sink: {spec}")
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parses "shot_selected=0.1,*=1.0" into per-event-type sample rates."""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            event_type, rate = item.split("=", 1)
+            rates[event_type.strip()] = float(rate)
+    return rates
+
+
+class EventLog:
+    """Queues typed events and writes them in batches from a background thread.
+    
+    `emit` never blocks: it applies per-event-type sampling and hands the event
+    to a bounded queue. Serialization and sink I/O happen on the writer thread,
+    so the event loop never touches the disk or stdout. Events are dropped (and
+    counted) if the queue is full, or once the log has been stopped.
+    """
+    
+    def __init__(
+        self,
+        sink: Optional[EventSink] = None,
+        sampling: Optional[Dict[str, float]] = None,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        max_queue: int = 100_000
+    ):
+        self.sink = sink or NullSink()
+        self.sampling = sampling or {}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._default_rate = self.sampling.get("*", 1.0)
+        self._queue: "queue.Queue[Optional[GameEvent]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls) -> "EventLog":
+        """Configures the log from EVENT_LOG_SINK and EVENT_LOG_SAMPLING."""
+        return cls(
+            sink=create_sink(os.getenv("EVENT_LOG_SINK", "stdout")),
+            sampling=parse_sampling(os.getenv("EVENT_LOG_SAMPLING", "")),
+        )
+    
+    def emit(self, event: GameEvent) -> None:
+        """Queues an event for writing. Never blocks the caller."""
+        rate = self.sampling.get(event.event_type, self._default_rate)
+        if rate < 1.0 and random.random() >= rate:
+            return
+        if self._stopped:
+            # The sink is closed; nothing can write this any more
+            self.dropped += 1
+            return
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+    
+    def start(self) -> None:
+        """Starts the background writer thread if it isn't running."""
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+                self._thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flushes queued events, stops the writer thread and closes the sink.
+        
+        Stopping is final: later events are dropped. Waits at most about
+        `timeout` seconds for a writer stuck on a slow sink.
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            else:
+                thread.join(timeout)
+        self.sink.close()
+    
+    def _run(self) -> None:
+        while True:
+            try:
+                event = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            stopping = event is None
+            if event is not None:
+                batch.append(event)
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is None:
+                    stopping = True
+                else:
+                    batch.append(event)
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+    
+    def _write(self, batch: List[GameEvent]) -> None:
+        try:
+            self.sink.write_batch([json.dumps(event.to_dict(), default=str) for event in batch])
+        except Exception:
+            # A broken sink must not kill the writer; the batch is lost
+            self.dropped += len(batch)
+
+
+# Singleton instance (configured from env on first use, after .env is loaded)
+event_log: Optional[EventLog] = None
+
+
+def get_event_log() -> EventLog:
+    """Get or create the event log instance."""
+    global event_log
+    if event_log is None:
+        event_log = EventLog.from_env()
+    return event_log
@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
 from app.models.game import Game, GameState
 from app.models.player import Player
 from app.models.offense import Offense, ShotType
@@ -7,21 +7,81 @@ from app.models.shot_record import ShotRecord
 from app.models.shot_context import ShotContext
 from app.models.shot_archetypes import ShotArchetype, ShotZone, ContestLevel, DribbleState
 from app.models.defense_state import DefenseState
+from app.models.events import (
+    GameEvent,
+    GameTransitionEvent,
+    GameCreated,
+    ShotSelected,
+    DefenseSelected,
+    ShotResolved,
+    AnimationFinished,
+    TurnAdvanced,
+    GameOver,
+    GameDeleted,
+    RoomHandedOff,
+    ActionRejected,
+)
 from app.services.defense_ai_service import DefenseAIService
-import uuid
+from app.services.event_log import get_event_log
+from app.services.metrics import metrics
+from app.services.profiling import profiler
+from app.services.room_index import RoomIndex
+from app.services.sharding import shard
+import time
+
+STATE_TRANSITIONS = metrics.counter(
+    "game_state_transitions_total",
+    "Game state machine transitions",
+    ("from_state", "to_state"),
+)
+ACTIONS_REJECTED = metrics.counter(
+    "game_actions_rejected_total",
+    "Game actions refused by GameService",
+    ("action", "reason"),
+)
+
+
+class InvalidTransition(RuntimeError):
+    """A mutator tried a state change outside GameService.TRANSITIONS."""
 
 
 class GameService:
     """Service for managing game instances and game logic."""
     
+    # Base timing modifiers by timing meter grade
+    TIMING_MODIFIERS = {
+        "PERFECT": +0.10,  # +10% for perfect timing
+        "GOOD": +0.03,     # +3% for good timing
+        "MISS": -0.08,     # -8% for missed timing
+    }
+    
+    # Error reduces modifier effectiveness
+    # error = 0 → full modifier
+    # error = 1 → modifier reduced by 30%
+    TIMING_ERROR_SCALE = 0.3
+    
+    # Legal state machine moves; every state change goes through _transition()
+    TRANSITIONS = {
+        GameState.WAITING_FOR_SHOT.value: {GameState.WAITING_FOR_DEFENSE.value},
+        GameState.WAITING_FOR_DEFENSE.value: {GameState.WAITING_FOR_POWER.value},
+        GameState.WAITING_FOR_POWER.value: {GameState.ANIMATING.value},
+        GameState.ANIMATING.value: {GameState.SHOT_RESULT.value},
+        GameState.SHOT_RESULT.value: {GameState.WAITING_FOR_SHOT.value, GameState.GAME_OVER.value},
+        GameState.GAME_OVER.value: set(),
+    }
+    
     def __init__(self):
         # In-memory storage for games (in production, use database)
         self.games: Dict[str, Game] = {}
         self.defense_ai = DefenseAIService()
+        # State / activity / player lookups without scanning self.games
+        self.index = RoomIndex()
+        # Called with every emitted event, after it is logged
+        self._listeners: List[Callable[[GameEvent], None]] = []
     
     def create_game(self, player_one_name: str, player_two_name: str) -> str:
         """Creates a new game and returns room_id."""
-        room_id = str(uuid.uuid4())
+        room_id = shard.new_room_id()
         player_one = Player(name=player_one_name)
         player_two = Player(name=player_two_name)
         
@@ -29,8 +89,64 @@ class GameService:
         # Initialize default defense state
         game.defense_state = self.defense_ai._get_default_defense()
         self.games[room_id] = game
+        self._touch(game)
+        game.created_at = game.updated_at
+        self._emit(GameCreated(
+            room_id=room_id,
+            to_state=game.state,
+            player_one=player_one_name,
+            player_two=player_two_name,
+        ))
         return room_id
     
+    def _emit(self, event: GameEvent) -> None:
+        """Sends an event to the structured event log, counts transitions and notifies listeners."""
+        if isinstance(event, GameTransitionEvent):
+            STATE_TRANSITIONS.inc(event.from_state or "none", event.to_state)
+            game = self.games.get(event.room_id)
+            if game is not None:
+                # Stamp the transition with the game's own time, so replaying
+                # the journal reproduces updated_at exactly
+                event.timestamp = game.updated_at
+        elif isinstance(event, ActionRejected):
+            ACTIONS_REJECTED.inc(event.action, event.reason)
+        get_event_log().emit(event)
+        for listener in self._listeners:
+            listener(event)
+    
+    def add_listener(self, listener: Callable[[GameEvent], None]) -> None:
+        """Subscribes to game events (transitions, rejections, deletions)."""
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[GameEvent], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _check_transition(self, game: Game, to_state: GameState) -> None:
+        """Raises InvalidTransition unless the transition table allows the move."""
+        if to_state.value not in self.TRANSITIONS.get(game.state, ()):
+            raise InvalidTransition(f"{game.room_id}: {game.state} -> {to_state.value} is not allowed")
+    
+    def _transition(self, game: Game, to_state: GameState) -> None:
+        self._check_transition(game, to_state)
+        game.state = to_state.value
+    
+    def _touch(self, game: Game) -> None:
+        """Marks a game as changed so cached responses are rebuilt and re-indexes it."""
+        game.version += 1
+        game.updated_at = time.time()
+        self.index.update(game)
+    
+    def _reject(self, room_id: str, action: str, reason: str, game: Optional[Game] = None) -> bool:
+        """Records a rejected action and returns False for the caller to propagate."""
+        self._emit(ActionRejected(
+            room_id=room_id,
+            action=action,
+            reason=reason,
+            state=game.state if game else None,
+        ))
+        return False
+    
     def get_game(self, room_id: str) -> Optional[Game]:
         """Retrieves a game by room_id."""
         return self.games.get(room_id)
@@ -39,26 +155,41 @@ class GameService:
         """Handles shot selection."""
         game = self.get_game(room_id)
         if not game:
-            print(f"❌ select_shot: Game not found for room_id: {room_id}")
-            return False
+            return self._reject(room_id, "select_shot", "game_not_found")
         
         if game.state != GameState.WAITING_FOR_SHOT.value:
-            print(f"❌ select_shot: Invalid state. Expected WAITING_FOR_SHOT, got: {game.state}")
-            return False
+            return self._reject(room_id, "select_shot", "invalid_state", game)
         
         game.shot_type = shot_type
-        game.state = GameState.WAITING_FOR_DEFENSE.value
-        print(f"✅ select_shot: Shot selected successfully. New state: {game.state}")
+        self._transition(game, GameState.WAITING_FOR_DEFENSE)
+        self._touch(game)
+        self._emit(ShotSelected(
+            room_id=room_id,
+            from_state=GameState.WAITING_FOR_SHOT.value,
+            to_state=game.state,
+            player=game.current_offensive_player.name,
+            shot_type=shot_type.value,
+        ))
         return True
     
     def select_defense(self, room_id: str, defense_type: DefenseType) -> bool:
         """Handles defense selection."""
         game = self.get_game(room_id)
-        if not game or game.state != GameState.WAITING_FOR_DEFENSE.value:
-            return False
+        if not game:
+            return self._reject(room_id, "select_defense", "game_not_found")
+        if game.state != GameState.WAITING_FOR_DEFENSE.value:
+            return self._reject(room_id, "select_defense", "invalid_state", game)
         
         game.defense_type = defense_type
-        game.state = GameState.WAITING_FOR_POWER.value
+        self._transition(game, GameState.WAITING_FOR_POWER)
+        self._touch(game)
+        self._emit(DefenseSelected(
+            room_id=room_id,
+            from_state=GameState.WAITING_FOR_DEFENSE.value,
+            to_state=game.state,
+            player=game.current_defensive_player.name,
+            defense_type=defense_type.value,
+        ))
         return True
     
     def select_power(
@@ -73,66 +204,88 @@ class GameService:
         Now supports timing data from frontend timing meter.
         """
         game = self.get_game(room_id)
-        if not game or game.state != GameState.WAITING_FOR_POWER.value:
-            return False
+        if not game:
+            return self._reject(room_id, "select_power", "game_not_found")
+        if game.state != GameState.WAITING_FOR_POWER.value:
+            return self._reject(room_id, "select_power", "invalid_state", game)
         
         if not game.shot_type or not game.defense_type:
-            return False
+            return self._reject(room_id, "select_power", "missing_selection", game)
         
         game.power = power
-        game.state = GameState.ANIMATING.value
+        self._transition(game, GameState.ANIMATING)
         
         # Map legacy ShotType to new ShotContext
-        shot_context = self._create_shot_context_from_legacy(
-            game.shot_type,
-            game.defense_type,
-            game.defense_state
-        )
-        
-        # Use new probability system
-        offense = Offense()
-        if game.defense_state is None:
-            game.defense_state = self.defense_ai._get_default_defense()
-        
-        # Calculate make percentage using new system
-        make_probability = offense.calculate_make_percentage(
-            shot_context,
-            game.current_offensive_player,
-            game.defense_state
-        )
-        
-        # Apply timing modifier if provided (from frontend timing meter)
-        timing_modifier = 0.0
-        if timing_grade and timing_error is not None:
-            timing_modifier = self._get_timing_modifier(timing_grade, timing_error)
-        
-        # Apply power modifier (legacy fallback, smaller impact if timing is provided)
-        if timing_grade:
-            # If timing is provided, power modifier is minimal (just for backward compatibility)
-            power_modifier = (power - 50) / 100.0 * 0.03  # ±1.5% max when timing is used
-        else:
-            # Legacy behavior: power affects percentage more when no timing
-            power_modifier = (power - 50) / 100.0 * 0.15  # ±6% max
-        
-        adjusted_probability = make_probability + timing_modifier + power_modifier
-        adjusted_probability = max(0.01, min(0.99, adjusted_probability))
+        with profiler.phase("select_power.context_build"):
+            shot_context = self._create_shot_context_from_legacy(
+                game.shot_type,
+                game.defense_type,
+                game.defense_state
+            )
         
-        # Determine shot result
-        import random
-        game.shot_result = random.random() < adjusted_probability
+        with profiler.phase("select_power.probability"):
+            # Use new probability system
+            offense = Offense()
+            if game.defense_state is None:
+                game.defense_state = self.defense_ai._get_default_defense()
+            
+            # Calculate make percentage using new system
+            make_probability = offense.calculate_make_percentage(
+                shot_context,
+                game.current_offensive_player,
+                game.defense_state
+            )
+            
+            # Apply timing modifier if provided (from frontend timing meter)
+            timing_modifier = 0.0
+            if timing_grade and timing_error is not None:
+                timing_modifier = self._get_timing_modifier(timing_grade, timing_error)
+            
+            # Apply power modifier (legacy fallback, smaller impact if timing is provided)
+            if timing_grade:
+                # If timing is provided, power modifier is minimal (just for backward compatibility)
+                power_modifier = (power - 50) / 100.0 * 0.03  # ±1.5% max when timing is used
+            else:
+                # Legacy behavior: power affects percentage more when no timing
+                power_modifier = (power - 50) / 100.0 * 0.15  # ±6% max
+            
+            adjusted_probability = make_probability + timing_modifier + power_modifier
+            adjusted_probability = max(0.01, min(0.99, adjusted_probability))
+            
+            # Determine shot result
+            import random
+            game.shot_result = random.random() < adjusted_probability
         
         # NOTE: Score update moved to finish_animation() so it only updates after shot_result is shown
         # Do NOT update score here - it will be updated when animation finishes
         
-        # Track shot history after result is determined
-        self._record_shot_with_context(game, shot_context, game.shot_result)
-        
-        # Update defense state based on new shot history
-        game.defense_state = self.defense_ai.update_defense_state(
-            game,
-            game.shot_history
-        )
+        with profiler.phase("select_power.defense_update"):
+            # Track shot history after result is determined
+            self._record_shot_with_context(game, shot_context, game.shot_result)
+            
+            # Update defense state based on new shot history
+            game.defense_state = self.defense_ai.update_defense_state(
+                game,
+                game.shot_history
+            )
         
+        self._touch(game)
+        self._emit(ShotResolved(
+            room_id=room_id,
+            from_state=GameState.WAITING_FOR_POWER.value,
+            to_state=game.state,
+            player=game.current_offensive_player.name,
+            power=power,
+            timing_grade=timing_grade,
+            timing_error=timing_error,
+            archetype=shot_context.archetype.value,
+            subtype=shot_context.subtype,
+            zone=shot_context.zone.value,
+            contest_level=shot_context.contest_level.value,
+            points=game.shot_history[-1].points,
+            make_probability=adjusted_probability,
+            made=game.shot_result,
+        ))
         return True
     
     def _get_timing_modifier(self, timing_grade: str, timing_error: float) -> float:
@@ -145,20 +298,8 @@ class GameService:
         Returns:
             Modifier to add to base probability
         """
-        # Base modifiers
-        TIMING_MODIFIERS = {
-            "PERFECT": +0.10,  # +10% for perfect timing
-            "GOOD": +0.03,     # +3% for good timing
-            "MISS": -0.08,     # -8% for missed timing
-        }
-        
-        base_modifier = TIMING_MODIFIERS.get(timing_grade, 0.0)
-        
-        # Error reduces modifier effectiveness
-        # error = 0 → full modifier
-        # error = 1 → modifier reduced by 30%
-        ERROR_SCALE = 0.3
-        error_penalty = base_modifier * ERROR_SCALE * timing_error
+        base_modifier = self.TIMING_MODIFIERS.get(timing_grade, 0.0)
+        error_penalty = base_modifier * self.TIMING_ERROR_SCALE * timing_error
         
         # For PERFECT/GOOD, error reduces bonus
         # For MISS, error increases penalty
@@ -287,13 +428,13 @@ class GameService:
         """Marks animation as finished and updates score if shot was made."""
         game = self.get_game(room_id)
         if not game:
-            return False
+            return self._reject(room_id, "finish_animation", "game_not_found")
         
         # Only process if we're in ANIMATING state (prevent duplicate calls)
         if game.state != GameState.ANIMATING.value:
-            print(f"⚠️ finish_animation called but state is {game.state}, not ANIMATING. Ignoring.")
-            return False
+            return self._reject(room_id, "finish_animation", "invalid_state", game)
         
+        points = 0
         # Update player score if shot was made (only after animation finishes, when shot_result is shown)
         if game.shot_result and game.shot_type and game.defense_type:
             # Recreate shot context to determine points based on archetype
@@ -310,34 +451,89 @@ class GameService:
                 game.current_offensive_player.three_pointer()
         
         game.animation_finished = True
-        game.state = GameState.SHOT_RESULT.value
+        self._transition(game, GameState.SHOT_RESULT)
+        self._touch(game)
+        self._emit(AnimationFinished(
+            room_id=room_id,
+            from_state=GameState.ANIMATING.value,
+            to_state=game.state,
+            points_scored=points,
+            player_one_score=game.player_one.score,
+            player_two_score=game.player_two.score,
+        ))
         return True
     
     def next_turn(self, room_id: str) -> bool:
         """Moves to next turn."""
         game = self.get_game(room_id)
         if not game:
-            return False
+            return self._reject(room_id, "next_turn", "game_not_found")
         
         # Only allow next_turn if we're in SHOT_RESULT state
         if game.state != GameState.SHOT_RESULT.value:
-            return False
+            return self._reject(room_id, "next_turn", "invalid_state", game)
         
         if game.is_game_over():
-            game.state = GameState.GAME_OVER.value
+            self._transition(game, GameState.GAME_OVER)
+            self._touch(game)
+            winner = game.get_winner()
+            self._emit(GameOver(
+                room_id=room_id,
+                from_state=GameState.SHOT_RESULT.value,
+                to_state=game.state,
+                winner=winner.name,
+                loser=(game.player_two if winner is game.player_one else game.player_one).name,
+                player_one_score=game.player_one.score,
+                player_two_score=game.player_two.score,
+            ))
         else:
+            self._check_transition(game, GameState.WAITING_FOR_SHOT)
             game.reset_turn()
+            self._touch(game)
+            self._emit(TurnAdvanced(
+                room_id=room_id,
+                from_state=GameState.SHOT_RESULT.value,
+                to_state=game.state,
+                offensive_player=game.current_offensive_player.name,
+            ))
         
         return True
     
     def delete_game(self, room_id: str) -> bool:
         """Deletes a game."""
         if room_id in self.games:
-            del self.games[room_id]
+            self.index.remove(self.games.pop(room_id))
+            self._emit(GameDeleted(room_id=room_id))
+            return True
+        return False
+    
+    def hand_off_game(self, room_id: str) -> bool:
+        """Removes a game that moves to another worker.
+        
+        Listeners get RoomHandedOff rather than GameDeleted: the game is not
+        over or abandoned, so nothing should be settled or discarded for it.
+        """
+        if room_id in self.games:
+            self.index.remove(self.games.pop(room_id))
+            self._emit(RoomHandedOff(room_id=room_id))
             return True
         return False
+    
+    def restore_game(self, game: Game) -> None:
+        """Adds a game handed over from another worker, keeping its version."""
+        self.games[game.room_id] = game
+        self.index.update(game)
+    
+    def restore_games(self, games: List[Game]) -> None:
+        """Adds games read from a snapshot, keeping their versions."""
+        self.games.update({game.room_id: game for game in games})
+        self.index.load(games)
 
 
 # Singleton instance
 game_service = GameService()
 
+metrics.gauge("game_active_rooms", "Games currently held in memory").set_function(
+    lambda: len(game_service.games)
+)
+
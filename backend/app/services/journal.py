@@ -0,0 +1,457 @@
+"""Append-only game journal: every GameService action, for replay and recovery.
+
+The journal is a GameService listener. Each transition event (create, shot,
+defense, power with its timing data and outcome, animation-finished, next
+turn / game over), each deletion and each handoff to another worker is
+queued on the event loop and written in batches by a background thread to
+numbered segment files of JSON lines.
+Every line starts with the room id, so a room's events are found without
+parsing the rest of the segment.
+
+Replaying a room's events in order rebuilds its Game at any version or time:
+the recorded outcome of each shot stands in for the random draw, so replay
+is deterministic. Compaction rewrites sealed segments without the events a
+room had up to its last deletion or handoff. A room that comes back (a
+handoff back to this worker journals a checkpoint) keeps everything from
+there on.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from app.models.defense import DefenseType
+from app.models.events import GameDeleted, GameEvent, GameTransitionEvent, RoomHandedOff
+from app.models.game import Game
+from app.models.offense import ShotType
+from app.models.player import Player
+from app.services.game_service import game_service
+from app.services.metrics import metrics
+
+JOURNAL_EVENTS = metrics.counter(
+    "journal_events_written_total",
+    "Game journal records written to segment files",
+)
+JOURNAL_BATCH_SECONDS = metrics.histogram(
+    "journal_batch_write_seconds",
+    "Time to encode and write one journal batch",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+# A queued journal record: a game event, or a checkpoint dict
+Record = Union[GameEvent, Dict[str, Any]]
+
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".jsonl"
+_ROOM_PREFIX = b'{"room_id": "'
+# Records after which a room is no longer on this worker
+_REMOVAL_EVENTS = (GameDeleted, RoomHandedOff)
+_REMOVAL_MARKERS = (b'"event": "game_deleted"', b'"event": "room_handed_off"')
+
+
+class JournalError(Exception):
+    """A room's journal cannot be replayed (e.g. it has no creation event)."""
+
+
+def _room_of(line: bytes) -> str:
+    """Room id of an encoded journal line."""
+    start = len(_ROOM_PREFIX)
+    return line[start:line.index(b'"', start)].decode()
+
+
+def _record_room(record: Record) -> str:
+    return record.room_id if isinstance(record, GameEvent) else record["room_id"]
+
+
+def encode_record(record: Record) -> bytes:
+    """One JSON line with the room id first."""
+    if isinstance(record, GameEvent):
+        data = {"room_id": record.room_id, "event": record.event_type, **record.__dict__}
+    else:
+        data = record
+    return (json.dumps(data, default=str) + "\n").encode()
+
+
+def apply_record(game: Optional[Game], record: Dict[str, Any]) -> Optional[Game]:
+    """Applies one journal record to a game; returns the new game (None once deleted).
+    
+    Mirrors GameService's mutators, with the recorded shot outcome in place
+    of the random draw and the record's timestamp as updated_at.
+    """
+    kind = record["event"]
+    if kind == "checkpoint":
+        return Game.from_dict(record["game"])
+    if kind in ("game_deleted", "room_handed_off"):
+        return None
+    if kind == "game_created":
+        game = Game(
+            player_one=Player(name=record["player_one"]),
+            player_two=Player(name=record["player_two"]),
+            room_id=record["room_id"],
+            created_at=record["timestamp"],
+        )
+        game.defense_state = game_service.defense_ai._get_default_defense()
+    elif game is None:
+        raise JournalError(f"{record['room_id']}: {kind} before the game was created")
+    elif kind == "shot_selected":
+        game.shot_type = ShotType(record["shot_type"])
+    elif kind == "defense_selected":
+        game.defense_type = DefenseType(record["defense_type"])
+    elif kind == "shot_resolved":
+        game.power = record["power"]
+        shot_context = game_service._create_shot_context_from_legacy(
+            game.shot_type,
+            game.defense_type,
+            game.defense_state,
+        )
+        if game.defense_state is None:
+            game.defense_state = game_service.defense_ai._get_default_defense()
+        game.shot_result = record["made"]
+        game_service._record_shot_with_context(game, shot_context, game.shot_result)
+        game.defense_state = game_service.defense_ai.update_defense_state(game, game.shot_history)
+    elif kind == "animation_finished":
+        game.player_one.score = record["player_one_score"]
+        game.player_two.score = record["player_two_score"]
+        game.animation_finished = True
+    elif kind == "turn_advanced":
+        game.reset_turn()
+    elif kind != "game_over":
+        raise JournalError(f"Unknown journal record: {kind}")
+    game.state = record["to_state"]
+    game.version += 1
+    game.updated_at = record["timestamp"]
+    return game
+
+
+def replay(
+    records: Iterator[Dict[str, Any]],
+    version: Optional[int] = None,
+    at: Optional[float] = None,
+) -> Optional[Game]:
+    """Rebuilds a game from its records, stopping after `version` or at time `at`.
+    
+    Returns None if the game was deleted (or not created) by that point.
+    """
+    game = None
+    for record in records:
+        if at is not None and record["timestamp"] > at:
+            break
+        game = apply_record(game, record)
+        if version is not None and game is not None and game.version >= version:
+            break
+    return game
+
+
+class Journal:
+    """Batched, segmented, append-only journal of game events.
+    
+    `on_game_event` only appends to a queue. A writer thread drains it every
+    `flush_interval` seconds (sooner once `batch_size` records are waiting),
+    writing each batch with one write() and, with `fsync`, one fsync().
+    Segments roll over at `segment_bytes`; the writer compacts sealed
+    segments every `compact_interval` seconds.
+    """
+    
+    def __init__(
+        self,
+        directory: str,
+        batch_size: int = 1024,
+        flush_interval: float = 0.05,
+        segment_bytes: int = 64 * 1024 * 1024,
+        compact_interval: float = 300.0,
+        fsync: bool = True,
+    ):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.compact_interval = compact_interval
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        
+        self._pending: Deque[Record] = deque()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # Held for segment writes, rollover, compaction swaps and read snapshots
+        self._io_lock = threading.Lock()
+        self._segments: List[int] = []
+        self._rooms: Dict[str, Set[int]] = {}  # room_id -> segments with its records
+        # room_id -> segment holding the room's last written deletion or handoff
+        self._deleted: Dict[str, int] = {}
+        self._file = None
+        self._file_size = 0
+        self._scan()
+        # Never append to a segment from an earlier run: its last line may be torn
+        self._active = (self._segments[-1] + 1) if self._segments else 1
+    
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{segment:08d}{_SEGMENT_SUFFIX}")
+    
+    def _scan(self) -> None:
+        """Indexes existing segments by room (reading only each line's room id)."""
+        for name in os.listdir(self.directory):
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX):
+                self._segments.append(int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]))
+        self._segments.sort()
+        for segment in self._segments:
+            with open(self._path(segment), "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        continue
+                    room_id = _room_of(line)
+                    self._rooms.setdefault(room_id, set()).add(segment)
+                    if any(marker in line for marker in _REMOVAL_MARKERS):
+                        self._deleted[room_id] = segment
+    
+    # Writing
+    
+    def on_game_event(self, event: GameEvent) -> None:
+        """GameService listener: queues transitions, deletions and handoffs."""
+        if isinstance(event, (GameTransitionEvent, *_REMOVAL_EVENTS)):
+            self._pending.append(event)
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+    
+    def checkpoint(self, game: Game) -> None:
+        """Journals a game's full state, e.g. when it arrives from another worker."""
+        self._pending.append({
+            "room_id": game.room_id,
+            "event": "checkpoint",
+            "timestamp": game.updated_at,
+            "game": game.to_dict(),
+        })
+    
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Writes every queued record and stops the writer thread."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            thread.join(timeout)
+        self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def _run(self) -> None:
+        next_compaction = time.monotonic() + self.compact_interval
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            if time.monotonic() >= next_compaction:
+                self.compact()
+                next_compaction = time.monotonic() + self.compact_interval
+    
+    def flush(self) -> int:
+        """Writes the queued records now; returns how many were written."""
+        with self._io_lock:
+            count = len(self._pending)
+            if not count:
+                return 0
+            start = time.perf_counter()
+            popleft = self._pending.popleft
+            batch = [popleft() for _ in range(count)]
+            data = b"".join(map(encode_record, batch))
+            if self._file is None or self._file_size >= self.segment_bytes:
+                self._roll()
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file_size += len(data)
+            for record in batch:
+                room_id = _record_room(record)
+                segments = self._rooms.get(room_id)
+                if segments is None:
+                    self._rooms[room_id] = {self._active}
+                else:
+                    segments.add(self._active)
+                if isinstance(record, _REMOVAL_EVENTS):
+                    self._deleted[room_id] = self._active
+        JOURNAL_EVENTS.inc(amount=count)
+        JOURNAL_BATCH_SECONDS.observe(time.perf_counter() - start)
+        return count
+    
+    def _roll(self) -> None:
+        """Seals the active segment and opens the next one (io lock held)."""
+        if self._file is not None:
+            self._file.close()
+            self._active += 1
+        self._file = open(self._path(self._active), "ab")
+        self._file_size = 0
+        self._segments.append(self._active)
+    
+    # Compaction
+    
+    def compact(self) -> int:
+        """Rewrites sealed segments without removed rooms' old records; returns lines dropped.
+        
+        A room's records up to and including its last deletion (or handoff)
+        are dropped; anything written after it, such as the checkpoint of a
+        room handed back here, is kept. Sealed segments never change again,
+        so they are rewritten without the lock; only the rename into place
+        (and index update) holds it.
+        """
+        with self._io_lock:
+            sealed = [segment for segment in self._segments if segment != self._active]
+            deleted = {room_id: last for room_id, last in self._deleted.items() if last != self._active}
+        dropped = 0
+        for segment in sealed:
+            rooms = {
+                room_id for room_id, last in deleted.items()
+                if segment <= last and segment in self._rooms.get(room_id, ())
+            }
+            if not rooms:
+                continue
+            path = self._path(segment)
+            # Lines to drop per room in this segment: all of them before the
+            # segment with the room's last removal, else up to that removal
+            cutoff = {room_id: None for room_id in rooms if deleted[room_id] > segment}
+            last_here = rooms.difference(cutoff)
+            if last_here:
+                with open(path, "rb") as source:
+                    seen = dict.fromkeys(last_here, 0)
+                    for line in source:
+                        if not line.endswith(b"\n"):
+                            continue
+                        room_id = _room_of(line)
+                        if room_id in seen:
+                            seen[room_id] += 1
+                            if any(marker in line for marker in _REMOVAL_MARKERS):
+                                cutoff[room_id] = seen[room_id]
+            kept = 0
+            kept_rooms = set()
+            seen = dict.fromkeys(rooms, 0)
+            with open(path, "rb") as source, open(path + ".compact", "wb") as target:
+                for line in source:
+                    if not line.endswith(b"\n"):
+                        dropped += 1
+                        continue
+                    room_id = _room_of(line)
+                    if room_id in seen:
+                        seen[room_id] += 1
+                        limit = cutoff[room_id]
+                        if limit is None or seen[room_id] <= limit:
+                            dropped += 1
+                            continue
+                        kept_rooms.add(room_id)
+                    target.write(line)
+                    kept += 1
+                target.flush()
+                os.fsync(target.fileno())
+            with self._io_lock:
+                if kept:
+                    os.replace(path + ".compact", path)
+                else:
+                    os.remove(path + ".compact")
+                    os.remove(path)
+                    self._segments.remove(segment)
+                for room_id in rooms - kept_rooms:
+                    segments = self._rooms.get(room_id)
+                    if segments is not None:
+                        segments.discard(segment)
+        with self._io_lock:
+            for room_id, last in deleted.items():
+                # Everything up to the removal is gone, unless it was removed again since
+                if self._deleted.get(room_id) == last:
+                    del self._deleted[room_id]
+                    if not self._rooms.get(room_id):
+                        self._rooms.pop(room_id, None)
+        return dropped
+    
+    # Reading
+    
+    def _open_segments(self, segments: List[int]) -> Tuple[List[Tuple[Any, Optional[int]]], List[Record]]:
+        """Opens segments for reading and copies the queue (io lock held).
+        
+        Open files keep their contents through a later compaction; the active
+        segment is read only up to its current size because anything after
+        that is still in the copied queue.
+        """
+        files = []
+        for segment in segments:
+            try:
+                f = open(self._path(segment), "rb")
+            except FileNotFoundError:
+                continue
+            files.append((f, self._file_size if segment == self._active and self._file is not None else None))
+        return files, list(self._pending)
+    
+    def has_records(self, room_id: str) -> bool:
+        return room_id in self._rooms or any(_record_room(record) == room_id for record in self._pending)
+    
+    def records(self, room_id: Optional[str] = None, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yields journal records in order: one room's, or every room's.
+        
+        Streams from the segment files; records still queued come last. The
+        first `offset` records are skipped without being parsed.
+        """
+        with self._io_lock:
+            if room_id is None:
+                segments = list(self._segments)
+            else:
+                segments = sorted(self._rooms.get(room_id, ()))
+            files, pending = self._open_segments(segments)
+        prefix = None if room_id is None else encode_record({"room_id": room_id})[:-2] + b","
+        for f, limit in files:
+            with f:
+                read = 0
+                for line in f:
+                    read += len(line)
+                    if limit is not None and read > limit:
+                        break
+                    if not line.endswith(b"\n"):
+                        break  # Torn write from a crash
+                    if prefix is None or line.startswith(prefix):
+                        if offset:
+                            offset -= 1
+                        else:
+                            yield json.loads(line)
+        for record in pending:
+            if room_id is None or _record_room(record) == room_id:
+                if offset:
+                    offset -= 1
+                else:
+                    yield json.loads(encode_record(record))
+    
+    def replay(self, room_id: str, version: Optional[int] = None, at: Optional[float] = None) -> Optional[Game]:
+        """Rebuilds a room's game as of `version` or time `at` (latest by default)."""
+        return replay(self.records(room_id), version=version, at=at)
+    
+    def recover(self) -> List[Game]:
+        """Rebuilds every room that was not deleted, e.g. after a crash."""
+        games: Dict[str, Game] = {}
+        for record in self.records():
+            room_id = record["room_id"]
+            game = apply_record(games.get(room_id), record)
+            if game is None:
+                games.pop(room_id, None)
+            else:
+                games[room_id] = game
+        return list(games.values())
+
+
+# Singleton instance (configured from JOURNAL_DIR on first use, after .env is loaded)
+journal: Optional[Journal] = None
+
+
+def get_journal() -> Optional[Journal]:
+    """Get or create the journal; None when JOURNAL_DIR is not set."""
+    global journal
+    if journal is None and os.getenv("JOURNAL_DIR"):
+        journal = Journal(
+            os.environ["JOURNAL_DIR"],
+            fsync=os.getenv("JOURNAL_FSYNC", "1") != "0",
+        )
+    return journal
@@ -0,0 +1,415 @@
+"""Elo ratings per player name, ranked for leaderboard queries.
+
+Every finished game updates both players' ratings. Players are kept in an
+indexable skip list ordered by (-rating, name): each forward link records
+how many players it skips, so top-K, rank-of-player and neighborhood
+queries are O(log n + k) however many players there are.
+
+In a sharded deployment results are published on the backplane's
+RESULTS_CHANNEL and applied by every worker, so any worker can answer
+leaderboard queries.
+
+The ratings are saved to a snapshot file every SNAPSHOT_INTERVAL seconds
+(when they changed) and on shutdown, and loaded on startup.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from app.models.events import GameEvent, GameOver, ServiceError
+from app.services.event_log import get_event_log
+from app.services.metrics import metrics
+
+RESULTS_PROCESSED = metrics.counter(
+    "leaderboard_results_total",
+    "Finished games applied to the leaderboard",
+)
+SNAPSHOT_SECONDS = metrics.histogram(
+    "leaderboard_snapshot_seconds",
+    "Time spent writing a leaderboard snapshot",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+FORMAT_VERSION = 1
+
+# Backplane room id carrying game results to every worker
+RESULTS_CHANNEL = "leaderboard"
+
+RankKey = Tuple[float, str]  # (-rating, name)
+
+
+class PlayerRating(NamedTuple):
+    name: str
+    rating: float = INITIAL_RATING
+    games: int = 0
+    wins: int = 0
+    losses: int = 0
+    updated_at: float = 0.0
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    """Probability that a player rated `rating` beats one rated `opponent`."""
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / 400.0))
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+    
+    def __init__(self, key: Optional[RankKey], height: int, tail: Optional["_Node"]):
+        self.key = key
+        self.next: List[Optional[_Node]] = [tail] * height
+        # Positions skipped by each link (to the node it points at)
+        self.width = [1] * height
+
+
+class RankedSkipList:
+    """Sorted set of unique keys with O(log n) insert, remove, rank and index."""
+    MAX_HEIGHT = 16  # 4 ** 16 keys before the top level fills up
+    
+    def __init__(self, keys: Iterator[RankKey] = ()):
+        self._tail = _Node(None, 0, None)
+        self._head = _Node(None, self.MAX_HEIGHT, self._tail)
+        self._height = 1  # Levels in use
+        self._size = 0
+        self._random = random.Random()
+        self._extend_sorted(keys)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def _random_height(self) -> int:
+        height = 1
+        while height < self.MAX_HEIGHT and self._random.random() < 0.25:
+            height += 1
+        return height
+    
+    def _grow(self, height: int) -> None:
+        # Unused head levels point at the tail, past every key
+        for level in range(self._height, height):
+            self._head.width[level] = self._size + 1
+        self._height = height
+    
+    def _extend_sorted(self, keys: Iterator[RankKey]) -> None:
+        """Builds the list from ascending keys in O(n); only valid while empty."""
+        head, tail = self._head, self._tail
+        last = [head] * self.MAX_HEIGHT
+        last_position = [0] * self.MAX_HEIGHT
+        position = 0
+        for position, key in enumerate(keys, 1):
+            height = self._random_height()
+            node = _Node(key, height, tail)
+            for level in range(height):
+                previous = last[level]
+                previous.next[level] = node
+                previous.width[level] = position - last_position[level]
+                last[level] = node
+                last_position[level] = position
+            if height > self._height:
+                self._height = height
+        for level in range(self._height):
+            last[level].width[level] = position + 1 - last_position[level]
+        self._size = position
+    
+    def insert(self, key: RankKey) -> None:
+        height = self._random_height()
+        if height > self._height:
+            self._grow(height)
+        tail = self._tail
+        chain = [self._head] * self._height
+        steps = [0] * self._height
+        node = self._head
+        for level in range(self._height - 1, -1, -1):
+            following = node.next[level]
+            while following is not tail and following.key < key:
+                steps[level] += node.width[level]
+                node = following
+                following = node.next[level]
+            chain[level] = node
+        
+        new = _Node(key, height, tail)
+        skipped = 0
+        for level in range(height):
+            previous = chain[level]
+            new.next[level] = previous.next[level]
+            previous.next[level] = new
+            new.width[level] = previous.width[level] - skipped
+            previous.width[level] = skipped + 1
+            skipped += steps[level]
+        for level in range(height, self._height):
+            chain[level].width[level] += 1
+        self._size += 1
+    
+    def remove(self, key: RankKey) -> None:
+        tail = self._tail
+        chain = [self._head] * self._height
+        node = self._head
+        for level in range(self._height - 1, -1, -1):
+            following = node.next[level]
+            while following is not tail and following.key < key:
+                node = following
+                following = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is tail or target.key != key:
+            raise KeyError(key)
+        for level in range(self._height):
+            previous = chain[level]
+            if previous.next[level] is target:
+                previous.width[level] += target.width[level] - 1
+                previous.next[level] = target.next[level]
+            else:
+                previous.width[level] -= 1
+        self._size -= 1
+    
+    def rank(self, key: RankKey) -> int:
+        """0-based position of `key`; raises KeyError if absent."""
+        tail = self._tail
+        node = self._head
+        position = 0
+        for level in range(self._height - 1, -1, -1):
+            following = node.next[level]
+            while following is not tail and following.key < key:
+                position += node.width[level]
+                node = following
+                following = node.next[level]
+        following = node.next[0]
+        if following is tail or following.key != key:
+            raise KeyError(key)
+        return position
+    
+    def iter_from(self, index: int) -> Iterator[RankKey]:
+        """Keys from 0-based position `index` onward."""
+        if index >= self._size:
+            return
+        tail = self._tail
+        node = self._head
+        remaining = max(index, 0) + 1
+        for level in range(self._height - 1, -1, -1):
+            while node.width[level] <= remaining and node.next[level] is not tail:
+                remaining -= node.width[level]
+                node = node.next[level]
+        while node is not tail:
+            yield node.key
+            node = node.next[0]
+    
+    def __iter__(self) -> Iterator[RankKey]:
+        return self.iter_from(0)
+
+
+# Publishes a result frame on the backplane: (channel, frame)
+Publisher = Callable[[str, str], Awaitable[None]]
+
+
+class Leaderboard:
+    """Elo ratings for every player name seen in a finished game."""
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        snapshot_interval: float = 60.0,
+        k_factor: float = K_FACTOR,
+    ):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.k_factor = k_factor
+        # Set at startup in sharded deployments; results then reach this
+        # worker's apply_frame through the backplane like everyone else's
+        self.publish: Optional[Publisher] = None
+        self._players: Dict[str, PlayerRating] = {}
+        self._ranking = RankedSkipList()
+        self._changes = 0
+        self._saved_changes = 0
+        self._publishes: Set[asyncio.Task] = set()
+        self._save_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._saver: Optional[threading.Thread] = None
+        if path and os.path.exists(path):
+            self.load(path)
+    
+    def __len__(self) -> int:
+        return len(self._players)
+    
+    # Updates
+    
+    def on_game_event(self, event: GameEvent) -> None:
+        """GameService listener: rates both players when a game ends."""
+        if not isinstance(event, GameOver):
+            return
+        if self.publish is None:
+            self.record_result(event.winner, event.loser, event.timestamp)
+            return
+        frame = json.dumps({"winner": event.winner, "loser": event.loser, "timestamp": event.timestamp})
+        task = asyncio.get_running_loop().create_task(self.publish(RESULTS_CHANNEL, frame))
+        self._publishes.add(task)
+        task.add_done_callback(self._publishes.discard)
+    
+    def apply_frame(self, frame: str) -> None:
+        """Applies a result published on RESULTS_CHANNEL."""
+        result = json.loads(frame)
+        self.record_result(result["winner"], result["loser"], result["timestamp"])
+    
+    def record_result(self, winner: str, loser: str, timestamp: Optional[float] = None) -> None:
+        if winner == loser:
+            # Playing yourself proves nothing
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        players = self._players
+        ranking = self._ranking
+        old_winner = players.get(winner) or PlayerRating(winner)
+        old_loser = players.get(loser) or PlayerRating(loser)
+        delta = self.k_factor * (1.0 - expected_score(old_winner.rating, old_loser.rating))
+        new_winner = old_winner._replace(
+            rating=old_winner.rating + delta,
+            games=old_winner.games + 1,
+            wins=old_winner.wins + 1,
+            updated_at=timestamp,
+        )
+        new_loser = old_loser._replace(
+            rating=old_loser.rating - delta,
+            games=old_loser.games + 1,
+            losses=old_loser.losses + 1,
+            updated_at=timestamp,
+        )
+        for old, new in ((old_winner, new_winner), (old_loser, new_loser)):
+            if old.games:
+                ranking.remove((-old.rating, old.name))
+            ranking.insert((-new.rating, new.name))
+            # Replace, never mutate: the snapshot thread reads these records
+            players[new.name] = new
+        self._changes += 1
+        RESULTS_PROCESSED.inc()
+    
+    # Queries
+    
+    def _entry(self, rank: int, player: PlayerRating) -> Dict[str, Any]:
+        return {
+            "rank": rank,
+            "name": player.name,
+            "rating": round(player.rating, 1),
+            "games": player.games,
+            "wins": player.wins,
+            "losses": player.losses,
+        }
+    
+    def _entries(self, start: int, count: int) -> List[Dict[str, Any]]:
+        entries = []
+        if count <= 0:
+            return entries
+        for rank, (_, name) in enumerate(self._ranking.iter_from(start), start + 1):
+            entries.append(self._entry(rank, self._players[name]))
+            if len(entries) == count:
+                break
+        return entries
+    
+    def top(self, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Players ranked offset + 1 to offset + limit."""
+        return self._entries(offset, limit)
+    
+    def rank_of(self, name: str) -> Optional[int]:
+        """1-based rank of a player, or None if they haven't finished a game."""
+        player = self._players.get(name)
+        if player is None:
+            return None
+        return self._ranking.rank((-player.rating, name)) + 1
+    
+    def player(self, name: str) -> Optional[Dict[str, Any]]:
+        rank = self.rank_of(name)
+        if rank is None:
+            return None
+        return self._entry(rank, self._players[name])
+    
+    def around(self, name: str, radius: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """The player with up to `radius` players ranked either side of them."""
+        rank = self.rank_of(name)
+        if rank is None:
+            return None
+        start = max(rank - 1 - radius, 0)
+        return self._entries(start, rank + radius - start)
+    
+    # Snapshots
+    
+    def save(self, path: Optional[str] = None) -> int:
+        """Writes every rating to `path` atomically; returns the player count.
+        
+        Safe to call off the event loop: records are replaced, never
+        mutated, so each one is read whole.
+        """
+        path = path or self.path
+        with self._save_lock:
+            start = time.perf_counter()
+            changes = self._changes
+            players = list(self._players.values())
+            document = {
+                "version": FORMAT_VERSION,
+                "saved_at": time.time(),
+                "players": [list(player) for player in players],
+            }
+            temporary = f"{path}.tmp"
+            with open(temporary, "w") as f:
+                json.dump(document, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, path)
+            self._saved_changes = changes
+            SNAPSHOT_SECONDS.observe(time.perf_counter() - start)
+        return len(players)
+    
+    def load(self, path: str) -> int:
+        """Replaces the ratings with those saved in `path`; returns the player count."""
+        with open(path) as f:
+            document = json.load(f)
+        if document.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported leaderboard snapshot version {document.get('version')}")
+        players = {row[0]: PlayerRating(*row) for row in document["players"]}
+        self._players = players
+        self._ranking = RankedSkipList(sorted((-player.rating, name) for name, player in players.items()))
+        self._changes = self._saved_changes = 0
+        return len(players)
+    
+    def start(self) -> None:
+        """Saves a snapshot every snapshot_interval seconds while there are changes."""
+        if not self.path or self._saver is not None:
+            return
+        self._stopping.clear()
+        self._saver = threading.Thread(target=self._save_periodically, name="leaderboard-snapshot", daemon=True)
+        self._saver.start()
+    
+    def stop(self) -> None:
+        """Stops the snapshot thread and saves any unsaved results."""
+        if self._saver is not None:
+            self._stopping.set()
+            self._saver.join()
+            self._saver = None
+        if self.path and self._changes != self._saved_changes:
+            self.save()
+    
+    def _save_periodically(self) -> None:
+        while not self._stopping.wait(self.snapshot_interval):
+            if self._changes == self._saved_changes:
+                continue
+            try:
+                self.save()
+            except OSError as e:
+                get_event_log().emit(ServiceError(service="leaderboard", error_type=type(e).__name__, message=str(e)))
+
+
+# Singleton instance
+leaderboard: Optional[Leaderboard] = None
+
+
+def get_leaderboard() -> Leaderboard:
+    """Get or create the leaderboard, loading LEADERBOARD_PATH if it exists."""
+    global leaderboard
+    if leaderboard is None:
+        leaderboard = Leaderboard(
+            path=os.getenv("LEADERBOARD_PATH"),
+            snapshot_interval=float(os.getenv("LEADERBOARD_SNAPSHOT_INTERVAL", "60")),
+        )
+        metrics.gauge("leaderboard_players", "Players with a rating").set_function(lambda: len(leaderboard))
+    return leaderboard
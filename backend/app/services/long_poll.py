@@ -0,0 +1,62 @@
+"""Long-poll support: lets requests wait for a game's version to move."""
+import asyncio
+from typing import Dict
+
+from app.models.events import GameEvent, GameTransitionEvent, GameDeleted, RoomHandedOff
+from app.services.game_service import game_service
+from app.services.metrics import metrics
+
+MAX_POLL_TIMEOUT = 60.0
+
+
+class GameVersionWatcher:
+    """Wakes long-poll requests when a room changes.
+    
+    One asyncio.Event exists per room only while requests are waiting on it;
+    a notification pops and sets it, and waiters re-check the game version.
+    """
+    
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+        self.waiting = 0
+    
+    def on_game_event(self, event: GameEvent) -> None:
+        """GameService listener: wakes waiters on transitions and when a room goes."""
+        if isinstance(event, (GameTransitionEvent, GameDeleted, RoomHandedOff)):
+            changed = self._events.pop(event.room_id, None)
+            if changed is not None:
+                changed.set()
+    
+    async def wait_past(self, room_id: str, version: int, timeout: float) -> bool:
+        """Waits until the game's version exceeds `version` or the game is gone.
+        
+        Returns False if the timeout expires first.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(timeout, MAX_POLL_TIMEOUT)
+        self.waiting += 1
+        try:
+            while True:
+                game = game_service.get_game(room_id)
+                if game is None or game.version > version:
+                    return True
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                changed = self._events.get(room_id)
+                if changed is None:
+                    changed = self._events[room_id] = asyncio.Event()
+                try:
+                    await asyncio.wait_for(changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return False
+        finally:
+            self.waiting -= 1
+
+
+# Singleton instance
+version_watcher = GameVersionWatcher()
+
+metrics.gauge("game_long_poll_waiters", "Requests waiting in long-poll").set_function(
+    lambda: version_watcher.waiting
+)
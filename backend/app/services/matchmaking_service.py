@@ -0,0 +1,262 @@
+"""Matchmaking lobby: pairs queued players into new games.
+
+Players are queued in FIFO deques per skill bucket. A new ticket is matched
+against the head of its own bucket in O(1); cancelled tickets are skipped
+lazily when they reach a head. A periodic sweep widens the search for the
+oldest waiter in each bucket to neighbouring buckets as its wait grows, so
+the sweep touches buckets, never individual queued players.
+"""
+import asyncio
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional
+
+from app.services.metrics import metrics
+
+QUEUE_WAIT = metrics.histogram(
+    "matchmaking_wait_seconds",
+    "Time from queueing to being matched",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+)
+TICKETS_FINISHED = metrics.counter(
+    "matchmaking_tickets_total",
+    "Matchmaking tickets by outcome",
+    ("outcome",),
+)
+
+# Notified with (ticket, message) when a ticket is matched or expires
+Notifier = Callable[["Ticket", dict], None]
+
+
+@dataclass
+class Ticket:
+    """A player waiting in (or finished with) the matchmaking queue."""
+    id: str
+    player_name: str
+    skill: Optional[int]
+    bucket: int
+    enqueued_at: float = field(default_factory=time.time)
+    status: str = "queued"  # "queued", "matched", "cancelled" or "expired"
+    room_id: Optional[str] = None
+    opponent: Optional[str] = None
+    role: Optional[str] = None  # "player_one" or "player_two" once matched
+    finished_at: Optional[float] = None
+    
+    def to_dict(self) -> dict:
+        return {
+            "ticket_id": self.id,
+            "player_name": self.player_name,
+            "skill": self.skill,
+            "status": self.status,
+            "room_id": self.room_id,
+            "opponent": self.opponent,
+            "role": self.role,
+            "enqueued_at": self.enqueued_at,
+            "wait_seconds": round((self.finished_at or time.time()) - self.enqueued_at, 3),
+        }
+
+
+class MatchmakingService:
+    """Skill-bucketed matchmaking queue."""
+    
+    BUCKET_WIDTH = 100         # Skill points per bucket
+    DEFAULT_SKILL = 1000       # Bucket for players who don't give a skill
+    WIDEN_AFTER = 5.0          # Seconds of waiting per extra bucket of tolerance
+    MAX_BUCKET_DISTANCE = 5
+    TICKET_TTL = 300.0         # Queued tickets expire after this long
+    RETAIN_FINISHED = 60.0     # Finished tickets stay queryable this long
+    SWEEP_INTERVAL = 1.0
+    
+    def __init__(self, create_game: Callable[[str, str], str], notifier: Optional[Notifier] = None):
+        self.create_game = create_game
+        self.notifier = notifier
+        self.tickets: Dict[str, Ticket] = {}
+        self._buckets: Dict[int, Deque[Ticket]] = {}
+        self._depths: Dict[int, int] = {}  # Queued (not cancelled) tickets per bucket
+        self._finished: Deque[Ticket] = deque()
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+        self.queued = 0
+        self._sweeper: Optional[asyncio.Task] = None
+    
+    # Queue operations
+    
+    def enqueue(self, player_name: str, skill: Optional[int] = None) -> Ticket:
+        """Queues a player and matches them immediately if their bucket has a waiter."""
+        bucket = (skill if skill is not None else self.DEFAULT_SKILL) // self.BUCKET_WIDTH
+        ticket = Ticket(id=uuid.uuid4().hex, player_name=player_name, skill=skill, bucket=bucket)
+        self.tickets[ticket.id] = ticket
+        
+        opponent = self._head(bucket)
+        if opponent is not None:
+            self._dequeue(opponent)
+            self._match(opponent, ticket)
+        else:
+            self._buckets.setdefault(bucket, deque()).append(ticket)
+            self._depths[bucket] = self._depths.get(bucket, 0) + 1
+            self.queued += 1
+        return ticket
+    
+    def cancel(self, ticket_id: str) -> Optional[Ticket]:
+        """Cancels a queued ticket; it is dropped from its bucket lazily."""
+        ticket = self.tickets.get(ticket_id)
+        if ticket is not None and ticket.status == "queued":
+            self._uncount(ticket)
+            self._finish(ticket, "cancelled")
+        return ticket
+    
+    def get_ticket(self, ticket_id: str) -> Optional[Ticket]:
+        return self.tickets.get(ticket_id)
+    
+    def _head(self, bucket: int) -> Optional[Ticket]:
+        """Oldest still-queued ticket in a bucket, discarding finished ones."""
+        queue = self._buckets.get(bucket)
+        while queue:
+            if queue[0].status == "queued":
+                return queue[0]
+            queue.popleft()
+        if queue is not None:
+            del self._buckets[bucket]
+        return None
+    
+    def _dequeue(self, ticket: Ticket) -> None:
+        """Removes a ticket that _head() just returned from its bucket."""
+        self._buckets[ticket.bucket].popleft()
+        self._uncount(ticket)
+    
+    def _uncount(self, ticket: Ticket) -> None:
+        self.queued -= 1
+        self._depths[ticket.bucket] -= 1
+        if not self._depths[ticket.bucket]:
+            del self._depths[ticket.bucket]
+    
+    def _match(self, first: Ticket, second: Ticket) -> None:
+        """Creates a game for two tickets; the longer waiter is player one."""
+        room_id = self.create_game(first.player_name, second.player_name)
+        for ticket, opponent, role in ((first, second, "player_one"), (second, first, "player_two")):
+            ticket.room_id = room_id
+            ticket.opponent = opponent.player_name
+            ticket.role = role
+            self._finish(ticket, "matched")
+            wait = ticket.finished_at - ticket.enqueued_at
+            QUEUE_WAIT.observe(wait)
+            self._recent_waits.append(wait)
+            self._notify(ticket, {"type": "match_found", **ticket.to_dict()})
+    
+    def _finish(self, ticket: Ticket, status: str) -> None:
+        ticket.status = status
+        ticket.finished_at = time.time()
+        self._finished.append(ticket)
+        TICKETS_FINISHED.inc(status)
+    
+    def _notify(self, ticket: Ticket, message: dict) -> None:
+        if self.notifier is not None:
+            self.notifier(ticket, message)
+    
+    # Periodic sweep
+    
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Pairs long waiters across neighbouring buckets, expires stale tickets
+        and forgets old finished ones. Returns the number of matches made."""
+        now = now if now is not None else time.time()
+        matches = 0
+        for bucket in sorted(self._buckets):
+            while True:
+                head = self._head(bucket)
+                if head is None:
+                    break
+                if now - head.enqueued_at > self.TICKET_TTL:
+                    self._dequeue(head)
+                    self._finish(head, "expired")
+                    self._notify(head, {"type": "ticket_expired", **head.to_dict()})
+                    continue
+                opponent = self._nearby_opponent(head, now)
+                if opponent is None:
+                    break
+                self._dequeue(head)
+                self._dequeue(opponent)
+                self._match(head, opponent)
+                matches += 1
+        
+        while self._finished and now - self._finished[0].finished_at > self.RETAIN_FINISHED:
+            self.tickets.pop(self._finished.popleft().id, None)
+        return matches
+    
+    def _nearby_opponent(self, ticket: Ticket, now: float) -> Optional[Ticket]:
+        """Longest-waiting head of the closest neighbouring bucket the ticket's
+        wait allows it to reach."""
+        distance = min(int((now - ticket.enqueued_at) / self.WIDEN_AFTER), self.MAX_BUCKET_DISTANCE)
+        for offset in range(1, distance + 1):
+            candidates = [
+                head for head in (self._head(ticket.bucket - offset), self._head(ticket.bucket + offset))
+                if head is not None
+            ]
+            if candidates:
+                return min(candidates, key=lambda head: head.enqueued_at)
+        return None
+    
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.SWEEP_INTERVAL)
+            self.sweep()
+    
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever())
+    
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+    
+    # Stats
+    
+    def queue_depths(self) -> Dict[int, int]:
+        """Queued tickets keyed by the lowest skill of each bucket."""
+        return {bucket * self.BUCKET_WIDTH: depth for bucket, depth in sorted(self._depths.items())}
+    
+    def oldest_wait(self, now: Optional[float] = None) -> float:
+        now = now if now is not None else time.time()
+        heads = [self._head(bucket) for bucket in list(self._buckets)]
+        return max((now - head.enqueued_at for head in heads if head), default=0.0)
+    
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "buckets": self.queue_depths(),
+            "oldest_wait_seconds": round(self.oldest_wait(), 3),
+            "recent_wait_seconds": _percentiles(self._recent_waits),
+        }
+
+
+def _percentiles(values) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    pick = lambda pct: round(ordered[min(len(ordered) - 1, int(pct * len(ordered)))], 3)
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "max": round(ordered[-1], 3)}
+
+
+_matchmaking_service: Optional[MatchmakingService] = None
+
+
+def get_matchmaking_service() -> MatchmakingService:
+    """Get or create matchmaking service instance."""
+    global _matchmaking_service
+    if _matchmaking_service is None:
+        from app.services.game_service import game_service
+        _matchmaking_service = MatchmakingService(create_game=game_service.create_game)
+    return _matchmaking_service
+
+
+metrics.gauge("matchmaking_queue_depth", "Players waiting for a match").set_function(
+    lambda: _matchmaking_service.queued if _matchmaking_service else 0
+)
+metrics.gauge("matchmaking_oldest_wait_seconds", "Wait time of the longest-queued player").set_function(
+    lambda: _matchmaking_service.oldest_wait() if _matchmaking_service else 0
+)
@@ -0,0 +1,244 @@
+"""In-process metrics with Prometheus text exposition.
+
+Metrics are updated from the event loop thread only, so the counters are plain
+dict/list updates with no locking. Gauges that describe current state (rooms,
+connections) are computed from callbacks at scrape time and cost nothing on
+the hot path.
+"""
+import math
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds, tuned for in-memory request handling
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """Base class for a named metric family."""
+    metric_type = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+    
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return lines
+    
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set."""
+    metric_type = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+    
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+    
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a callback at scrape time."""
+    metric_type = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+    
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+    
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+    
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+    
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Computes the (unlabelled) value lazily on every scrape."""
+        self._function = function
+    
+    def get(self, *labels: str) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._values.get(labels, 0.0)
+    
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Histogram(Metric):
+    """Bucketed distribution of observed values per label set."""
+    metric_type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+    
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+    
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+    
+    def _samples(self) -> List[str]:
+        lines = []
+        bucket_names = self.labelnames + ("le",)
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_names, labels + (_format_value(bound),))} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text format."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} already registered as {existing.metric_type}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton registry
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template.
+    
+    Labels use the matched route path (e.g. /api/game/{room_id}/shot), not the
+    raw URL, so the number of series stays bounded.
+    """
+    
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.latency = registry.histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by route",
+            ("method", "route"),
+        )
+        self.requests = registry.counter(
+            "http_requests_total",
+            "HTTP requests by route and status code",
+            ("method", "route", "status"),
+        )
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = ["500"]
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+        
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            self.latency.observe(perf_counter() - start, scope["method"], path)
+            self.requests.inc(scope["method"], path, status[0])
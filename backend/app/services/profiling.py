@@ -0,0 +1,310 @@
+"""On-demand request profiling and phase timing.
+
+Captures are armed for the next N requests of a route template or a room and
+run either cProfile or a wall-clock stack sampler. When nothing is armed the
+middleware does a single attribute check, and `phase()` hands back a shared
+no-op context manager, so the disabled cost is negligible.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.services.metrics import metrics
+
+PHASE_DURATION = metrics.histogram(
+    "profiling_phase_duration_seconds",
+    "Duration of instrumented request phases (only while phase timing is on)",
+    ("phase",),
+)
+
+_NULL_PHASE = nullcontext()
+
+
+@dataclass
+class CaptureRequest:
+    """An armed capture waiting for matching requests."""
+    id: str
+    target_type: str  # "route" or "room"
+    target: str
+    mode: str  # "cprofile" or "sampling"
+    remaining: int
+    interval: float = 0.001
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class CaptureResult:
+    """Profile data from one captured request."""
+    id: str
+    capture_id: str
+    mode: str
+    method: str
+    path: str
+    route: str
+    room_id: Optional[str]
+    started_at: float
+    duration: float
+    data: bytes  # marshalled pstats for cProfile, collapsed stacks for sampling
+    
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "capture_id": self.capture_id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "room_id": self.room_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "formats": ["prof", "text"] if self.mode == "cprofile" else ["collapsed"],
+        }
+
+
+class _PhaseTimer:
+    __slots__ = ("service", "name", "start")
+    
+    def __init__(self, service: "ProfilingService", name: str):
+        self.service = service
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.service._record_phase(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer from a helper thread."""
+    
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+    
+    def start(self) -> None:
+        self._thread.start()
+    
+    def stop(self) -> bytes:
+        self._stop.set()
+        self._thread.join()
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return ("\n".join(lines) + "\n").encode() if lines else b""
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+
+class ProfilingService:
+    """Arms per-route / per-room captures and collects phase timings."""
+    
+    MAX_RESULTS = 50
+    
+    def __init__(self):
+        self.armed = False
+        self.phase_timing = False
+        self._captures: Dict[str, CaptureRequest] = {}
+        self._results: Deque[CaptureResult] = deque(maxlen=self.MAX_RESULTS)
+        self._phase_stats: Dict[str, List[float]] = {}  # name -> [count, total, max]
+        self._profiling_active = False
+    
+    # Captures
+    
+    def arm(
+        self,
+        target_type: str,
+        target: str,
+        count: int,
+        mode: str = "cprofile",
+        interval: float = 0.001
+    ) -> CaptureRequest:
+        if target_type not in ("route", "room"):
+            raise ValueError("target_type must be 'route' or 'room'")
+        if mode not in ("cprofile", "sampling"):
+            raise ValueError("mode must be 'cprofile' or 'sampling'")
+        capture = CaptureRequest(
+            id=uuid.uuid4().hex[:12],
+            target_type=target_type,
+            target=target,
+            mode=mode,
+            remaining=count,
+            interval=interval,
+        )
+        self._captures[capture.id] = capture
+        self.armed = True
+        return capture
+    
+    def disarm(self, capture_id: str) -> bool:
+        removed = self._captures.pop(capture_id, None) is not None
+        self.armed = bool(self._captures)
+        return removed
+    
+    def list_captures(self) -> List[CaptureRequest]:
+        return list(self._captures.values())
+    
+    def list_results(self) -> List[CaptureResult]:
+        return list(self._results)
+    
+    def get_result(self, result_id: str) -> Optional[CaptureResult]:
+        return next((r for r in self._results if r.id == result_id), None)
+    
+    def _take_capture(self, route: str, room_id: Optional[str]) -> Optional[CaptureRequest]:
+        """Claims one slot of the first capture matching this request."""
+        if self._profiling_active:
+            # cProfile and the sampler are per-thread; don't nest captures
+            return None
+        for capture in self._captures.values():
+            target = route if capture.target_type == "route" else room_id
+            if capture.target == target:
+                capture.remaining -= 1
+                if capture.remaining <= 0:
+                    self.disarm(capture.id)
+                return capture
+        return None
+    
+    async def profile_request(self, app, scope, receive, send, route: str, room_id: Optional[str]) -> None:
+        capture = self._take_capture(route, room_id)
+        if capture is None:
+            await app(scope, receive, send)
+            return
+        
+        self._profiling_active = True
+        started_at = time.time()
+        start = time.perf_counter()
+        profile = sampler = None
+        if capture.mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            sampler = StackSampler(threading.get_ident(), capture.interval)
+            sampler.start()
+        try:
+            await app(scope, receive, send)
+        finally:
+            duration = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                data = marshal.dumps(pstats.Stats(profile).stats)
+            else:
+                data = sampler.stop()
+            self._profiling_active = False
+            self._results.append(CaptureResult(
+                id=uuid.uuid4().hex[:12],
+                capture_id=capture.id,
+                mode=capture.mode,
+                method=scope.get("method", ""),
+                path=scope.get("path", ""),
+                route=route,
+                room_id=room_id,
+                started_at=started_at,
+                duration=duration,
+                data=data,
+            ))
+    
+    # Phase timing
+    
+    def phase(self, name: str):
+        """Context manager timing a named phase; a shared no-op when disabled."""
+        if not self.phase_timing:
+            return _NULL_PHASE
+        return _PhaseTimer(self, name)
+    
+    def set_phase_timing(self, enabled: bool) -> None:
+        self.phase_timing = enabled
+    
+    def _record_phase(self, name: str, seconds: float) -> None:
+        PHASE_DURATION.observe(seconds, name)
+        stats = self._phase_stats.get(name)
+        if stats is None:
+            stats = self._phase_stats[name] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        if seconds > stats[2]:
+            stats[2] = seconds
+    
+    def phase_summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "count": int(count),
+                "mean_ms": round(total / count * 1000, 4) if count else 0.0,
+                "max_ms": round(maximum * 1000, 4),
+                "total_ms": round(total * 1000, 3),
+            }
+            for name, (count, total, maximum) in self._phase_stats.items()
+        }
+    
+    def reset_phases(self) -> None:
+        self._phase_stats.clear()
+
+
+def pstats_text(result: CaptureResult, limit: int = 60) -> str:
+    """Renders a cProfile result as a pstats report sorted by cumulative time."""
+    stream = io.StringIO()
+    stats = pstats.Stats(_MarshalledProfile(result.data), stream=stream)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+class _MarshalledProfile:
+    """Adapter so pstats.Stats can load marshalled stats from memory."""
+    
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+    
+    def create_stats(self) -> None:
+        pass
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that hands matching requests to the profiler.
+    
+    Route templates and room ids are only resolved while a capture is armed.
+    """
+    
+    def __init__(self, app, service: Optional[ProfilingService] = None):
+        self.app = app
+        self.service = service or profiler
+    
+    async def __call__(self, scope, receive, send):
+        if not self.service.armed or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route, room_id = _resolve_route(scope)
+        await self.service.profile_request(self.app, scope, receive, send, route, room_id)
+
+
+def _resolve_route(scope) -> Tuple[str, Optional[str]]:
+    from starlette.routing import Match
+    app = scope.get("app")
+    for route in getattr(app, "routes", []):
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return route.path, child_scope.get("path_params", {}).get("room_id")
+    return "unmatched", None
+
+
+# Singleton instance
+profiler = ProfilingService()
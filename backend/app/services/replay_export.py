@@ -0,0 +1,160 @@
+"""Streams a room's full journal (every action and outcome) as a replay file.
+
+Two formats:
+
+- "ndjson": one compact JSON object per action, with its sequence number.
+- "binary": a header (magic, format version, room id) followed by records
+  of u16 payload length, u8 kind, u32 sequence number, f64 timestamp,
+  u8 resulting state, then kind-specific fixed-width fields. Enums use the
+  snapshot code tables; strings are length-prefixed UTF-8. Readers skip
+  records of kinds they don't know by their length.
+
+Records are read from the journal segments one at a time and sent in
+chunks of about CHUNK_BYTES, so a replay is never held in memory whole.
+"""
+import json
+import math
+import struct
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.services.journal import Journal
+from app.services.snapshot import ARCHETYPES, CONTESTS, DEFENSE_TYPES, SHOT_TYPES, STATES
+
+FORMAT_VERSION = 2
+MAGIC = b"BBREPLAY"
+CHUNK_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "binary": "application/octet-stream",
+}
+
+# Record kind codes. Append only.
+KINDS = [
+    "game_created",
+    "shot_selected",
+    "defense_selected",
+    "shot_resolved",
+    "animation_finished",
+    "turn_advanced",
+    "game_over",
+    "game_deleted",
+    "checkpoint",
+    "room_handed_off",
+]
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+NO_STATE = 0xFF
+
+# Journal records hold enum values; the code tables (but STATES) hold members
+_STATE_CODES = {state: code for code, state in enumerate(STATES)}
+_SHOT_TYPE_CODES = {shot_type and shot_type.value: code for code, shot_type in enumerate(SHOT_TYPES)}
+_DEFENSE_TYPE_CODES = {defense_type and defense_type.value: code for code, defense_type in enumerate(DEFENSE_TYPES)}
+_ARCHETYPE_CODES = {archetype.value: code for code, archetype in enumerate(ARCHETYPES)}
+_CONTEST_CODES = {contest.value: code for code, contest in enumerate(CONTESTS)}
+
+_FILE_HEADER = struct.Struct("<8sHH")
+# payload length (after these two bytes), kind, sequence number, timestamp, to_state
+_RECORD_HEADER = struct.Struct("<HBIdB")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+# power (signed: journals may predate the API's 0-100 check), timing_error
+# (NaN: none), archetype, contest level, make probability, made
+_SHOT_RESOLVED = struct.Struct("<idBBdB")
+# points scored, player one score, player two score
+_ANIMATION_FINISHED = struct.Struct("<BHH")
+_SCORES = struct.Struct("<HH")
+
+
+# Short strings (names, timing grades) are clipped to this many bytes, or
+# what their length field holds, so a record always fits its u16 length.
+# The API caps names at 50 characters; only journals written before that
+# can hold longer ones.
+_MAX_SHORT_TEXT = 1024
+
+
+def _text(value: Optional[str], length: struct.Struct = _U16) -> bytes:
+    data = (value or "").encode()
+    if length is not _U32:
+        limit = min(_MAX_SHORT_TEXT, (1 << 8 * length.size) - 1)
+        if len(data) > limit:
+            # Cut at a character boundary
+            data = data[:limit].decode(errors="ignore").encode()
+    return length.pack(len(data)) + data
+
+
+def _payload(record: Dict[str, Any]) -> bytes:
+    kind = record["event"]
+    if kind == "game_created":
+        return _text(record["player_one"]) + _text(record["player_two"])
+    if kind == "shot_selected":
+        return _U8.pack(_SHOT_TYPE_CODES[record["shot_type"]]) + _text(record["player"])
+    if kind == "defense_selected":
+        return _U8.pack(_DEFENSE_TYPE_CODES[record["defense_type"]]) + _text(record["player"])
+    if kind == "shot_resolved":
+        timing_error = record["timing_error"]
+        return _SHOT_RESOLVED.pack(
+            record["power"],
+            math.nan if timing_error is None else timing_error,
+            _ARCHETYPE_CODES[record["archetype"]],
+            _CONTEST_CODES[record["contest_level"]],
+            record["make_probability"],
+            record["made"],
+        ) + _text(record["timing_grade"], _U8) + _text(record["player"])
+    if kind == "animation_finished":
+        return _ANIMATION_FINISHED.pack(record["points_scored"], record["player_one_score"], record["player_two_score"])
+    if kind == "turn_advanced":
+        return _text(record["offensive_player"])
+    if kind == "game_over":
+        return _SCORES.pack(record["player_one_score"], record["player_two_score"]) + _text(record["winner"])
+    if kind == "checkpoint":
+        return _text(json.dumps(record["game"], separators=(",", ":")), _U32)
+    return b""
+
+
+def encode_binary(seq: int, record: Dict[str, Any]) -> bytes:
+    payload = _payload(record)
+    state = record.get("to_state")
+    header = _RECORD_HEADER.pack(
+        _RECORD_HEADER.size - 2 + len(payload),
+        _KIND_CODES[record["event"]],
+        seq,
+        record["timestamp"],
+        NO_STATE if state is None else _STATE_CODES[state],
+    )
+    return header + payload
+
+
+def encode_ndjson(seq: int, record: Dict[str, Any]) -> bytes:
+    line = {"seq": seq}
+    line.update(record)
+    del line["room_id"]
+    return (json.dumps(line, separators=(",", ":")) + "\n").encode()
+
+
+def binary_header(room_id: str) -> bytes:
+    room = room_id.encode()
+    return _FILE_HEADER.pack(MAGIC, FORMAT_VERSION, len(room)) + room
+
+
+def iter_replay(
+    journal: Journal,
+    room_id: str,
+    format: str = "ndjson",
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Yields the encoded replay of records [offset, offset + limit) in chunks."""
+    encode: Callable[[int, Dict[str, Any]], bytes] = encode_binary if format == "binary" else encode_ndjson
+    records = journal.records(room_id, offset=offset)
+    if limit is not None:
+        records = islice(records, limit)
+    chunk = bytearray(binary_header(room_id) if format == "binary" else b"")
+    for seq, record in enumerate(records, offset):
+        chunk += encode(seq, record)
+        if len(chunk) >= CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
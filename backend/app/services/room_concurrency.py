@@ -0,0 +1,95 @@
+"""Per-room serialization of game actions and idempotent retries."""
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.events import GameEvent, GameDeleted, RoomHandedOff
+from app.services.metrics import metrics
+
+IDEMPOTENT_REPLAYS = metrics.counter(
+    "game_idempotent_replays_total",
+    "Actions answered from the idempotency cache instead of being re-applied",
+    ("action",),
+)
+
+
+class RoomLocks:
+    """One asyncio.Lock per room, created on demand and dropped when idle.
+    
+    Actions on the same room run one at a time (including their broadcast, so
+    clients see states in order); different rooms never contend.
+    """
+    
+    def __init__(self):
+        self._locks: Dict[str, List] = {}  # room_id -> [lock, holders + waiters]
+    
+    @asynccontextmanager
+    async def hold(self, room_id: str):
+        entry = self._locks.get(room_id)
+        if entry is None:
+            entry = self._locks[room_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[room_id]
+    
+    def locked(self, room_id: str) -> bool:
+        entry = self._locks.get(room_id)
+        return entry is not None and entry[0].locked()
+
+
+class IdempotencyKeyConflict(Exception):
+    """An Idempotency-Key was reused for a different action."""
+
+
+class IdempotencyCache:
+    """Recent action results per room, keyed by client Idempotency-Key."""
+    
+    MAX_KEYS_PER_ROOM = 64
+    
+    def __init__(self):
+        self._rooms: Dict[str, "OrderedDict[str, Tuple[str, Any]]"] = {}
+    
+    def get(self, room_id: str, action: str, key: str) -> Optional[Any]:
+        """Cached result for a retried key, or None for a new key.
+        
+        Raises IdempotencyKeyConflict if the key was used for another action.
+        """
+        entry = self._rooms.get(room_id, {}).get(key)
+        if entry is None:
+            return None
+        if entry[0] != action:
+            raise IdempotencyKeyConflict(f"Idempotency-Key already used for {entry[0]}")
+        IDEMPOTENT_REPLAYS.inc(action)
+        return entry[1]
+    
+    def put(self, room_id: str, action: str, key: str, result: Any) -> None:
+        results = self._rooms.get(room_id)
+        if results is None:
+            results = self._rooms[room_id] = OrderedDict()
+        results[key] = (action, result)
+        if len(results) > self.MAX_KEYS_PER_ROOM:
+            results.popitem(last=False)
+    
+    def export(self, room_id: str) -> List[List[Any]]:
+        """A room's cached results as [key, action, result] lists, oldest first."""
+        return [[key, action, result] for key, (action, result) in self._rooms.get(room_id, {}).items()]
+    
+    def load(self, room_id: str, entries: List[List[Any]]) -> None:
+        for key, action, result in entries:
+            self.put(room_id, action, key, result)
+    
+    def on_game_event(self, event: GameEvent) -> None:
+        """GameService listener: forgets the keys of a deleted or handed-off room."""
+        if isinstance(event, (GameDeleted, RoomHandedOff)):
+            self._rooms.pop(event.room_id, None)
+
+
+# Singleton instances
+room_locks = RoomLocks()
+idempotency_cache = IdempotencyCache()
@@ -0,0 +1,144 @@
+"""Secondary indexes over GameService.games for listing and player lookups."""
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.models.game import Game
+
+# Index key: (updated_at, room_id); sorting by it orders rooms by activity
+RoomKey = Tuple[float, str]
+
+
+def _player_key(name: str) -> str:
+    return name.strip().casefold()
+
+
+class RoomIndex:
+    """Per-state activity-ordered room lists and a player-name index.
+    
+    Kept current by GameService on every mutation, so listings cost
+    O(log n + page size) instead of a scan of every game.
+    """
+    
+    def __init__(self):
+        self._by_state: Dict[str, List[RoomKey]] = {}
+        self._keys: Dict[str, Tuple[str, RoomKey]] = {}  # room_id -> (state, key)
+        self._by_player: Dict[str, Set[str]] = {}
+    
+    def update(self, game: Game) -> None:
+        """Re-indexes a game after it was created or changed."""
+        room_id = game.room_id
+        previous = self._keys.get(room_id)
+        if previous is None:
+            for player in (game.player_one, game.player_two):
+                self._by_player.setdefault(_player_key(player.name), set()).add(room_id)
+        else:
+            self._remove_key(*previous)
+        key = (game.updated_at, room_id)
+        insort(self._by_state.setdefault(game.state, []), key)
+        self._keys[room_id] = (game.state, key)
+    
+    def load(self, games: List[Game]) -> None:
+        """Indexes many games at once (e.g. a snapshot restore).
+        
+        Sorts each state's list once instead of inserting game by game.
+        """
+        for game in games:
+            previous = self._keys.pop(game.room_id, None)
+            if previous is not None:
+                self._remove_key(*previous)
+        touched = set()
+        for game in games:
+            room_id = game.room_id
+            for player in (game.player_one, game.player_two):
+                self._by_player.setdefault(_player_key(player.name), set()).add(room_id)
+            key = (game.updated_at, room_id)
+            self._by_state.setdefault(game.state, []).append(key)
+            self._keys[room_id] = (game.state, key)
+            touched.add(game.state)
+        for state in touched:
+            self._by_state[state].sort()
+    
+    def remove(self, game: Game) -> None:
+        """Drops a deleted game from every index."""
+        previous = self._keys.pop(game.room_id, None)
+        if previous is not None:
+            self._remove_key(*previous)
+        for player in (game.player_one, game.player_two):
+            rooms = self._by_player.get(_player_key(player.name))
+            if rooms is not None:
+                rooms.discard(game.room_id)
+                if not rooms:
+                    del self._by_player[_player_key(player.name)]
+    
+    def _remove_key(self, state: str, key: RoomKey) -> None:
+        keys = self._by_state[state]
+        del keys[bisect_left(keys, key)]
+        if not keys:
+            del self._by_state[state]
+    
+    def rooms_for_player(self, name: str) -> Set[str]:
+        return self._by_player.get(_player_key(name), set())
+    
+    def count(self, state: Optional[str] = None) -> int:
+        if state is None:
+            return len(self._keys)
+        return len(self._by_state.get(state, ()))
+    
+    def list_rooms(
+        self,
+        state: Optional[str] = None,
+        active_since: Optional[float] = None,
+        player: Optional[str] = None,
+        limit: int = 50,
+        before: Optional[RoomKey] = None
+    ) -> List[str]:
+        """Room ids ordered by most recent activity, newest first.
+        
+        `before` is the key of the last room on the previous page.
+        """
+        rooms = []
+        for updated_at, room_id in self._iter_newest_first(state, player, before):
+            if active_since is not None and updated_at < active_since:
+                break
+            rooms.append(room_id)
+            if len(rooms) >= limit:
+                break
+        return rooms
+    
+    def key_of(self, room_id: str) -> Optional[RoomKey]:
+        entry = self._keys.get(room_id)
+        return entry[1] if entry else None
+    
+    def _iter_newest_first(
+        self,
+        state: Optional[str],
+        player: Optional[str],
+        before: Optional[RoomKey]
+    ) -> Iterator[RoomKey]:
+        if player is not None:
+            # Players have few rooms; sort just those
+            keys = sorted(
+                entry[1]
+                for room_id in self.rooms_for_player(player)
+                if (entry := self._keys.get(room_id)) and (state is None or entry[0] == state)
+            )
+            end = bisect_left(keys, before) if before else len(keys)
+            return reversed(keys[:end])
+        
+        states = [state] if state is not None else list(self._by_state)
+        iterators = []
+        for name in states:
+            keys = self._by_state.get(name)
+            if keys:
+                end = bisect_left(keys, before) if before else len(keys)
+                iterators.append(_reverse_slice(keys, end))
+        if len(iterators) == 1:
+            return iterators[0]
+        return merge(*iterators, reverse=True)
+
+
+def _reverse_slice(keys: List[RoomKey], end: int) -> Iterator[RoomKey]:
+    for i in range(end - 1, -1, -1):
+        yield keys[i]
+
@@ -0,0 +1,89 @@
+"""Consistent-hash assignment of rooms to worker processes.
+
+Each worker sits on a hash ring at VNODES points; a room belongs to the first
+worker point clockwise from the hash of its id. When a worker joins or leaves
+only the rooms on the arcs it gains or loses change owner (about 1/n of them).
+"""
+import hashlib
+import os
+import uuid
+from bisect import bisect, bisect_left
+from typing import Iterable, List, Optional
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Maps keys to nodes by consistent hashing with virtual nodes."""
+    
+    VNODES = 64
+    
+    def __init__(self, nodes: Iterable[str] = (), vnodes: Optional[int] = None):
+        self.vnodes = vnodes or self.VNODES
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []  # Node for the point at the same index
+        for node in nodes:
+            self.add_node(node)
+    
+    def add_node(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.vnodes):
+            point = _hash(f"{node}#{replica}")
+            index = bisect_left(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+    
+    def remove_node(self, node: str) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+    
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        return self._owners[bisect(self._points, _hash(key)) % len(self._points)]
+
+
+class ShardMembership:
+    """This process's place in the worker ring.
+    
+    Configured from SHARD_NODES (comma-separated worker names) and SHARD_NODE
+    (this worker's name); app.router sets both. Without them the process owns
+    every room.
+    """
+    
+    def __init__(self):
+        self.node: Optional[str] = os.getenv("SHARD_NODE") or None
+        self.ring: Optional[HashRing] = None
+        nodes = [name.strip() for name in os.getenv("SHARD_NODES", "").split(",") if name.strip()]
+        if self.node and nodes:
+            self.set_nodes(nodes)
+    
+    def set_nodes(self, nodes: List[str]) -> None:
+        """Replaces the ring membership, e.g. when the router adds a worker."""
+        if self.node not in nodes:
+            raise ValueError(f"{self.node} is not in the ring")
+        self.ring = HashRing(nodes)
+    
+    def owns(self, room_id: str) -> bool:
+        return self.ring is None or self.ring.node_for(room_id) == self.node
+    
+    def new_room_id(self) -> str:
+        """A fresh room id that hashes to this worker, so the router sends the
+        room's requests back here (n tries on average with n workers)."""
+        while True:
+            room_id = str(uuid.uuid4())
+            if self.owns(room_id):
+                return room_id
+
+
+# Singleton instance
+shard = ShardMembership()
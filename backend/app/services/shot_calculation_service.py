@@ -1,4 +1,6 @@
 """Service for shot calculation logic (can be extended for AI later)."""
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
 from app.models.offense import Offense, ShotType
 from app.models.defense import Defense, DefenseType
 
@@ -6,6 +8,9 @@ from app.models.defense import Defense, DefenseType
 class ShotCalculationService:
     """Service for calculating shot probabilities and results."""
     
+    # (shot_type, defense_type) -> (base make %, base + defense adjustment, turnover %)
+    _SHOT_CONSTANTS: Optional[Dict[Tuple[ShotType, DefenseType], Tuple[float, float, int]]] = None
+    
     @staticmethod
     def calculate_make_percentage(
         shot_type: ShotType,
@@ -32,4 +37,94 @@ class ShotCalculationService:
         defense = Defense(defense_type)
         offense.calculate_shot_percentage(power, defense)
         return offense.determine_shot_result(player, shot_type, defense)
-
+    
+    @classmethod
+    def _get_shot_constants(cls) -> Dict[Tuple[ShotType, DefenseType], Tuple[float, float, int]]:
+        """Precomputes the per-(shot, defense) constants of the legacy model."""
+        if cls._SHOT_CONSTANTS is None:
+            constants = {}
+            for shot_type in ShotType:
+                offense = Offense()
+                offense.select_shot(shot_type)
+                for defense_type in DefenseType:
+                    defense = Defense(defense_type)
+                    constants[(shot_type, defense_type)] = (
+                        offense.make_percentage,
+                        offense.make_percentage + defense.get_adjusted_shot_percentage(),
+                        defense.get_turnover_percentage(),
+                    )
+            cls._SHOT_CONSTANTS = constants
+        return cls._SHOT_CONSTANTS
+    
+    @classmethod
+    def calculate_make_percentages(
+        cls,
+        shot_types: Sequence[ShotType],
+        powers: Sequence[int],
+        defense_types: Sequence[DefenseType]
+    ) -> List[float]:
+        """Batch variant of calculate_make_percentage.
+        
+        Takes parallel sequences and returns one make percentage per shot,
+        matching the scalar legacy path exactly. The backend has no numpy,
+        so this is a plain loop over precomputed per-(shot, defense)
+        constants rather than array math.
+        """
+        if not len(shot_types) == len(powers) == len(defense_types):
+            raise ValueError("shot_types, powers and defense_types must have the same length")
+        
+        constants = cls._get_shot_constants()
+        optimal = Offense.OPTIMAL_PERCENTAGE
+        min_power, max_power = Offense.MIN_POWER, Offense.MAX_POWER
+        power_bonus = Offense.POWER_BONUS
+        
+        percentages = []
+        append = percentages.append
+        for shot_type, power, defense_type in zip(shot_types, powers, defense_types):
+            if power < min_power or power > max_power:
+                append(0.0)
+                continue
+            base, adjusted, _ = constants[(shot_type, defense_type)]
+            new_percentage = power + adjusted
+            if new_percentage > optimal:
+                new_percentage = optimal - (new_percentage - optimal)
+            append(base * (new_percentage / optimal) + power_bonus)
+        return percentages
+    
+    @classmethod
+    def determine_shot_results(
+        cls,
+        shot_types: Sequence[ShotType],
+        powers: Sequence[int],
+        defense_types: Sequence[DefenseType],
+        players: Optional[Sequence["Player"]] = None,
+        rng: Optional[random.Random] = None
+    ) -> Tuple[List[float], List[bool]]:
+        """Batch variant of determine_shot_result.
+        
+        Returns (make percentages, outcomes). Random draws are taken in the
+        same order as repeated scalar calls, so a seeded `rng` reproduces the
+        legacy results. If `players` is given, made shots are scored on them.
+        """
+        percentages = cls.calculate_make_percentages(shot_types, powers, defense_types)
+        if players is not None and len(players) != len(percentages):
+            raise ValueError("players must have the same length as shot_types")
+        
+        constants = cls._get_shot_constants()
+        uniform = (rng or random).uniform
+        low, high = Offense.MINIMUM_PERCENTAGE, Offense.OPTIMAL_PERCENTAGE
+        scorer = Offense()
+        
+        outcomes = []
+        for i, (shot_type, defense_type, make_percentage) in enumerate(
+            zip(shot_types, defense_types, percentages)
+        ):
+            random_percentage = uniform(low, high)
+            made = not (
+                random_percentage > make_percentage
+                or random_percentage <= constants[(shot_type, defense_type)][2]
+            )
+            if made and players is not None:
+                scorer._adjust_score(players[i], shot_type)
+            outcomes.append(made)
+        return percentages, outcomes
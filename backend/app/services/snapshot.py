@@ -0,0 +1,503 @@
+"""Binary snapshots of every live game, for restarts and deploys.
+
+A snapshot file is a header followed by the games stored column by column:
+one column per field, with enums as one-byte codes and numbers as
+fixed-width fields, then every shot history's ShotRecords (7 bytes each,
+also in columns) and a table of the distinct DefenseStates.
+
+Files are written to a temporary name through a memory map and renamed into
+place; restores read the memory map in place. The format version in the
+header is bumped whenever the layout changes.
+
+With SNAPSHOT_PATH set the app saves every room there on shutdown and
+restores them on startup.
+"""
+import gc
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+from dataclasses import fields
+from itertools import accumulate, chain, count, repeat
+from operator import attrgetter, is_, is_not
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.models.defense import DefenseType
+from app.models.defense_state import DefenseState, DefensePersonality
+from app.models.game import Game, GameState
+from app.models.offense import ShotType
+from app.models.player import Player
+from app.models.shot_archetypes import ShotArchetype, ShotZone, ContestLevel
+from app.models.shot_record import ShotRecord
+from app.services.bot_service import bot_service
+from app.services.game_service import game_service
+
+FORMAT_VERSION = 1
+MAGIC = b"BBALLSNP"
+
+# Code tables: a value's code is its index. Append only; reordering or
+# removing entries needs a new FORMAT_VERSION.
+STATES = [state.value for state in GameState]
+SHOT_TYPES = [None, ShotType.DEFAULT, ShotType.LAYUP, ShotType.MIDRANGE, ShotType.THREE_POINTER, ShotType.HALF_COURT]
+DEFENSE_TYPES = [None, DefenseType.DEFAULT, DefenseType.BLOCK, DefenseType.STEAL, DefenseType.CONTEST]
+ARCHETYPES = [ShotArchetype.RIM, ShotArchetype.PAINT, ShotArchetype.MIDRANGE, ShotArchetype.THREE, ShotArchetype.DEEP]
+ZONES = [ShotZone.CORNER, ShotZone.WING, ShotZone.TOP, ShotZone.PAINT, ShotZone.RESTRICTED]
+CONTESTS = [ContestLevel.OPEN, ContestLevel.LIGHT, ContestLevel.HEAVY]
+PERSONALITIES = [
+    None,
+    DefensePersonality.DROP_BIG,
+    DefensePersonality.SWITCH_EVERYTHING,
+    DefensePersonality.NO_MIDDLE,
+    DefensePersonality.DARE_YOU_TO_SHOOT,
+]
+SUBTYPES = [
+    "layup", "dunk", "floater", "hook", "short_jumper", "pullup", "catch_shoot", "fade",
+    "corner_catch", "wing_catch", "top_catch", "corner_off_dribble", "wing_off_dribble",
+    "top_off_dribble", "logo", "heave",
+]
+SCHEMES = ["BALANCED", "SWITCH", "DROP", "NO_MIDDLE", "DARE"]
+
+# Enum members are singletons, so encoders look codes up by id() (a C-level
+# int hash) instead of hashing the members themselves
+_BY_ID = lambda values: {id(value): code for code, value in enumerate(values)}
+_STATE_CODES = {value: code for code, value in enumerate(STATES)}
+_SHOT_TYPE_CODES = _BY_ID(SHOT_TYPES)
+_DEFENSE_TYPE_CODES = _BY_ID(DEFENSE_TYPES)
+_ARCHETYPE_CODES = _BY_ID(ARCHETYPES)
+_ZONE_CODES = _BY_ID(ZONES)
+_CONTEST_CODES = _BY_ID(CONTESTS)
+_PERSONALITY_CODES = _BY_ID(PERSONALITIES)
+_SUBTYPE_CODES = {value: code for code, value in enumerate(SUBTYPES)}
+_SCHEME_CODES = {value: code for code, value in enumerate(SCHEMES)}
+
+# magic, format version, game count, saved_at, CRC-32 of everything after the header
+_FILE_HEADER = struct.Struct("<8sHIdI")
+# shot records, distinct defense states
+_COUNTS = struct.Struct("<II")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+# contest level + 1 per zone (0: zone absent), help_frequency, foul_rate,
+# help zones bitmask, personality, summary kind (0: None, 1: standard, 2: JSON)
+_DEFENSE = struct.Struct("<5BddBBB")
+# perimeter_pressure, rim_protection, scheme
+_SUMMARY = struct.Struct("<ddB")
+NO_DEFENSE = 0xFFFFFFFF
+
+# Stored for None in signed columns (power, shot_result)
+_NONE_AS_MINUS_ONE = {None: -1}
+# Takes the place of a missing DefenseState while keying states
+_NO_DEFENSE_STATE = DefenseState(contest_distribution={}, help_frequency=0.0, help_zones=[], foul_rate=0.0)
+_NO_DEFENSE_BY_ID = {id(None): _NO_DEFENSE_STATE}
+
+
+def _check_layout() -> None:
+    """Restores build objects field by field; fail loudly if a model changed."""
+    expected = {
+        Game: {
+            "player_one", "player_two", "current_offensive_player", "current_defensive_player", "state",
+            "shot_type", "defense_type", "power", "shot_result", "animation_finished", "room_id",
+            "shot_history", "defense_state", "version", "created_at", "updated_at", "response_cache",
+        },
+        Player: {"name", "score", "shot_history"},
+        DefenseState: {"contest_distribution", "help_frequency", "help_zones", "foul_rate", "personality", "summary"},
+        ShotRecord: {"archetype", "subtype", "zone", "contest_level", "made", "points", "turn_number"},
+    }
+    for model, names in expected.items():
+        if {f.name for f in fields(model)} != names:
+            raise RuntimeError(f"{model.__name__} fields changed; update app.services.snapshot and FORMAT_VERSION")
+
+
+_check_layout()
+
+
+# Encoding
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _distinct(keys: Iterable) -> Tuple[List[int], array]:
+    """Returns the position of each distinct key's first occurrence and, for
+    every key, the index of its distinct key in that list (all in C)."""
+    first: Dict[Any, int] = {}
+    positions = list(map(first.setdefault, keys, count()))
+    table = {position: index for index, position in enumerate(first.values())}
+    return list(first.values()), array("I", map(table.__getitem__, positions))
+
+
+def encode_games(games: List[Game]) -> bytes:
+    """Encodes games column by column.
+    
+    Every column is built with map() over attribute getters, so the per-game
+    and per-record work runs in C. DefenseStates are stored once per
+    distinct value and games refer to them by index.
+    """
+    get = attrgetter
+    rooms = list(map(str.encode, map(get("room_id"), games)))
+    ones = list(map(str.encode, map(get("player_one.name"), games)))
+    twos = list(map(str.encode, map(get("player_two.name"), games)))
+    histories = list(chain.from_iterable(
+        map(get("shot_history", "player_one.shot_history", "player_two.shot_history"), games)
+    ))
+    records = list(chain.from_iterable(histories))
+    powers = list(map(get("power"), games))
+    results = list(map(get("shot_result"), games))
+    defense_refs, defense_table = _encode_defense_states(list(map(get("defense_state"), games)))
+    strings = b"".join(rooms) + b"".join(ones) + b"".join(twos)
+    
+    return b"".join([
+        _COUNTS.pack(len(records), len(defense_table)),
+        # Games
+        _little_endian(array("I", map(get("version"), games))),
+        _little_endian(array("d", map(get("created_at"), games))),
+        _little_endian(array("d", map(get("updated_at"), games))),
+        bytes(map(_STATE_CODES.__getitem__, map(get("state"), games))),
+        bytes(map(_SHOT_TYPE_CODES.__getitem__, map(id, map(get("shot_type"), games)))),
+        bytes(map(_DEFENSE_TYPE_CODES.__getitem__, map(id, map(get("defense_type"), games)))),
+        _little_endian(array("h", map(_NONE_AS_MINUS_ONE.get, powers, powers))),
+        _little_endian(array("b", map(_NONE_AS_MINUS_ONE.get, results, results))),
+        bytes(map(get("animation_finished"), games)),
+        bytes(map(is_not, map(get("current_offensive_player"), games), map(get("player_one"), games))),
+        _little_endian(array("H", map(get("player_one.score"), games))),
+        _little_endian(array("H", map(get("player_two.score"), games))),
+        _little_endian(array("H", map(len, rooms))),
+        _little_endian(array("H", map(len, ones))),
+        _little_endian(array("H", map(len, twos))),
+        _little_endian(array("H", map(len, histories))),  # Game, player one, player two per game
+        _little_endian(defense_refs),
+        strings,
+        # Shot records (every history entry, in history order)
+        bytes(map(_ARCHETYPE_CODES.__getitem__, map(id, map(get("archetype"), records)))),
+        bytes(map(_ZONE_CODES.__getitem__, map(id, map(get("zone"), records)))),
+        bytes(map(_CONTEST_CODES.__getitem__, map(id, map(get("contest_level"), records)))),
+        bytes(map(_SUBTYPE_CODES.__getitem__, map(get("subtype"), records))),
+        bytes(map(get("made"), records)),
+        bytes(map(get("points"), records)),
+        _little_endian(array("H", map(get("turn_number"), records))),
+        # Distinct defense states
+        *defense_table,
+    ])
+
+
+def _encode_defense_states(states: List[Optional[DefenseState]]) -> Tuple[array, List[bytes]]:
+    """Returns a table index per game and the table of distinct encoded states.
+    
+    States are compared by a key of their fields' text (built in C), so only
+    the few distinct states the defense AI produces are encoded in Python.
+    """
+    states = list(map(_NO_DEFENSE_BY_ID.get, map(id, states), states))
+    distributions = list(map(attrgetter("contest_distribution"), states))
+    firsts, refs = _distinct(zip(
+        map(is_, states, repeat(_NO_DEFENSE_STATE)),
+        map(",".join, map(dict.keys, distributions)),
+        map(",".join, map(dict.values, distributions)),
+        map(",".join, map(attrgetter("help_zones"), states)),
+        map(attrgetter("help_frequency"), states),
+        map(attrgetter("foul_rate"), states),
+        map(id, map(attrgetter("personality"), states)),
+        map(repr, map(attrgetter("summary"), states)),
+    ))
+    table: List[bytes] = []
+    codes: List[int] = []
+    for position in firsts:
+        state = states[position]
+        if state is _NO_DEFENSE_STATE:
+            codes.append(NO_DEFENSE)
+        else:
+            codes.append(len(table))
+            table.append(_encode_defense(state))
+    return array("I", map(codes.__getitem__, refs)), table
+
+
+def _encode_defense(state: DefenseState) -> bytes:
+    distribution = state.contest_distribution
+    contests = [0] * len(ZONES)
+    for zone, level in distribution.items():
+        contests[_ZONE_CODES[id(zone)]] = _CONTEST_CODES[id(level)] + 1
+    help_zones = 0
+    for zone in state.help_zones:
+        help_zones |= 1 << _ZONE_CODES[id(zone)]
+    
+    summary = state.summary
+    standard = (
+        summary is not None
+        and len(summary) == 3
+        and summary.get("scheme") in _SCHEME_CODES
+        and "perimeter_pressure" in summary
+        and "rim_protection" in summary
+    )
+    kind = 0 if summary is None else 1 if standard else 2
+    data = _DEFENSE.pack(
+        *contests,
+        state.help_frequency,
+        state.foul_rate,
+        help_zones,
+        _PERSONALITY_CODES[id(state.personality)],
+        kind,
+    )
+    if kind == 1:
+        data += _SUMMARY.pack(summary["perimeter_pressure"], summary["rim_protection"], _SCHEME_CODES[summary["scheme"]])
+    elif kind == 2:
+        extra = json.dumps(summary).encode()
+        data += _U32.pack(len(extra)) + extra
+    return _U16.pack(len(data)) + data
+
+
+# Decoding
+
+class _RecordTable(dict):
+    """Decoded ShotRecords keyed by their column values.
+    
+    Identical records (in the same or different games) become one shared
+    object; records are never mutated after they are created.
+    """
+    
+    def __missing__(self, key) -> ShotRecord:
+        archetype, zone, contest, subtype, made, points, turn = key
+        record = self[key] = ShotRecord(
+            archetype=ARCHETYPES[archetype],
+            subtype=SUBTYPES[subtype],
+            zone=ZONES[zone],
+            contest_level=CONTESTS[contest],
+            made=bool(made),
+            points=points,
+            turn_number=turn,
+        )
+        return record
+
+
+class _Reader:
+    """Sequential reads of columns from a buffer."""
+    
+    def __init__(self, buffer, offset: int):
+        self.buffer = buffer
+        self.offset = offset
+    
+    def take(self, size: int) -> bytes:
+        data = self.buffer[self.offset:self.offset + size]
+        self.offset += size
+        return data
+    
+    def column(self, typecode: str, count: int) -> array:
+        column = array(typecode)
+        column.frombytes(self.take(column.itemsize * count))
+        if sys.byteorder != "little":
+            column.byteswap()
+        return column
+    
+    def unpack(self, layout: struct.Struct) -> tuple:
+        values = layout.unpack_from(self.buffer, self.offset)
+        self.offset += layout.size
+        return values
+
+
+def decode_games(buffer, count: int, offset: int = 0) -> Tuple[List[Game], int]:
+    """Decodes `count` games written by encode_games; returns them and the end offset.
+    
+    Decoded games share identical ShotRecords and DefenseStates (neither is
+    mutated once created).
+    """
+    reader = _Reader(buffer, offset)
+    record_count, defense_count = reader.unpack(_COUNTS)
+    versions = reader.column("I", count)
+    created = reader.column("d", count)
+    updated = reader.column("d", count)
+    states = map(STATES.__getitem__, reader.take(count))
+    shot_types = map(SHOT_TYPES.__getitem__, reader.take(count))
+    defense_types = map(DEFENSE_TYPES.__getitem__, reader.take(count))
+    powers = reader.column("h", count)
+    results = reader.column("b", count)
+    animations = reader.take(count)
+    offenses = reader.take(count)
+    scores_one = reader.column("H", count)
+    scores_two = reader.column("H", count)
+    string_columns = [reader.column("H", count) for _ in range(3)]
+    history_lengths = reader.column("H", 3 * count)
+    defense_refs = reader.column("I", count)
+    strings = []
+    for lengths in string_columns:
+        raw = reader.take(sum(lengths))
+        ends = list(accumulate(lengths))
+        if raw.isascii():
+            # Byte lengths are character lengths: decode once and slice
+            blob = raw.decode()
+            strings.append([blob[end - length:end] for end, length in zip(ends, lengths)])
+        else:
+            strings.append([raw[end - length:end].decode() for end, length in zip(ends, lengths)])
+    
+    table = _RecordTable()
+    records = list(map(table.__getitem__, zip(
+        reader.take(record_count),
+        reader.take(record_count),
+        reader.take(record_count),
+        reader.take(record_count),
+        reader.take(record_count),
+        reader.take(record_count),
+        reader.column("H", record_count),
+    )))
+    defense_states = [_decode_defense(reader) for _ in range(defense_count)]
+    
+    games = []
+    lengths = iter(history_lengths)
+    position = 0
+    new_player = Player.__new__
+    new_game = Game.__new__
+    for (
+        version, created_at, updated_at, state, shot_type, defense_type, power, result,
+        animation_finished, offense, score_one, score_two, room_id, one_name, two_name, defense_ref,
+    ) in zip(
+        versions, created, updated, states, shot_types, defense_types, powers, results,
+        animations, offenses, scores_one, scores_two, *strings, defense_refs,
+    ):
+        end = position + next(lengths)
+        game_history = records[position:end]
+        position, end = end, end + next(lengths)
+        one_history = records[position:end]
+        position, end = end, end + next(lengths)
+        two_history = records[position:end]
+        position = end
+        
+        # Built field by field (see _check_layout): dataclass __init__ is the
+        # slowest part of a restore
+        player_one = new_player(Player)
+        player_one.__dict__ = {"name": one_name, "score": score_one, "shot_history": one_history}
+        player_two = new_player(Player)
+        player_two.__dict__ = {"name": two_name, "score": score_two, "shot_history": two_history}
+        game = new_game(Game)
+        game.__dict__ = {
+            "player_one": player_one,
+            "player_two": player_two,
+            "current_offensive_player": player_two if offense else player_one,
+            "current_defensive_player": player_one if offense else player_two,
+            "state": state,
+            "shot_type": shot_type,
+            "defense_type": defense_type,
+            "power": None if power < 0 else power,
+            "shot_result": None if result < 0 else bool(result),
+            "animation_finished": bool(animation_finished),
+            "room_id": room_id,
+            "shot_history": game_history,
+            "defense_state": None if defense_ref == NO_DEFENSE else defense_states[defense_ref],
+            "version": version,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "response_cache": None,
+        }
+        games.append(game)
+    return games, reader.offset
+
+
+def _decode_defense(reader: _Reader) -> DefenseState:
+    (length,) = reader.unpack(_U16)
+    end = reader.offset + length
+    *contests, help_frequency, foul_rate, help_zones, personality, kind = reader.unpack(_DEFENSE)
+    summary = None
+    if kind == 1:
+        perimeter, rim, scheme = reader.unpack(_SUMMARY)
+        summary = {"perimeter_pressure": perimeter, "rim_protection": rim, "scheme": SCHEMES[scheme]}
+    elif kind == 2:
+        (size,) = reader.unpack(_U32)
+        summary = json.loads(reader.take(size))
+    reader.offset = end
+    return DefenseState(
+        contest_distribution={zone: CONTESTS[code - 1] for zone, code in zip(ZONES, contests) if code},
+        help_frequency=help_frequency,
+        help_zones=[zone for bit, zone in enumerate(ZONES) if help_zones & 1 << bit],
+        foul_rate=foul_rate,
+        personality=PERSONALITIES[personality],
+        summary=summary,
+    )
+
+
+# Files
+
+class SnapshotError(Exception):
+    """A snapshot file is missing, corrupt or from an unknown format version."""
+
+
+def write_snapshot(path: str, games: Iterable[Game], extras: Optional[Dict[str, Any]] = None) -> int:
+    """Writes games (and JSON-ready `extras`) to `path` atomically; returns the game count."""
+    games = list(games)
+    extra = json.dumps(extras or {}).encode()
+    body = encode_games(games) + _U32.pack(len(extra)) + extra
+    header = _FILE_HEADER.pack(MAGIC, FORMAT_VERSION, len(games), time.time(), zlib.crc32(body))
+    
+    temporary = f"{path}.tmp"
+    with open(temporary, "w+b") as f:
+        f.truncate(len(header) + len(body))
+        with mmap.mmap(f.fileno(), 0) as mapped:
+            mapped[:len(header)] = header
+            mapped[len(header):] = body
+            mapped.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return len(games)
+
+
+def read_snapshot(path: str) -> Tuple[List[Game], Dict[str, Any]]:
+    """Reads a snapshot written by write_snapshot; raises SnapshotError if unusable."""
+    try:
+        f = open(path, "rb")
+    except OSError as e:
+        raise SnapshotError(str(e))
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if len(mapped) < _FILE_HEADER.size:
+            raise SnapshotError("Truncated snapshot")
+        magic, version, count, _, checksum = _FILE_HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            raise SnapshotError("Not a game snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+        with memoryview(mapped) as view:
+            valid = zlib.crc32(view[_FILE_HEADER.size:]) == checksum
+        if not valid:
+            raise SnapshotError("Snapshot checksum mismatch")
+        games, offset = decode_games(mapped, count, _FILE_HEADER.size)
+        (length,) = _U32.unpack_from(mapped, offset)
+        extras = json.loads(mapped[offset + 4:offset + 4 + length])
+    return games, extras
+
+
+# Live rooms
+
+@contextmanager
+def _gc_paused():
+    """Bulk saves and restores allocate millions of objects that all stay
+    alive; collections during them only add time."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def save_rooms(path: str) -> int:
+    """Snapshots every game on this worker, with its bot seat; returns the room count."""
+    bots = [
+        {"room_id": seat.room_id, "player_name": seat.player_name, "policy": seat.policy.name, "think_time": seat.think_time}
+        for seat in bot_service.seats.values()
+    ]
+    with _gc_paused():
+        return write_snapshot(path, game_service.games.values(), {"bots": bots})
+
+
+def restore_rooms(path: str) -> int:
+    """Loads a snapshot written by save_rooms into GameService; returns the room count.
+    
+    Call from a running event loop (bot seats schedule their next move).
+    """
+    with _gc_paused():
+        games, extras = read_snapshot(path)
+        game_service.restore_games(games)
+    for bot in extras.get("bots", []):
+        bot_service.add_seat(**bot)
+    return len(games)
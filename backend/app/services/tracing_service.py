@@ -0,0 +1,269 @@
+"""Per-turn lifecycle tracing across the game state machine.
+
+Each turn (WAITING_FOR_SHOT through SHOT_RESULT) becomes one trace. State
+spans are opened and closed by GameService transition events, request spans
+wrap the API handlers, and broadcast spans come from ConnectionManager, so a
+turn shows how long the room sat in each state, how much of that was server
+processing, lock wait and fan-out. Turns are kept in a bounded buffer per
+room and exported in the Chrome trace event format (Perfetto, chrome://tracing).
+"""
+import os
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Any
+
+from app.models.events import GameEvent, GameTransitionEvent, GameDeleted, RoomHandedOff
+from app.models.game import GameState
+
+MAX_TURNS_PER_ROOM = 20
+
+# Chrome trace "thread" per span category
+_CATEGORY_TIDS = {"turn": 0, "state": 1, "server": 2, "broadcast": 3, "lock": 4}
+
+
+@dataclass
+class Span:
+    """A timed section of a turn."""
+    name: str
+    category: str  # "state", "server", "broadcast" or "lock"
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+
+@dataclass
+class TurnTrace:
+    """All spans recorded for one turn of a room."""
+    trace_id: str
+    room_id: str
+    turn: int
+    start: float
+    end: Optional[float] = None
+    spans: List[Span] = field(default_factory=list)
+    open_state: Optional[Span] = None
+
+
+# Turn the current request is bound to. A context variable rather than a
+# per-room slot, so concurrent requests for one room each keep their own
+_request_turn: ContextVar[Optional[TurnTrace]] = ContextVar("request_turn", default=None)
+
+
+class _RequestSpan:
+    __slots__ = ("tracer", "room_id", "name", "turn", "start", "_token")
+    
+    def __init__(self, tracer: "TracingService", room_id: str, name: str):
+        self.tracer = tracer
+        self.room_id = room_id
+        self.name = name
+    
+    def __enter__(self):
+        # Bind to the turn in progress when the request arrived, so a request
+        # that closes the turn is still attributed to it
+        self.turn = self.tracer._current.get(self.room_id)
+        self._token = _request_turn.set(self.turn)
+        self.start = time.time()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        _request_turn.reset(self._token)
+        if self.turn is not None:
+            attributes = {"error": getattr(exc, "status_code", exc_type.__name__)} if exc_type else {}
+            self.turn.spans.append(Span(self.name, "server", self.start, time.time(), attributes))
+        return False
+
+
+class TracingService:
+    """Collects turn traces for every room in bounded per-room buffers."""
+    
+    def __init__(self, enabled: bool = True, max_turns_per_room: int = MAX_TURNS_PER_ROOM):
+        self.enabled = enabled
+        self.max_turns_per_room = max_turns_per_room
+        self._current: Dict[str, TurnTrace] = {}
+        self._completed: Dict[str, Deque[TurnTrace]] = {}
+        self._turn_counts: Dict[str, int] = {}
+    
+    def on_game_event(self, event: GameEvent) -> None:
+        """GameService listener: advances state spans on every transition."""
+        if not self.enabled:
+            return
+        if isinstance(event, (GameDeleted, RoomHandedOff)):
+            # Traces are per worker; a moved room starts afresh on its new owner
+            self.drop_room(event.room_id)
+            return
+        if not isinstance(event, GameTransitionEvent):
+            return
+        
+        room_id, ts = event.room_id, event.timestamp
+        turn = self._current.get(room_id)
+        if turn is not None and turn.open_state is not None:
+            turn.open_state.end = ts
+        
+        if event.to_state == GameState.WAITING_FOR_SHOT.value:
+            if turn is not None:
+                self._close_turn(turn, ts)
+            turn = self._open_turn(room_id, ts)
+        elif turn is None:
+            return
+        
+        if event.to_state == GameState.GAME_OVER.value:
+            turn.open_state = None
+            self._close_turn(turn, ts)
+            return
+        turn.open_state = Span(f"state:{event.to_state}", "state", ts)
+        turn.spans.append(turn.open_state)
+    
+    def request_span(self, room_id: str, name: str):
+        """Context manager recording an API handler as a server span.
+        
+        Enter it once the room's lock is held, so lock wait is not counted
+        as processing (see record_lock_wait).
+        """
+        return _RequestSpan(self, room_id, f"server:{name}")
+    
+    def record_broadcast(self, room_id: str, start: float, end: float, recipients: int) -> None:
+        """Records a room broadcast (wall-clock start/end) on the turn of the
+        request that sent it, or the current turn outside a request."""
+        turn = _request_turn.get()
+        if turn is None or turn.room_id != room_id:
+            turn = self._current.get(room_id)
+        if turn is not None:
+            turn.spans.append(Span("broadcast", "broadcast", start, end, {"recipients": recipients}))
+    
+    def record_lock_wait(self, room_id: str, start: float, end: float) -> None:
+        """Records time a request spent queued behind another on the room's lock."""
+        turn = self._current.get(room_id)
+        if turn is not None:
+            turn.spans.append(Span("lock_wait", "lock", start, end))
+    
+    def _open_turn(self, room_id: str, ts: float) -> TurnTrace:
+        number = self._turn_counts.get(room_id, 0) + 1
+        self._turn_counts[room_id] = number
+        turn = TurnTrace(trace_id=uuid.uuid4().hex, room_id=room_id, turn=number, start=ts)
+        self._current[room_id] = turn
+        return turn
+    
+    def _close_turn(self, turn: TurnTrace, ts: float) -> None:
+        turn.end = ts
+        self._current.pop(turn.room_id, None)
+        buffer = self._completed.get(turn.room_id)
+        if buffer is None:
+            buffer = self._completed[turn.room_id] = deque(maxlen=self.max_turns_per_room)
+        buffer.append(turn)
+    
+    def drop_room(self, room_id: str) -> None:
+        self._current.pop(room_id, None)
+        self._completed.pop(room_id, None)
+        self._turn_counts.pop(room_id, None)
+    
+    def get_turns(self, room_id: str) -> List[TurnTrace]:
+        turns = list(self._completed.get(room_id, ()))
+        if room_id in self._current:
+            turns.append(self._current[room_id])
+        return turns
+    
+    def export_chrome_trace(self, room_id: str) -> Dict:
+        """Chrome trace event JSON for a room's buffered turns."""
+        events = [
+            {"ph": "M", "name": "process_name", "pid": 1, "tid": 0, "args": {"name": f"room {room_id}"}},
+        ]
+        events.extend(
+            {"ph": "M", "name": "thread_name", "pid": 1, "tid": tid, "args": {"name": category}}
+            for category, tid in _CATEGORY_TIDS.items()
+        )
+        now = time.time()
+        for turn in self.get_turns(room_id):
+            events.append({
+                "ph": "X",
+                "name": f"turn {turn.turn}",
+                "cat": "turn",
+                "pid": 1,
+                "tid": _CATEGORY_TIDS["turn"],
+                "ts": int(turn.start * 1e6),
+                "dur": int(((turn.end or now) - turn.start) * 1e6),
+                "args": {"trace_id": turn.trace_id, "complete": turn.end is not None},
+            })
+            for span in turn.spans:
+                events.append({
+                    "ph": "X",
+                    "name": span.name,
+                    "cat": span.category,
+                    "pid": 1,
+                    "tid": _CATEGORY_TIDS[span.category],
+                    "ts": int(span.start * 1e6),
+                    "dur": int(span.duration * 1e6),
+                    "args": {"trace_id": turn.trace_id, **span.attributes},
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+    
+    def summary(self) -> Dict:
+        """Where completed turn time goes, aggregated across all rooms."""
+        by_name: Dict[str, List[float]] = {}
+        turn_totals, server_totals, broadcast_totals, lock_totals = [], [], [], []
+        for buffer in self._completed.values():
+            for turn in buffer:
+                server = broadcast = lock = 0.0
+                for span in turn.spans:
+                    if span.end is None:
+                        continue
+                    by_name.setdefault(span.name, []).append(span.duration)
+                    if span.category == "server":
+                        server += span.duration
+                    elif span.category == "broadcast":
+                        broadcast += span.duration
+                    elif span.category == "lock":
+                        lock += span.duration
+                turn_totals.append(turn.end - turn.start)
+                server_totals.append(server)
+                broadcast_totals.append(broadcast)
+                lock_totals.append(lock)
+        
+        total_time = sum(turn_totals)
+        server_time = sum(server_totals)
+        broadcast_time = sum(broadcast_totals)
+        lock_time = sum(lock_totals)
+        # Broadcasts run inside request handlers, so they are part of server time
+        client_time = max(0.0, total_time - server_time - lock_time)
+        return {
+            "rooms": len(self._completed),
+            "turns": len(turn_totals),
+            "turn_duration": _distribution(turn_totals),
+            "breakdown": {
+                "client_think_and_network": _share(client_time, total_time),
+                "server_processing": _share(server_time - broadcast_time, total_time),
+                "broadcast": _share(broadcast_time, total_time),
+                "lock_wait": _share(lock_time, total_time),
+            },
+            "spans": {name: _distribution(values) for name, values in sorted(by_name.items())},
+        }
+
+
+def _share(seconds: float, total: float) -> Dict[str, float]:
+    return {
+        "total_ms": round(seconds * 1000, 3),
+        "fraction": round(seconds / total, 4) if total else 0.0,
+    }
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p95_ms": round(pick(0.95) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+# Singleton instance
+tracer = TracingService(enabled=os.getenv("TRACING_ENABLED", "1") != "0")
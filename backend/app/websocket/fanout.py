@@ -0,0 +1,88 @@
+"""Sending frames to many sockets in turn, each send bounded by SEND_TIMEOUT.
+
+A peer that stops reading lets its send buffer fill, after which a send to
+it never completes, so a send still running after SEND_TIMEOUT is given up
+on and the run moves on to the next socket. Timers cost far more than a
+send to a healthy socket, so instead of one per send (or per run) a single
+watchdog per event loop checks every running send_each each SEND_TIMEOUT
+seconds, and times out the send in progress if it is the one it saw last
+time. A stuck send is thus cut off after between one and two SEND_TIMEOUTs.
+"""
+import asyncio
+import weakref
+from typing import List, Optional, Sequence, Set, Tuple
+
+from fastapi import WebSocket
+
+from app.websocket.heartbeat import SEND_TIMEOUT
+
+
+class _Run:
+    """A send_each in progress, as seen by the watchdog."""
+    __slots__ = ("task", "position", "seen", "expired")
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.position = 0  # Sends started so far
+        self.seen = -1  # position at the watchdog's last check
+        self.expired = False
+
+
+class _Watchdog:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.runs: Set[_Run] = set()
+        self._handle: Optional[asyncio.TimerHandle] = None
+    
+    def add(self, run: _Run) -> None:
+        self.runs.add(run)
+        if self._handle is None:
+            self._handle = self.loop.call_later(SEND_TIMEOUT, self._check)
+    
+    def _check(self) -> None:
+        for run in self.runs:
+            if run.position == run.seen and not run.expired:
+                run.expired = True
+                run.task.cancel()
+            else:
+                run.seen = run.position
+        self._handle = self.loop.call_later(SEND_TIMEOUT, self._check) if self.runs else None
+
+
+_watchdogs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Watchdog]" = weakref.WeakKeyDictionary()
+
+
+async def send_each(sends: Sequence[Tuple[WebSocket, str]], yield_every: int = 0) -> List[int]:
+    """Sends each (socket, frame) in order; returns the positions of the sends
+    that raised or overran SEND_TIMEOUT.
+    
+    With `yield_every`, yields to the event loop after that many sends.
+    """
+    loop = asyncio.get_running_loop()
+    watchdog = _watchdogs.get(loop)
+    if watchdog is None:
+        watchdog = _watchdogs[loop] = _Watchdog(loop)
+    run = _Run(asyncio.current_task())
+    watchdog.add(run)
+    failed: List[int] = []
+    try:
+        while run.position < len(sends):
+            try:
+                while run.position < len(sends):
+                    websocket, frame = sends[run.position]
+                    run.position += 1
+                    try:
+                        await websocket.send_text(frame)
+                    except Exception:
+                        failed.append(run.position - 1)
+                    if yield_every and not run.position % yield_every:
+                        await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                # Re-raise unless the watchdog was the only canceller
+                if not run.expired or run.task.uncancel():
+                    raise
+                run.expired = False
+                failed.append(run.position - 1)
+    finally:
+        watchdog.runs.discard(run)
+    return failed
@@ -1,6 +1,68 @@
 from fastapi import WebSocket, WebSocketDisconnect
 from app.services.game_service import game_service
+from app.services.backplane import get_backplane
+from app.services.metrics import metrics
+from app.services.tracing_service import tracer
+from app.websocket.fanout import send_each
+from app.websocket.heartbeat import SEND_TIMEOUT, heartbeats
+from app.websocket.spectators import spectators
+from collections import deque
+from time import perf_counter, time
+from typing import Deque, Dict, List, Optional, Set, Tuple
+import asyncio
 import json
+import os
+
+BROADCAST_DURATION = metrics.histogram(
+    "ws_broadcast_duration_seconds",
+    "Time to fan a message out to every socket in a room",
+)
+BROADCAST_FANOUT = metrics.histogram(
+    "ws_broadcast_fanout_size",
+    "Number of sockets a room broadcast was sent to",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 1024),
+)
+RESUMES = metrics.counter(
+    "ws_resumes_total",
+    "Reconnects that sent last_seq, by how the client was brought up to date",
+    ("result",),
+)
+RESUME_REPLAYED = metrics.histogram(
+    "ws_resume_replayed_frames",
+    "Missed frames replayed to a resuming client",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+CONNECTION_LIFETIME = metrics.histogram(
+    "ws_connection_lifetime_seconds",
+    "How long game WebSockets stayed connected, by how they ended",
+    ("reason",),
+    buckets=(1, 5, 15, 60, 300, 900, 1800, 3600, 7200, 14400),
+)
+REAPED = metrics.counter(
+    "ws_reaped_connections_total",
+    "Game WebSockets closed for missing heartbeats",
+)
+SEND_FAILURES = metrics.counter(
+    "ws_send_failures_total",
+    "Game WebSockets dropped after a failed or timed-out broadcast send",
+)
+
+# Every game_state frame starts with this, followed by its sequence number
+GAME_STATE_FRAME_PREFIX = '{"type":"game_state","seq":'
+
+# Recent frames kept per room for clients that reconnect, and how long a
+# room's buffer outlives its last socket on this worker
+RESUME_BUFFER_FRAMES = int(os.getenv("WS_RESUME_BUFFER_FRAMES", "64"))
+RESUME_TTL = float(os.getenv("WS_RESUME_TTL", "60"))
+
+
+def frame_seq(frame: str) -> Optional[int]:
+    """Sequence number of a game_state frame, None for other messages."""
+    if not frame.startswith(GAME_STATE_FRAME_PREFIX):
+        return None
+    start = len(GAME_STATE_FRAME_PREFIX)
+    return int(frame[start:frame.index(",", start)])
 
 
 class ConnectionManager:
@@ -9,71 +71,269 @@ class ConnectionManager:
     def __init__(self):
         # room_id -> list of websockets
         self.active_connections: dict[str, list[WebSocket]] = {}
+        # room_id -> (seq, frame) for the latest frames, oldest first. Kept
+        # while the room has sockets here and RESUME_TTL seconds after.
+        self.replay: Dict[str, Deque[Tuple[int, str]]] = {}
+        self._replay_expiry: Dict[str, asyncio.TimerHandle] = {}
+        self._connected_at: Dict[WebSocket, float] = {}
+        self._closing: Set[asyncio.Task] = set()
     
     async def connect(self, websocket: WebSocket, room_id: str):
         """Connects a client to a room."""
         await websocket.accept()
+        self._connected_at[websocket] = perf_counter()
         if room_id not in self.active_connections:
             self.active_connections[room_id] = []
         self.active_connections[room_id].append(websocket)
+        expiry = self._replay_expiry.pop(room_id, None)
+        if expiry is not None:
+            expiry.cancel()
+        if room_id not in self.replay:
+            self.replay[room_id] = deque(maxlen=RESUME_BUFFER_FRAMES)
     
-    def disconnect(self, websocket: WebSocket, room_id: str):
-        """Disconnects a client from a room."""
-        if room_id in self.active_connections:
+    def disconnect(self, websocket: WebSocket, room_id: str, reason: str = "closed"):
+        """Disconnects a client from a room; does nothing if it already left."""
+        connected_at = self._connected_at.pop(websocket, None)
+        if connected_at is not None:
+            CONNECTION_LIFETIME.observe(perf_counter() - connected_at, reason)
+        if websocket in self.active_connections.get(room_id, ()):
             self.active_connections[room_id].remove(websocket)
             if not self.active_connections[room_id]:
                 del self.active_connections[room_id]
+                if room_id in self.replay:
+                    # Keep recording so the client can catch up if it comes back
+                    self._replay_expiry[room_id] = asyncio.get_running_loop().call_later(
+                        RESUME_TTL, self._drop_replay, room_id
+                    )
+    
+    def _drop_replay(self, room_id: str) -> None:
+        self._replay_expiry.pop(room_id, None)
+        self.replay.pop(room_id, None)
+    
+    def remember(self, room_id: str, frame: str) -> None:
+        """Adds a game_state frame to the room's replay buffer, if it keeps one."""
+        buffer = self.replay.get(room_id)
+        if buffer is None:
+            return
+        seq = frame_seq(frame)
+        # Rebroadcasts of a version already kept are skipped
+        if seq is not None and (not buffer or seq > buffer[-1][0]):
+            buffer.append((seq, frame))
+    
+    def missed_frames(self, room_id: str, last_seq: int, current_seq: int) -> Optional[List[str]]:
+        """Frames after `last_seq` for a reconnecting client, oldest first.
+        
+        None if they can't be told apart from older ones any more: the buffer
+        has rolled past `last_seq`, or was started after it.
+        """
+        if last_seq >= current_seq:
+            return []
+        buffer = self.replay.get(room_id)
+        if not buffer or buffer[0][0] > last_seq:
+            return None
+        # The buffer has every frame since its first, so these are all of them
+        return [frame for seq, frame in buffer if seq > last_seq]
     
     async def broadcast_to_room(self, room_id: str, message: dict):
-        """Broadcasts a message to all clients in a room."""
+        """Broadcasts a message to the clients in a room on this worker."""
+        await self.send_frame(room_id, json.dumps(message, separators=(",", ":")))
+    
+    async def send_frame(self, room_id: str, frame: str):
+        """Sends an already-serialized message to the clients in a room on this worker.
+        
+        A socket whose send fails or overruns SEND_TIMEOUT (a peer that
+        stopped reading) is dropped and closed.
+        """
+        self.remember(room_id, frame)
+        if frame.startswith(GAME_STATE_FRAME_PREFIX):
+            spectators.offer(room_id, frame)
         if room_id in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[room_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    disconnected.append(connection)
+            started_at = time()
+            start = perf_counter()
+            sends = [(connection, frame) for connection in self.active_connections[room_id]]
+            fanout = len(sends)
+            BROADCAST_FANOUT.observe(fanout)
+            failed = await send_each(sends)
             
             # Remove disconnected clients
-            for conn in disconnected:
-                self.disconnect(conn, room_id)
+            for position in failed:
+                self._drop(sends[position][0], room_id)
+            elapsed = perf_counter() - start
+            BROADCAST_DURATION.observe(elapsed)
+            tracer.record_broadcast(room_id, started_at, started_at + elapsed, fanout)
+    
+    def _drop(self, websocket: WebSocket, room_id: str) -> None:
+        """Disconnects a socket whose send failed and closes it in the background."""
+        SEND_FAILURES.inc()
+        heartbeats.unwatch(websocket)
+        self.disconnect(websocket, room_id, reason="send_failed")
+        task = asyncio.get_running_loop().create_task(self._close(websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    @staticmethod
+    async def _close(websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1008, reason="Send timeout"), SEND_TIMEOUT)
+        except Exception:
+            pass
+    
+    async def publish(self, room_id: str, frame: str):
+        """Queues a serialized message for the room's clients on every worker.
+        
+        Doesn't wait for the sends, so it can be called under the room's lock;
+        the room's frames still go out in publish order.
+        """
+        await get_backplane().publish(room_id, frame)
+    
+    async def reap(self, websocket: WebSocket, room_id: str):
+        """Drops a socket that stopped answering heartbeats, then closes it."""
+        REAPED.inc()
+        self.disconnect(websocket, room_id, reason="reaped")
+        try:
+            # A half-open peer never completes the closing handshake
+            await asyncio.wait_for(websocket.close(code=1001, reason="Heartbeat timeout"), 5.0)
+        except Exception:
+            pass
+    
+    async def close_room(self, room_id: str, code: int, reason: str = ""):
+        """Closes every socket in a room, e.g. when the room moves to another worker."""
+        expiry = self._replay_expiry.pop(room_id, None)
+        if expiry is not None:
+            expiry.cancel()
+        self.replay.pop(room_id, None)
+        await spectators.close_room(room_id, code, reason)
+        for connection in self.active_connections.pop(room_id, []):
+            heartbeats.unwatch(connection)
+            connected_at = self._connected_at.pop(connection, None)
+            if connected_at is not None:
+                CONNECTION_LIFETIME.observe(perf_counter() - connected_at, "room_closed")
+            try:
+                await connection.close(code=code, reason=reason)
+            except:
+                pass
 
 
 manager = ConnectionManager()
 
 
+metrics.gauge("ws_active_connections", "Open game WebSockets").set_function(
+    lambda: sum(len(connections) for connections in manager.active_connections.values())
+)
+metrics.gauge("ws_active_rooms", "Rooms with at least one open WebSocket").set_function(
+    lambda: len(manager.active_connections)
+)
+
+
+async def send_initial_state(websocket: WebSocket, room_id: str, last_seq: Optional[int]) -> None:
+    """Brings a newly connected client up to date.
+    
+    A client resuming with `last_seq` gets only the frames it missed, or a
+    full snapshot if they are no longer buffered.
+    """
+    # Lazy import to avoid circular dependency
+    from app.api.game import game_state_frame
+    
+    game = game_service.get_game(room_id)
+    if not game:
+        return
+    snapshot = game_state_frame(game)
+    manager.remember(room_id, snapshot)
+    frames = None
+    if last_seq is not None:
+        frames = manager.missed_frames(room_id, last_seq, game.version)
+        if frames is None:
+            RESUMES.inc("snapshot")
+        else:
+            RESUMES.inc("replayed" if frames else "current")
+            RESUME_REPLAYED.observe(len(frames))
+    if frames is None:
+        frames = [snapshot]
+    for frame in frames:
+        await websocket.send_text(frame)
+
+
 async def handle_game_websocket(websocket: WebSocket, room_id: str):
-    """Handles WebSocket connections for game updates."""
+    """Handles WebSocket connections for game updates.
+    
+    Clients that reconnect send the seq of the last game_state they saw as
+    `?last_seq=`; frames can then arrive out of order with live broadcasts,
+    so clients drop any frame whose seq isn't newer than the last one.
+    """
     # Lazy import to avoid circular dependency
-    from app.api.game import game_to_response
+    from app.api.game import game_state_frame
+    
+    try:
+        last_seq = int(websocket.query_params["last_seq"])
+    except (KeyError, ValueError):
+        last_seq = None
     
     await manager.connect(websocket, room_id)
+    heartbeats.watch(websocket, lambda: manager.reap(websocket, room_id))
     
     try:
-        # Send initial game state
-        game = game_service.get_game(room_id)
-        if game:
-            await websocket.send_json({
-                "type": "game_state",
-                "data": game_to_response(game).model_dump()
-            })
+        # Send initial game state, or what was missed since last_seq
+        await send_initial_state(websocket, room_id, last_seq)
         
         # Keep connection alive and handle incoming messages
         while True:
             data = await websocket.receive_text()
             try:
                 message = json.loads(data)
+                heartbeats.seen(websocket, message if isinstance(message, dict) else None)
+                if isinstance(message, dict) and message.get("type") == "pong":
+                    continue
                 # Handle different message types if needed
                 # For now, just broadcast game state updates
                 game = game_service.get_game(room_id)
                 if game:
-                    await manager.broadcast_to_room(room_id, {
-                        "type": "game_state",
-                        "data": game_to_response(game).model_dump()
-                    })
+                    await manager.publish(room_id, game_state_frame(game))
             except json.JSONDecodeError:
+                heartbeats.seen(websocket)
                 await websocket.send_json({"error": "Invalid JSON"})
     
     except WebSocketDisconnect:
+        pass
+    finally:
+        heartbeats.unwatch(websocket)
         manager.disconnect(websocket, room_id)
 
+
+
+async def handle_spectator_websocket(websocket: WebSocket, room_id: str):
+    """Read-only updates for a room: its state now, then at most one frame per
+    spectator tick. Messages from spectators are ignored (except as heartbeats)."""
+    # Lazy import to avoid circular dependency
+    from app.api.game import game_state_frame
+    
+    await websocket.accept()
+    game = game_service.get_game(room_id)
+    if not game:
+        await websocket.close(code=1008, reason="Game not found")
+        return
+    frame = game_state_frame(game)
+    spectators.add(websocket, room_id, frame)
+    
+    async def reap():
+        REAPED.inc()
+        spectators.remove(websocket, room_id)
+        try:
+            await asyncio.wait_for(websocket.close(code=1001, reason="Heartbeat timeout"), 5.0)
+        except Exception:
+            pass
+    heartbeats.watch(websocket, reap)
+    
+    try:
+        await websocket.send_text(frame)
+        while True:
+            data = await websocket.receive_text()
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                message = None
+            heartbeats.seen(websocket, message if isinstance(message, dict) else None)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        heartbeats.unwatch(websocket)
+        spectators.remove(websocket, room_id)
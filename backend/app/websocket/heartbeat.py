@@ -0,0 +1,199 @@
+"""Heartbeats for game WebSockets, driven by one timer wheel.
+
+A socket only fails a send once the peer is known to be gone, so a
+half-open connection (laptop lid closed, NAT timeout) stays in its room
+until a broadcast happens to error. Instead every watched socket is sent
+`{"type":"ping","t":...}` every PING_INTERVAL seconds; clients answer
+`{"type":"pong","t":...}` (any message counts). A socket silent for
+PING_INTERVAL + PING_TIMEOUT seconds is reaped: closed and dropped from
+its room.
+
+The per-socket timers live in a hashed timing wheel: scheduling and
+cancelling are O(1) dict operations, and one task advances the wheel once
+per tick for every socket, instead of one sleeping task per socket.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from app.services.metrics import metrics
+
+HEARTBEAT_RTT = metrics.histogram(
+    "ws_heartbeat_rtt_seconds",
+    "Round trip from a heartbeat ping to its pong",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PINGS_FAILED = metrics.counter(
+    "ws_heartbeat_ping_failures_total",
+    "Heartbeat pings that could not be sent",
+)
+
+PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "20"))
+PING_TIMEOUT = float(os.getenv("WS_PING_TIMEOUT", "20"))
+# Pings block at most this long on a socket whose send buffer is full
+SEND_TIMEOUT = 5.0
+
+
+class TimerWheel:
+    """Hashed timing wheel with `slots` buckets of `tick` seconds.
+    
+    Each key has at most one timer. Timers further out than one revolution
+    wait in their bucket for the remaining number of rounds. Callbacks run
+    on the tick at or just after their deadline.
+    """
+    
+    def __init__(self, tick: float = 1.0, slots: int = 256):
+        self.tick = tick
+        # Per slot: key -> (rounds left, callback)
+        self._slots: List[Dict[Hashable, Tuple[int, Callable[[], None]]]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[Hashable, int] = {}
+        self._position = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self._slot_of)
+    
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], None]) -> None:
+        """Runs `callback` in about `delay` seconds, replacing the key's timer."""
+        self.cancel(key)
+        ticks = -int(-delay // self.tick) or 1  # Ceiling, at least the next tick
+        rounds, offset = divmod(ticks - 1, len(self._slots))
+        slot = (self._position + offset) % len(self._slots)
+        self._slots[slot][key] = (rounds, callback)
+        self._slot_of[key] = slot
+    
+    def cancel(self, key: Hashable) -> None:
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+    
+    def advance(self) -> int:
+        """Fires the current bucket's due timers and moves on; returns how many fired."""
+        position = self._position
+        bucket = self._slots[position]
+        self._position = (position + 1) % len(self._slots)
+        if not bucket:
+            return 0
+        # Timers with rounds to go move to a fresh bucket in the same slot
+        waiting = self._slots[position] = {}
+        slot_of = self._slot_of
+        due = []
+        for key, (rounds, callback) in bucket.items():
+            if rounds:
+                waiting[key] = (rounds - 1, callback)
+            else:
+                del slot_of[key]
+                due.append(callback)
+        for callback in due:
+            callback()
+        return len(due)
+    
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            # Catch up on ticks missed while the loop was busy
+            while next_tick <= loop.time():
+                self.advance()
+                next_tick += self.tick
+
+
+class _Watched:
+    __slots__ = ("websocket", "on_dead", "last_seen", "due")
+    
+    def __init__(self, websocket: WebSocket, on_dead: Callable[[], Any], due: Callable[[], None]):
+        self.websocket = websocket
+        self.on_dead = on_dead
+        self.last_seen = time.monotonic()
+        self.due = due  # Made once: the wheel re-arms it every interval
+
+
+class HeartbeatMonitor:
+    """Pings watched sockets and reaps the ones that stop answering."""
+    
+    def __init__(self, interval: float = PING_INTERVAL, timeout: float = PING_TIMEOUT, wheel: Optional[TimerWheel] = None):
+        self.interval = interval
+        self.timeout = timeout
+        self.wheel = wheel or TimerWheel()
+        self._watched: Dict[WebSocket, _Watched] = {}
+        self._pings: Set[asyncio.Task] = set()
+    
+    def __len__(self) -> int:
+        return len(self._watched)
+    
+    def watch(self, websocket: WebSocket, on_dead: Callable[[], Any]) -> None:
+        """Starts heartbeats; `on_dead` (sync or async) is called if the peer goes silent."""
+        watched = self._watched[websocket] = _Watched(websocket, on_dead, lambda: self._due(websocket))
+        self.wheel.schedule(websocket, self.interval, watched.due)
+    
+    def unwatch(self, websocket: WebSocket) -> None:
+        self._watched.pop(websocket, None)
+        self.wheel.cancel(websocket)
+    
+    def seen(self, websocket: WebSocket, message: Optional[dict] = None) -> None:
+        """Records that the peer is alive; measures the round trip of a pong."""
+        watched = self._watched.get(websocket)
+        if watched is None:
+            return
+        watched.last_seen = time.monotonic()
+        if message is not None and message.get("type") == "pong" and isinstance(message.get("t"), (int, float)):
+            HEARTBEAT_RTT.observe(max(0.0, time.time() - message["t"]))
+    
+    def _due(self, websocket: WebSocket) -> None:
+        watched = self._watched.get(websocket)
+        if watched is None:
+            return
+        silent = time.monotonic() - watched.last_seen
+        if silent >= self.interval + self.timeout:
+            self.unwatch(websocket)
+            result = watched.on_dead()
+            if asyncio.iscoroutine(result):
+                self._track(asyncio.get_running_loop().create_task(result))
+            return
+        self.wheel.schedule(websocket, self.interval, watched.due)
+        self._track(asyncio.get_running_loop().create_task(self._ping(websocket)))
+    
+    def _track(self, task: asyncio.Task) -> None:
+        # Keep a reference until the ping (or reap) finishes
+        self._pings.add(task)
+        task.add_done_callback(self._pings.discard)
+    
+    async def _ping(self, websocket: WebSocket) -> None:
+        frame = json.dumps({"type": "ping", "t": time.time()})
+        try:
+            await asyncio.wait_for(websocket.send_text(frame), SEND_TIMEOUT)
+        except Exception:
+            # Leave it to the timeout: the socket is reaped if it stays silent
+            PINGS_FAILED.inc()
+    
+    def start(self) -> None:
+        self.wheel.start()
+    
+    async def stop(self) -> None:
+        await self.wheel.stop()
+
+
+# Singleton instance
+heartbeats = HeartbeatMonitor()
+
+metrics.gauge("ws_heartbeat_watched_sockets", "Game WebSockets with heartbeats").set_function(
+    lambda: len(heartbeats)
+)
@@ -0,0 +1,62 @@
+import asyncio
+from fastapi import WebSocket, WebSocketDisconnect
+from app.services.matchmaking_service import Ticket, get_matchmaking_service
+
+
+class LobbyConnections:
+    """WebSockets of queued players, keyed by ticket id."""
+    
+    def __init__(self):
+        self.sockets: dict[str, WebSocket] = {}
+        self._pending: set[asyncio.Task] = set()
+    
+    def notify(self, ticket: Ticket, message: dict) -> None:
+        """MatchmakingService notifier: sends the message and closes the socket."""
+        websocket = self.sockets.pop(ticket.id, None)
+        if websocket is None:
+            return
+        task = asyncio.get_running_loop().create_task(self._send_final(websocket, message))
+        # Keep a reference until the send finishes
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _send_final(self, websocket: WebSocket, message: dict) -> None:
+        try:
+            await websocket.send_json(message)
+            await websocket.close()
+        except Exception:
+            pass
+
+
+lobby = LobbyConnections()
+
+
+async def handle_matchmaking_websocket(websocket: WebSocket, ticket_id: str):
+    """Holds a queued player's socket until their ticket is matched or expires.
+    
+    Disconnecting while still queued cancels the ticket.
+    """
+    service = get_matchmaking_service()
+    ticket = service.get_ticket(ticket_id)
+    await websocket.accept()
+    if ticket is None:
+        await websocket.send_json({"type": "error", "detail": "Ticket not found"})
+        await websocket.close(code=4404)
+        return
+    
+    if ticket.status != "queued":
+        # Matched (or finished) before the socket connected
+        message_type = "match_found" if ticket.status == "matched" else f"ticket_{ticket.status}"
+        await websocket.send_json({"type": message_type, **ticket.to_dict()})
+        await websocket.close()
+        return
+    
+    lobby.sockets[ticket_id] = websocket
+    await websocket.send_json({"type": "queued", **ticket.to_dict()})
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        if lobby.sockets.get(ticket_id) is websocket:
+            del lobby.sockets[ticket_id]
+            service.cancel(ticket_id)
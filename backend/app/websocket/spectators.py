@@ -0,0 +1,247 @@
+"""Read-only spectator sockets, updated at a fixed tick rate.
+
+Players get every game_state frame the moment it is broadcast. Spectators
+don't need that: a room's frames are offered to the hub (an O(1) "latest
+frame" update on the broadcast path) and every TICK seconds the newest
+frame of each changed room goes out once, however many changes the tick
+held.
+
+Spectators are spread over SHARDS sender tasks by connection count. Each
+shard sends its sockets' frames one after another and yields to the event
+loop every YIELD_EVERY sends, so a room with tens of thousands of
+spectators never holds up player requests and broadcasts for long. A
+shard that is still sending when the next tick comes just picks up the
+newer frame afterwards. A send that overruns SEND_TIMEOUT (a spectator not
+reading its socket) drops that spectator (see fanout.send_each), so one
+stuck socket holds its shard up for at most two SEND_TIMEOUTs.
+"""
+import asyncio
+import os
+from time import perf_counter
+from typing import Dict, List, Optional, Set
+
+from fastapi import WebSocket
+
+from app.services.metrics import metrics
+from app.websocket.fanout import send_each
+from app.websocket.heartbeat import SEND_TIMEOUT
+
+TICK = float(os.getenv("SPECTATOR_TICK", "0.1"))
+SHARDS = int(os.getenv("SPECTATOR_SHARDS", "8"))
+YIELD_EVERY = 256
+
+FRAMES_OFFERED = metrics.counter(
+    "spectator_frames_offered_total",
+    "Room frames offered to spectators",
+)
+FRAMES_COALESCED = metrics.counter(
+    "spectator_frames_coalesced_total",
+    "Room frames replaced by a newer one before a tick sent them",
+)
+FRAMES_SENT = metrics.counter(
+    "spectator_frames_sent_total",
+    "Frames sent to spectator sockets",
+)
+SPECTATORS_DROPPED = metrics.counter(
+    "spectator_sockets_dropped_total",
+    "Spectator sockets dropped after a failed or timed-out send",
+)
+SHARD_SEND_DURATION = metrics.histogram(
+    "spectator_shard_send_seconds",
+    "Time a shard took to send one tick's frames to its spectators",
+)
+
+
+class _Room:
+    __slots__ = ("latest", "spectators")
+    
+    def __init__(self):
+        self.latest: Optional[str] = None
+        self.spectators = 0
+
+
+class SpectatorShard:
+    """A sender task and the spectator sockets it serves."""
+    
+    def __init__(self, hub: "SpectatorHub"):
+        self.hub = hub
+        # room_id -> this shard's spectators of the room
+        self.sockets: Dict[str, Set[WebSocket]] = {}
+        self.count = 0
+        # room_id -> newest frame not yet sent by this shard
+        self.pending: Dict[str, str] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()
+    
+    def notify(self) -> None:
+        self._wake.set()
+    
+    async def deliver(self) -> int:
+        """Sends the pending frames; returns how many sends were made."""
+        pending, self.pending = self.pending, {}
+        start = perf_counter()
+        rooms = []
+        sends = []
+        for room_id, frame in pending.items():
+            for websocket in self.sockets.get(room_id, ()):
+                rooms.append(room_id)
+                sends.append((websocket, frame))
+        # Yields between batches to let player traffic in
+        for position in await send_each(sends, YIELD_EVERY):
+            self._drop(sends[position][0], rooms[position])
+        sent = len(sends)
+        if sent:
+            FRAMES_SENT.inc(amount=sent)
+            SHARD_SEND_DURATION.observe(perf_counter() - start)
+        return sent
+    
+    def _drop(self, websocket: WebSocket, room_id: str) -> None:
+        """Unsubscribes a socket whose send failed and closes it in the background."""
+        SPECTATORS_DROPPED.inc()
+        self.hub.remove(websocket, room_id)
+        task = asyncio.get_running_loop().create_task(self._close(websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    @staticmethod
+    async def _close(websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1008, reason="Spectator too slow"), SEND_TIMEOUT)
+        except Exception:
+            pass
+    
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            await self.deliver()
+    
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class SpectatorHub:
+    """Spectator subscriptions per room, fanned out on ticks."""
+    
+    def __init__(self, shards: int = SHARDS, tick: float = TICK):
+        self.tick_interval = tick
+        self.shards: List[SpectatorShard] = [SpectatorShard(self) for _ in range(shards)]
+        self.rooms: Dict[str, _Room] = {}
+        self._shard_of: Dict[WebSocket, SpectatorShard] = {}
+        # Rooms offered a new frame since the last tick
+        self._changed: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self._shard_of)
+    
+    def add(self, websocket: WebSocket, room_id: str, frame: Optional[str] = None) -> None:
+        """Subscribes an accepted socket to a room on the least loaded shard.
+        
+        `frame` is the state the socket was just sent, if any; older offers
+        are then not sent to the room.
+        """
+        shard = min(self.shards, key=lambda shard: shard.count)
+        shard.sockets.setdefault(room_id, set()).add(websocket)
+        shard.count += 1
+        self._shard_of[websocket] = shard
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = _Room()
+            room.latest = frame
+        room.spectators += 1
+    
+    def remove(self, websocket: WebSocket, room_id: str) -> None:
+        """Unsubscribes a socket; does nothing if it already left."""
+        shard = self._shard_of.pop(websocket, None)
+        if shard is None:
+            return
+        sockets = shard.sockets[room_id]
+        sockets.discard(websocket)
+        if not sockets:
+            del shard.sockets[room_id]
+        shard.count -= 1
+        room = self.rooms[room_id]
+        room.spectators -= 1
+        if not room.spectators:
+            del self.rooms[room_id]
+    
+    def offer(self, room_id: str, frame: str) -> None:
+        """Makes `frame` the room's state for the next tick (if anyone is watching)."""
+        room = self.rooms.get(room_id)
+        if room is None or frame == room.latest:
+            return
+        FRAMES_OFFERED.inc()
+        if room_id in self._changed:
+            FRAMES_COALESCED.inc()
+        room.latest = frame
+        self._changed.add(room_id)
+    
+    def tick(self) -> int:
+        """Hands each changed room's newest frame to its shards; returns the rooms sent."""
+        changed, self._changed = self._changed, set()
+        for room_id in changed:
+            room = self.rooms.get(room_id)
+            if room is None:
+                continue
+            for shard in self.shards:
+                if room_id in shard.sockets:
+                    shard.pending[room_id] = room.latest
+        if changed:
+            for shard in self.shards:
+                if shard.pending:
+                    shard.notify()
+        return len(changed)
+    
+    async def close_room(self, room_id: str, code: int, reason: str = "") -> None:
+        """Closes every spectator of a room, e.g. when the room moves to another worker."""
+        for shard in self.shards:
+            for websocket in list(shard.sockets.get(room_id, ())):
+                self.remove(websocket, room_id)
+                try:
+                    await websocket.close(code=code, reason=reason)
+                except Exception:
+                    pass
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick_interval
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            next_tick = max(next_tick + self.tick_interval, loop.time())
+            self.tick()
+    
+    def start(self) -> None:
+        for shard in self.shards:
+            shard.start()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for shard in self.shards:
+            await shard.stop()
+
+
+# Singleton instance
+spectators = SpectatorHub()
+
+metrics.gauge("spectator_connections", "Open spectator WebSockets").set_function(lambda: len(spectators))
+metrics.gauge("spectator_rooms", "Rooms with at least one spectator").set_function(lambda: len(spectators.rooms))
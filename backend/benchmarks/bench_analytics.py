@@ -0,0 +1,49 @@
+"""Benchmarks for the columnar shot store."""
+import atexit
+import random
+import shutil
+import tempfile
+from app.services.analytics import DIMENSIONS, ShotStore
+from benchmarks.harness import benchmark
+
+
+def _store(shots: int) -> ShotStore:
+    directory = tempfile.mkdtemp(prefix="bench-analytics-")
+    atexit.register(shutil.rmtree, directory, True)
+    store = ShotStore(directory)
+    rng = random.Random(7)
+    for i in range(shots):
+        store.append(
+            1_700_000_000 + i,
+            f"player-{i % 50}",
+            rng.choice(DIMENSIONS["archetype"]),
+            rng.choice(DIMENSIONS["subtype"]),
+            rng.choice(DIMENSIONS["zone"]),
+            rng.choice(DIMENSIONS["contest"]),
+            rng.random() < 0.45,
+            rng.choice((2, 3)),
+        )
+    return store
+
+
+@benchmark("analytics_append")
+def bench_append():
+    """One shot appended, including the rollup updates."""
+    store = _store(0)
+    return lambda: store.append(1_700_000_000, "Alice", "three", "wing_catch", "wing", "light", True, 3)
+
+
+@benchmark("analytics_query", shots=(100_000, 1_000_000), group_by=("zone,contest", "subtype"))
+def bench_query(shots, group_by):
+    """A full scan grouped by the given dimensions (most of the data memory-mapped at 1M)."""
+    store = _store(shots)
+    dimensions = group_by.split(",")
+    return lambda: store.query(dimensions)
+
+
+@benchmark("analytics_query_filtered", shots=(1_000_000,))
+def bench_query_filtered(shots):
+    """One player's shots over the middle half of the time range, by zone x contest."""
+    store = _store(shots)
+    since, until = 1_700_000_000 + shots // 4, 1_700_000_000 + 3 * shots // 4
+    return lambda: store.query(("zone", "contest"), since=since, until=until, filters={"player": "player-7"})
@@ -0,0 +1,39 @@
+"""Benchmarks for bot decisions and the bot scheduler."""
+import asyncio
+from benchmarks.fixtures import make_game
+from benchmarks.harness import benchmark
+from app.models.game import GameState
+from app.models.offense import ShotType
+from app.services.bot_service import BotService, POLICIES
+from app.services.game_service import game_service
+
+
+@benchmark("bot_policy_choose_shot", policy=("random", "greedy"), history=(0, 20))
+def bench_choose_shot(policy, history):
+    game = make_game(history)
+    chooser = POLICIES[policy]()
+    return lambda: chooser.choose_shot(game)
+
+
+@benchmark("bot_seats_respond", seats=(100, 1000))
+def bench_seats_respond(seats):
+    """Per batch: every room's human takes a shot and every bot seat defends
+    on the same event loop with zero think time."""
+    bots = BotService()
+    bots.THINK_JITTER = 0
+    game_service.add_listener(bots.on_game_event)
+    rooms = [game_service.create_game("Human", "Bot") for _ in range(seats)]
+    for room_id in rooms:
+        # The human shoots first, so no timer is armed yet
+        bots.add_seat(room_id, "Bot", policy="greedy", think_time=0)
+    games = [game_service.get_game(room_id) for room_id in rooms]
+    
+    async def run():
+        for room_id in rooms:
+            game_service.select_shot(room_id, ShotType.THREE_POINTER)
+        while any(game.state == GameState.WAITING_FOR_DEFENSE.value for game in games):
+            await asyncio.sleep(0)
+        for game in games:
+            game.shot_type = game.defense_type = None
+            game.state = GameState.WAITING_FOR_SHOT.value
+    return run
@@ -0,0 +1,76 @@
+"""Benchmarks for career profiles."""
+import atexit
+import os
+import random
+import shutil
+import tempfile
+from app.services.career import CareerProfile, CareerStore
+from benchmarks.harness import benchmark
+
+ARCHETYPES = ("rim", "paint", "midrange", "three", "deep")
+ZONES = ("corner", "wing", "top", "paint", "restricted")
+CONTESTS = ("open", "light", "heavy")
+
+
+def _store(players: int) -> CareerStore:
+    """A store on disk with `players` players who have each finished a few games."""
+    directory = tempfile.mkdtemp(prefix="bench-career-")
+    atexit.register(shutil.rmtree, directory, True)
+    store = CareerStore(os.path.join(directory, "career.db"))
+    rng = random.Random(7)
+    for i in range(0, players, 2):
+        for _ in range(3):
+            store.record_game(f"player-{i}", f"player-{i + 1}", _shots(rng, f"player-{i}"), _shots(rng, f"player-{i + 1}"))
+        if i % 5000 == 0:
+            store.flush()
+    store.flush()
+    return store
+
+
+def _shots(rng: random.Random, name: str) -> CareerProfile:
+    """One game's worth of shots."""
+    shots = CareerProfile(name)
+    for _ in range(12):
+        shots.add_shot(rng.choice(ARCHETYPES), rng.choice(ZONES), rng.choice(CONTESTS), rng.random() < 0.45)
+    return shots
+
+
+@benchmark("career_record_game")
+def bench_record_game():
+    """Queueing a finished game (the event loop's share of the work)."""
+    store = _store(0)
+    rng = random.Random(11)
+    winner, loser = _shots(rng, "a"), _shots(rng, "b")
+    return lambda: store.record_game("a", "b", CareerProfile("a", splits=dict(winner.splits)), CareerProfile("b", splits=dict(loser.splits)))
+
+
+@benchmark("career_flush", games=(1, 100))
+def bench_flush(games):
+    """Writing `games` finished games in one batch (per batch)."""
+    store = _store(10_000)
+    rng = random.Random(11)
+    batches = [
+        [(f"player-{rng.randrange(10_000)}", _shots(rng, "w"), _shots(rng, "l")) for _ in range(games)]
+        for _ in range(50)
+    ]
+    state = {"batch": 0}
+    
+    def flush():
+        for name, winner, loser in batches[state["batch"] % len(batches)]:
+            store.record_game(name, f"{name}-opponent", winner, loser)
+        state["batch"] += 1
+        store.flush()
+    return flush
+
+
+@benchmark("career_lookup", cached=(True, False))
+def bench_lookup(cached):
+    """A profile lookup from the cache, or from SQLite on a miss."""
+    store = _store(10_000)
+    rng = random.Random(11)
+    if cached:
+        for i in range(10_000):
+            store.get(f"player-{i}")
+        return lambda: store.cached(f"player-{rng.randrange(10_000)}")
+    store.cache_size = 0
+    return lambda: store.get(f"player-{rng.randrange(10_000)}")
@@ -0,0 +1,128 @@
+"""Benchmarks for the models and services on the request path."""
+from benchmarks.fixtures import make_game, make_shot_records
+from benchmarks.harness import benchmark
+from app.api.game import game_to_response, game_to_coach_state, cached_game_state
+from app.models.offense import Offense
+from app.models.shot_context import ShotContext
+from app.models.shot_archetypes import ShotArchetype, ShotZone, ContestLevel, DribbleState
+from app.services.defense_ai_service import DefenseAIService
+from app.services.coach_ai_service import CoachAIService
+from app.services.room_index import RoomIndex
+
+HISTORY_LENGTHS = (0, 5, 20, 40)
+
+
+@benchmark("game_to_response", history=HISTORY_LENGTHS)
+def bench_game_to_response(history):
+    game = make_game(history)
+    return lambda: game_to_response(game)
+
+
+@benchmark("game_to_response_dump", history=HISTORY_LENGTHS)
+def bench_game_to_response_dump(history):
+    game = make_game(history)
+    return lambda: game_to_response(game).model_dump()
+
+
+@benchmark("cached_game_state_body", history=HISTORY_LENGTHS, cache=("hit", "miss"))
+def bench_cached_game_state_body(history, cache):
+    game = make_game(history)
+    if cache == "hit":
+        return lambda: cached_game_state(game).body
+    
+    def run():
+        game.version += 1
+        cached_game_state(game).body
+    return run
+
+
+@benchmark("game_to_coach_state", history=HISTORY_LENGTHS)
+def bench_game_to_coach_state(history):
+    game = make_game(history)
+    return lambda: game_to_coach_state(game)
+
+
+@benchmark("offense_calculate_make_percentage", history=HISTORY_LENGTHS)
+def bench_calculate_make_percentage(history):
+    game = make_game(history)
+    offense = Offense()
+    context = ShotContext(
+        archetype=ShotArchetype.THREE,
+        subtype="wing_catch",
+        zone=ShotZone.WING,
+        contest_level=ContestLevel.LIGHT,
+        dribble_state=DribbleState.CATCH_AND_SHOOT,
+    )
+    player, defense_state = game.player_one, game.defense_state
+    return lambda: offense.calculate_make_percentage(context, player, defense_state)
+
+
+@benchmark("defense_update_defense_state", history=HISTORY_LENGTHS)
+def bench_update_defense_state(history):
+    game = make_game(history)
+    service = DefenseAIService()
+    return lambda: service.update_defense_state(game, game.shot_history)
+
+
+@benchmark("coach_compute_state_hash", history=HISTORY_LENGTHS)
+def bench_compute_state_hash(history):
+    state = game_to_coach_state(make_game(history))
+    coach = CoachAIService(api_key=None)
+    return lambda: coach._compute_state_hash(state)
+
+
+@benchmark("coach_get_advice_rule_based", history=HISTORY_LENGTHS, cache=("hit", "miss"))
+def bench_get_advice(history, cache):
+    state = game_to_coach_state(make_game(history))
+    coach = CoachAIService(api_key=None)
+    if cache == "hit":
+        return lambda: coach.get_advice(state)
+    
+    def run():
+        coach._cache.clear()
+        coach.get_advice(state)
+    return run
+
+
+@benchmark("player_add_shot_record", history=(0, 19, 20))
+def bench_add_shot_record(history):
+    game = make_game(history)
+    player = game.player_one
+    base = list(player.shot_history)
+    record = make_shot_records(1, offset=history)[0]
+    
+    def run():
+        player.shot_history = base[:]
+        player.add_shot_record(record)
+    return run
+
+
+@benchmark("room_index_list_rooms", rooms=(100, 10000), by=("none", "state", "player"))
+def bench_list_rooms(rooms, by):
+    index = RoomIndex()
+    states = ["waiting_for_shot", "waiting_for_defense", "waiting_for_power", "shot_result"]
+    for i in range(rooms):
+        game = make_game(0, room_id=f"room-{i}")
+        game.player_one.name = f"player-{i % 500}"
+        game.state = states[i % len(states)]
+        game.updated_at = float(i)
+        index.update(game)
+    kwargs = {"state": {"state": "waiting_for_power"}, "player": {"player": "player-7"}}.get(by, {})
+    return lambda: index.list_rooms(limit=50, **kwargs)
+
+
+@benchmark("room_index_update", rooms=(100, 10000))
+def bench_room_index_update(rooms):
+    index = RoomIndex()
+    games = []
+    for i in range(rooms):
+        game = make_game(0, room_id=f"room-{i}")
+        game.updated_at = float(i)
+        index.update(game)
+        games.append(game)
+    game = games[rooms // 2]
+    
+    def run():
+        game.updated_at += rooms
+        index.update(game)
+    return run
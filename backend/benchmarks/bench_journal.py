@@ -0,0 +1,73 @@
+"""Benchmarks for the game journal: write throughput and replay."""
+import atexit
+import json
+import shutil
+import tempfile
+from app.models.events import ShotSelected
+from app.models.offense import ShotType
+from app.models.defense import DefenseType
+from app.services.game_service import game_service
+from app.services.journal import Journal, encode_record, replay
+from app.services.replay_export import iter_replay
+from benchmarks.harness import benchmark
+
+
+def _journal(**options) -> Journal:
+    directory = tempfile.mkdtemp(prefix="bench-journal-")
+    atexit.register(shutil.rmtree, directory, True)
+    return Journal(directory, **options)
+
+
+@benchmark("journal_write_events", batch=(1000,), fsync=(False, True))
+def bench_write(batch, fsync):
+    """Per op: `batch` events queued by the listener, encoded and written in one batch
+    (events/s = ops/s x batch)."""
+    journal = _journal(fsync=fsync)
+    events = [
+        ShotSelected(room_id=f"room-{i % 100}", from_state="waiting_for_shot", to_state="waiting_for_defense",
+                     player="Alice", shot_type="layup")
+        for i in range(batch)
+    ]
+    
+    def run():
+        for event in events:
+            journal.on_game_event(event)
+        journal.flush()
+    return run
+
+
+@benchmark("journal_replay", turns=(10, 50))
+def bench_replay(turns):
+    """Rebuilds one game from the journal records of `turns` full turns."""
+    journal = _journal(fsync=False)
+    game_service.add_listener(journal.on_game_event)
+    room_id = game_service.create_game("Alice", "Bob")
+    for _ in range(turns):
+        if not game_service.select_shot(room_id, ShotType.MIDRANGE):
+            break
+        game_service.select_defense(room_id, DefenseType.CONTEST)
+        game_service.select_power(room_id, 50, "GOOD", 0.2)
+        game_service.finish_animation(room_id)
+        game_service.next_turn(room_id)
+    game_service.remove_listener(journal.on_game_event)
+    records = [json.loads(encode_record(record)) for record in journal._pending]
+    return lambda: replay(iter(records))
+
+
+@benchmark("replay_export", format=("ndjson", "binary"), turns=(50,))
+def bench_replay_export(format, turns):
+    """Streams one game's replay from a journal segment."""
+    journal = _journal(fsync=False)
+    game_service.add_listener(journal.on_game_event)
+    room_id = game_service.create_game("Alice", "Bob")
+    for _ in range(turns):
+        game_service.select_shot(room_id, ShotType.LAYUP)
+        game_service.select_defense(room_id, DefenseType.STEAL)
+        game_service.select_power(room_id, 50, "GOOD", 0.2)
+        game_service.finish_animation(room_id)
+        game_service.next_turn(room_id)
+        if game_service.get_game(room_id).state == "game_over":
+            break
+    game_service.remove_listener(journal.on_game_event)
+    journal.flush()
+    return lambda: sum(map(len, iter_replay(journal, room_id, format=format)))
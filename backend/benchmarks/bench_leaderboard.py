@@ -0,0 +1,57 @@
+"""Benchmarks for the Elo leaderboard."""
+import atexit
+import json
+import os
+import random
+import tempfile
+from app.services.leaderboard import FORMAT_VERSION, Leaderboard
+from benchmarks.harness import benchmark
+
+
+def _leaderboard(players: int) -> Leaderboard:
+    """A leaderboard of `players` rated players, loaded from a snapshot."""
+    rng = random.Random(7)
+    rows = []
+    for i in range(players):
+        games = rng.randint(1, 200)
+        wins = rng.randint(0, games)
+        rows.append([f"player-{i}", rng.gauss(1500, 200), games, wins, games - wins, 1_700_000_000.0])
+    fd, path = tempfile.mkstemp(prefix="bench-leaderboard-", suffix=".json")
+    atexit.register(os.remove, path)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"version": FORMAT_VERSION, "saved_at": 0, "players": rows}, f)
+    board = Leaderboard()
+    board.load(path)
+    return board
+
+
+@benchmark("leaderboard_record_result", players=(100_000, 1_000_000))
+def bench_record_result(players):
+    """One finished game: two ratings updated and re-ranked."""
+    board = _leaderboard(players)
+    rng = random.Random(11)
+    names = [f"player-{i}" for i in range(players)]
+    return lambda: board.record_result(*rng.sample(names, 2))
+
+
+@benchmark("leaderboard_rank", players=(100_000, 1_000_000))
+def bench_rank(players):
+    """Rank of a random player."""
+    board = _leaderboard(players)
+    rng = random.Random(11)
+    return lambda: board.rank_of(f"player-{rng.randrange(players)}")
+
+
+@benchmark("leaderboard_around", players=(1_000_000,))
+def bench_around(players):
+    """A random player and the 5 players either side of them."""
+    board = _leaderboard(players)
+    rng = random.Random(11)
+    return lambda: board.around(f"player-{rng.randrange(players)}", 5)
+
+
+@benchmark("leaderboard_top", players=(1_000_000,), offset=(0, 500_000))
+def bench_top(players, offset):
+    """A page of 50 players, from the top or deep in the ranking."""
+    board = _leaderboard(players)
+    return lambda: board.top(50, offset)
@@ -0,0 +1,53 @@
+"""Load benchmarks for the matchmaking queue."""
+import itertools
+import random
+import time
+from benchmarks.harness import benchmark
+from app.services.matchmaking_service import MatchmakingService
+
+
+def _service() -> MatchmakingService:
+    rooms = itertools.count()
+    return MatchmakingService(create_game=lambda one, two: f"room-{next(rooms)}")
+
+
+@benchmark("matchmaking_lobby_churn", players=(1000, 10000))
+def bench_lobby_churn(players):
+    """Whole-lobby cost: `players` join with random skills, 10% cancel, and
+    one late sweep pairs the leftovers across buckets."""
+    rng = random.Random(7)
+    skills = [rng.randint(0, 3000) for _ in range(players)]
+    cancels = set(rng.sample(range(players), players // 10))
+    
+    def run():
+        service = _service()
+        for i, skill in enumerate(skills):
+            ticket = service.enqueue(f"player-{i}", skill)
+            if i in cancels:
+                service.cancel(ticket.id)
+        service.sweep(now=time.time() + 30)
+    return run
+
+
+@benchmark("matchmaking_enqueue_match", queued=(0, 30))
+def bench_enqueue_match(queued):
+    """One player waits and a second joins the same bucket and is matched,
+    with `queued` other buckets holding a waiter."""
+    service = _service()
+    for bucket in range(queued):
+        service.enqueue(f"waiting-{bucket}", skill=bucket * service.BUCKET_WIDTH)
+    skill = (queued + 1) * service.BUCKET_WIDTH
+    
+    def run():
+        service.enqueue("one", skill)
+        service.enqueue("two", skill)
+    return run
+
+
+@benchmark("matchmaking_sweep", queued=(10, 30))
+def bench_sweep(queued):
+    """Periodic sweep over a lobby where no waiter is old enough to widen."""
+    service = _service()
+    for bucket in range(queued):
+        service.enqueue(f"waiting-{bucket}", skill=bucket * service.BUCKET_WIDTH)
+    return lambda: service.sweep()
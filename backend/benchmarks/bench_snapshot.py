@@ -0,0 +1,16 @@
+"""Benchmarks for the binary room snapshot codec."""
+from benchmarks.fixtures import make_game
+from benchmarks.harness import benchmark
+from app.services.snapshot import decode_games, encode_games
+
+
+@benchmark("snapshot_encode", rooms=(1000,), history=(0, 20))
+def bench_encode(rooms, history):
+    games = [make_game(history, f"room-{i}") for i in range(rooms)]
+    return lambda: encode_games(games)
+
+
+@benchmark("snapshot_decode", rooms=(1000,), history=(0, 20))
+def bench_decode(rooms, history):
+    data = encode_games([make_game(history, f"room-{i}") for i in range(rooms)])
+    return lambda: decode_games(data, rooms)
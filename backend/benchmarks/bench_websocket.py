@@ -0,0 +1,104 @@
+"""Benchmarks for WebSocket fan-out."""
+import asyncio
+import itertools
+from collections import deque
+from benchmarks.fixtures import make_game, FakeWebSocket
+from benchmarks.harness import benchmark
+from app.api.game import game_to_response, game_state_frame
+from app.services.backplane import InProcessBackplane, encode_frame, decode_frame
+from app.websocket.game_handler import ConnectionManager, RESUME_BUFFER_FRAMES
+from app.websocket.heartbeat import TimerWheel
+from app.websocket.spectators import SpectatorHub
+
+ROOM_SIZES = (1, 10, 100, 1000)
+
+
+@benchmark("connection_manager_broadcast_to_room", sockets=ROOM_SIZES, history=(0, 20))
+def bench_broadcast_to_room(sockets, history):
+    manager = ConnectionManager()
+    room_id = "bench-room"
+    manager.active_connections[room_id] = [FakeWebSocket() for _ in range(sockets)]
+    message = {"type": "game_state", "data": game_to_response(make_game(history, room_id)).model_dump()}
+    
+    async def run():
+        await manager.broadcast_to_room(room_id, message)
+    return run
+
+
+@benchmark("backplane_publish", sockets=ROOM_SIZES)
+def bench_backplane_publish(sockets):
+    manager = ConnectionManager()
+    room_id = "bench-room"
+    manager.active_connections[room_id] = [FakeWebSocket() for _ in range(sockets)]
+    backplane = InProcessBackplane()
+    backplane.subscriber = manager.send_frame
+    frame = game_state_frame(make_game(20, room_id))
+    
+    async def run():
+        await backplane.publish(room_id, frame)
+        await backplane.drain()
+    return run
+
+
+@benchmark("backplane_frame_codec", history=(0, 20))
+def bench_backplane_frame_codec(history):
+    room_id = "bench-room"
+    frame = game_state_frame(make_game(history, room_id))
+    return lambda: decode_frame(encode_frame(room_id, frame))
+
+
+@benchmark("ws_resume_missed_frames", missed=(1, 32))
+def bench_resume_missed_frames(missed):
+    """Finding a reconnecting client's missed frames in a full replay buffer."""
+    manager = ConnectionManager()
+    room_id = "bench-room"
+    manager.replay[room_id] = deque(maxlen=RESUME_BUFFER_FRAMES)
+    game = make_game(20, room_id)
+    for _ in range(RESUME_BUFFER_FRAMES):
+        game.version += 1
+        manager.remember(room_id, game_state_frame(game))
+    last_seq = game.version - missed
+    return lambda: manager.missed_frames(room_id, last_seq, game.version)
+
+
+@benchmark("heartbeat_wheel_tick", sockets=(1_000, 100_000))
+def bench_heartbeat_wheel_tick(sockets):
+    """One tick of a wheel holding a 20s heartbeat timer per socket (1/20th fire and re-arm)."""
+    wheel = TimerWheel(tick=1.0)
+    callbacks = {}
+    for key in range(sockets):
+        callbacks[key] = lambda key=key: wheel.schedule(key, 20, callbacks[key])
+        wheel.schedule(key, 1 + key % 20, callbacks[key])
+    return wheel.advance
+
+
+@benchmark("spectator_tick_fanout", spectators=(1_000, 10_000))
+def bench_spectator_tick_fanout(spectators):
+    """One tick sending a room's newest frame to all its spectators across the shards."""
+    hub = SpectatorHub()
+    room_id = "bench-room"
+    for _ in range(spectators):
+        hub.add(FakeWebSocket(), room_id)
+    game = make_game(20, room_id)
+    
+    async def run():
+        game.version += 1
+        hub.offer(room_id, game_state_frame(game))
+        hub.tick()
+        await asyncio.gather(*(shard.deliver() for shard in hub.shards))
+    return run
+
+
+@benchmark("spectator_offer")
+def bench_spectator_offer():
+    """The broadcast path's cost of a spectated room: replacing its pending frame."""
+    hub = SpectatorHub()
+    room_id = "bench-room"
+    hub.add(FakeWebSocket(), room_id)
+    game = make_game(20, room_id)
+    frames = []
+    for _ in range(2):
+        game.version += 1
+        frames.append(game_state_frame(game))
+    frames = itertools.cycle(frames)
+    return lambda: hub.offer(room_id, next(frames))
@@ -0,0 +1,58 @@
+"""Builders for game objects used by the benchmarks."""
+import itertools
+import json
+from app.models.game import Game
+from app.models.player import Player
+from app.models.shot_record import ShotRecord
+from app.models.shot_archetypes import ShotArchetype, ShotZone, ContestLevel, DEFAULT_SUBTYPES
+from app.services.defense_ai_service import DefenseAIService
+
+_ARCHETYPES = [ShotArchetype.RIM, ShotArchetype.MIDRANGE, ShotArchetype.THREE, ShotArchetype.DEEP]
+_ZONES = [ShotZone.WING, ShotZone.CORNER, ShotZone.TOP, ShotZone.RESTRICTED]
+_CONTESTS = [ContestLevel.OPEN, ContestLevel.LIGHT, ContestLevel.HEAVY]
+
+
+def make_shot_records(count: int, offset: int = 0) -> list:
+    """Deterministic mix of shot records."""
+    records = []
+    for i in range(offset, offset + count):
+        archetype = _ARCHETYPES[i % len(_ARCHETYPES)]
+        records.append(ShotRecord(
+            archetype=archetype,
+            subtype=DEFAULT_SUBTYPES[archetype],
+            zone=_ZONES[i % len(_ZONES)],
+            contest_level=_CONTESTS[i % len(_CONTESTS)],
+            made=i % 3 != 0,
+            points=3 if archetype in (ShotArchetype.THREE, ShotArchetype.DEEP) else 2,
+            turn_number=i + 1,
+        ))
+    return records
+
+
+def make_game(history_length: int, room_id: str = "bench-room") -> Game:
+    """A mid-game Game with `history_length` shots alternating between players."""
+    game = Game(player_one=Player(name="Alice"), player_two=Player(name="Bob"), room_id=room_id)
+    records = make_shot_records(history_length)
+    for record, player in zip(records, itertools.cycle([game.player_one, game.player_two])):
+        player.add_shot_record(record)
+        if record.made:
+            player.score += record.points
+    game.player_one.score %= 10
+    game.player_two.score %= 10
+    game.shot_history = records[-20:]
+    game.defense_state = DefenseAIService().update_defense_state(game, game.shot_history)
+    return game
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket; serializes like the real one but sends nowhere."""
+    
+    def __init__(self):
+        self.sent = 0
+    
+    async def send_json(self, message) -> None:
+        json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        self.sent += 1
+    
+    async def send_text(self, text: str) -> None:
+        self.sent += 1
@@ -0,0 +1,126 @@
+"""Minimal benchmark registry, timer and baseline comparison."""
+import asyncio
+import inspect
+import json
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Keep GameService / CoachAIService events out of the timings
+os.environ.setdefault("EVENT_LOG_SINK", "none")
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+@dataclass
+class Benchmark:
+    """A benchmark case: `setup(**params)` returns the callable that is timed."""
+    name: str
+    setup: Callable[..., Callable]
+    params: Dict[str, Sequence[Any]] = field(default_factory=dict)
+    
+    def cases(self):
+        """Yields (case id, params) for every combination of parameters."""
+        keys = sorted(self.params)
+        combos = [{}]
+        for key in keys:
+            combos = [{**combo, key: value} for combo in combos for value in self.params[key]]
+        for combo in combos:
+            suffix = ",".join(f"{k}={combo[k]}" for k in keys)
+            yield (f"{self.name}[{suffix}]" if suffix else self.name), combo
+
+
+REGISTRY: List[Benchmark] = []
+
+
+def benchmark(name: str, **params: Sequence[Any]):
+    """Registers a setup function as a benchmark, parameterized by keyword grids."""
+    def decorator(setup: Callable[..., Callable]) -> Callable[..., Callable]:
+        REGISTRY.append(Benchmark(name, setup, params))
+        return setup
+    return decorator
+
+
+def _time_sync(fn: Callable, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - start
+
+
+async def _time_async(fn: Callable, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await fn()
+    return time.perf_counter() - start
+
+
+def measure(fn: Callable, min_time: float = 0.2, repeat: int = 5) -> float:
+    """Returns the median seconds per call over `repeat` timed batches.
+    
+    The batch size is calibrated so each batch runs for at least `min_time`.
+    """
+    if inspect.iscoroutinefunction(fn):
+        loop = asyncio.new_event_loop()
+        timer = lambda n: loop.run_until_complete(_time_async(fn, n))
+    else:
+        loop = None
+        timer = lambda n: _time_sync(fn, n)
+    
+    try:
+        number = 1
+        while True:
+            elapsed = timer(number)
+            if elapsed >= min_time / 10:
+                number = max(1, int(number * min_time / elapsed))
+                break
+            number *= 10
+        return statistics.median(timer(number) / number for _ in range(repeat))
+    finally:
+        if loop is not None:
+            loop.close()
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, float], path: str = BASELINE_PATH) -> None:
+    existing = load_baseline(path)
+    existing.update({name: round(seconds, 9) for name, seconds in results.items()})
+    with open(path, "w") as f:
+        json.dump(dict(sorted(existing.items())), f, indent=2)
+        f.write("\n")
+
+
+def run(
+    name_filter: Optional[str] = None,
+    min_time: float = 0.2,
+    baseline: Optional[Dict[str, float]] = None,
+    threshold: float = 0.25
+) -> Tuple[Dict[str, float], List[str]]:
+    """Runs registered benchmarks; returns (seconds per op by case, regressions)."""
+    baseline = baseline or {}
+    results: Dict[str, float] = {}
+    regressions: List[str] = []
+    print(f"{'benchmark':<60}{'per op':>12}{'ops/s':>12}{'vs base':>10}")
+    for bench in REGISTRY:
+        for case_id, params in bench.cases():
+            if name_filter and name_filter not in case_id:
+                continue
+            seconds = measure(bench.setup(**params), min_time=min_time)
+            results[case_id] = seconds
+            base = baseline.get(case_id)
+            delta = ""
+            if base:
+                ratio = seconds / base - 1
+                delta = f"{ratio:+.0%}"
+                if ratio > threshold:
+                    regressions.append(f"{case_id}: {base * 1e6:.2f}us -> {seconds * 1e6:.2f}us ({delta})")
+            print(f"{case_id:<60}{seconds * 1e6:>10.2f}us{1 / seconds:>12,.0f}{delta:>10}")
+    return results, regressions
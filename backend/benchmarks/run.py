@@ -0,0 +1,46 @@
+"""Runs the backend micro-benchmarks and compares them with the stored baseline.
+
+Usage (from the backend directory):
+    python -m benchmarks.run                  # compare against benchmarks/baseline.json
+    python -m benchmarks.run --filter broadcast
+    python -m benchmarks.run --save           # record new baseline numbers
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from benchmarks import harness
+from benchmarks import bench_game, bench_websocket, bench_matchmaking, bench_bots, bench_snapshot, bench_journal, bench_analytics, bench_leaderboard, bench_career  # noqa: F401 - registers benchmarks
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backend micro-benchmarks")
+    parser.add_argument("--filter", help="Only run cases whose id contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timed batch")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Slowdown ratio vs baseline that counts as a regression")
+    parser.add_argument("--baseline", default=harness.BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Write results to the baseline file")
+    args = parser.parse_args(argv)
+    
+    results, regressions = harness.run(
+        name_filter=args.filter,
+        min_time=args.min_time,
+        baseline=harness.load_baseline(args.baseline),
+        threshold=args.threshold,
+    )
+    
+    if args.save:
+        harness.save_baseline(results, args.baseline)
+        print(f"Saved {len(results)} results to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"\nREGRESSIONS (> {args.threshold:.0%} slower than baseline):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+"""Parameter-sweep balancing tool for the shot probability constants.
+
+Sweeps `Offense.BASELINE_PERCENTAGES`, `Offense.CONTEST_MULTIPLIERS` and the
+timing modifiers on `GameService`, simulating full games for every parameter
+point and reporting expected points per shot type, win-rate skew and
+strategy dominance.
+
+Usage (from the backend directory):
+    python -m scripts.balance_sweep --grid contest.heavy=0.6,0.7,0.8
+    python -m scripts.balance_sweep --random 40 --range baseline.three=0.30:0.42
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.models.offense import Offense, ShotType
+from app.models.shot_archetypes import (
+    ShotArchetype,
+    ShotZone,
+    ContestLevel,
+    DribbleState,
+    DEFAULT_SUBTYPES,
+)
+from app.models.shot_context import ShotContext
+from app.models.shot_record import ShotRecord
+from app.services.defense_ai_service import DefenseAIService
+from app.services.game_service import GameService
+
+# Bump when the simulation model changes so cached results are not reused
+SIM_VERSION = 1
+
+# Shot types reachable through the API, in table order
+SHOT_TYPES = [ShotType.LAYUP, ShotType.MIDRANGE, ShotType.THREE_POINTER, ShotType.HALF_COURT]
+SHOT_ARCHETYPES = {
+    ShotType.LAYUP: ShotArchetype.RIM,
+    ShotType.MIDRANGE: ShotArchetype.MIDRANGE,
+    ShotType.THREE_POINTER: ShotArchetype.THREE,
+    ShotType.HALF_COURT: ShotArchetype.DEEP,
+}
+SHOT_POINTS = [2, 2, 3, 3]
+CONTESTS = [ContestLevel.OPEN, ContestLevel.LIGHT, ContestLevel.HEAVY]
+STREAKS = [-1, 0, 1]
+HISTORY_CAP = 20  # Player.add_shot_record keeps the last 20 shots
+TIMING_GRADES = ["PERFECT", "GOOD", "MISS"]
+ERROR_BUCKETS = 5
+
+STRATEGIES = ["layup", "midrange", "three_pointer", "half_court", "mixed", "greedy"]
+WIN_SCORE = 10
+MAX_TURNS = 200
+
+
+class _ProbePlayer:
+    """Stands in for a Player with a fixed fatigue and streak."""
+    
+    def __init__(self, fatigue: float, streak: int):
+        self._fatigue = fatigue
+        self._streak = streak
+    
+    def get_fatigue(self) -> float:
+        return self._fatigue
+    
+    def get_hot_streak(self) -> int:
+        return self._streak
+
+
+def default_params() -> Dict[str, float]:
+    """Returns the current tuning constants as a flat parameter dict."""
+    params = {f"baseline.{k}": v for k, v in Offense.BASELINE_PERCENTAGES.items()}
+    params.update({f"contest.{k}": v for k, v in Offense.CONTEST_MULTIPLIERS.items()})
+    params.update({f"timing.{k}": v for k, v in GameService.TIMING_MODIFIERS.items()})
+    params["timing.error_scale"] = GameService.TIMING_ERROR_SCALE
+    return params
+
+
+def params_hash(params: Dict[str, float], settings: Dict) -> str:
+    """Stable hash of a parameter point plus the simulation settings."""
+    payload = json.dumps(
+        {"params": params, "settings": settings, "version": SIM_VERSION},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _build_offense(params: Dict[str, float]) -> Offense:
+    offense = Offense()
+    offense.BASELINE_PERCENTAGES = {
+        key.split(".", 1)[1]: value for key, value in params.items() if key.startswith("baseline.")
+    }
+    offense.CONTEST_MULTIPLIERS = {
+        key.split(".", 1)[1]: value for key, value in params.items() if key.startswith("contest.")
+    }
+    return offense
+
+
+def _build_game_service(params: Dict[str, float]) -> GameService:
+    service = GameService()
+    service.TIMING_MODIFIERS = {
+        grade: params[f"timing.{grade}"] for grade in TIMING_GRADES
+    }
+    service.TIMING_ERROR_SCALE = params["timing.error_scale"]
+    return service
+
+
+def _table_index(shot: int, contest: int, streak: int, history: int) -> int:
+    return ((shot * 3 + contest) * 3 + streak) * (HISTORY_CAP + 1) + history
+
+
+def build_probability_table(params: Dict[str, float]) -> List[float]:
+    """Precomputes make % for every (shot, contest, streak, history length).
+    
+    Probabilities come from `Offense.calculate_make_percentage` itself, so the
+    simulation stays in lockstep with the live model.
+    """
+    offense = _build_offense(params)
+    table = [0.0] * (len(SHOT_TYPES) * 3 * 3 * (HISTORY_CAP + 1))
+    for shot_idx, shot_type in enumerate(SHOT_TYPES):
+        archetype = SHOT_ARCHETYPES[shot_type]
+        for contest_idx, contest in enumerate(CONTESTS):
+            context = ShotContext(
+                archetype=archetype,
+                subtype=DEFAULT_SUBTYPES[archetype],
+                zone=ShotZone.WING,
+                contest_level=contest,
+                dribble_state=DribbleState.CATCH_AND_SHOOT,
+            )
+            defense_state = DefenseAIService()._get_default_defense()
+            defense_state.contest_distribution[ShotZone.WING] = contest
+            for streak_idx, streak in enumerate(STREAKS):
+                for history in range(HISTORY_CAP + 1):
+                    player = _ProbePlayer(min(10, history * 0.5), streak)
+                    table[_table_index(shot_idx, contest_idx, streak_idx, history)] = (
+                        offense.calculate_make_percentage(context, player, defense_state)
+                    )
+    return table
+
+
+def build_timing_table(params: Dict[str, float]) -> List[float]:
+    """Precomputes timing modifiers for every (grade, error bucket)."""
+    service = _build_game_service(params)
+    return [
+        service._get_timing_modifier(grade, (bucket + 0.5) / ERROR_BUCKETS)
+        for grade in TIMING_GRADES
+        for bucket in range(ERROR_BUCKETS)
+    ]
+
+
+@lru_cache(maxsize=None)
+def _wing_contest(counts: Tuple[int, ...]) -> int:
+    """Contest level the adaptive defense puts on the wing for a shot mix.
+    
+    `counts` is the number of RIM/MIDRANGE/THREE/DEEP shots among the last
+    ten; the real DefenseAIService decides, memoized per mix.
+    """
+    history = []
+    for shot_idx, count in enumerate(counts):
+        archetype = SHOT_ARCHETYPES[SHOT_TYPES[shot_idx]]
+        history.extend(
+            ShotRecord(archetype, DEFAULT_SUBTYPES[archetype], ShotZone.WING,
+                       ContestLevel.LIGHT, False, SHOT_POINTS[shot_idx], 0)
+            for _ in range(count)
+        )
+    state = DefenseAIService().update_defense_state(None, history)
+    return CONTESTS.index(state.contest_distribution[ShotZone.WING])
+
+
+def _simulate_matchup(
+    strategy_one: str,
+    strategy_two: str,
+    games: int,
+    table: List[float],
+    timing: List[float],
+    timing_mix: List[float],
+    rng: random.Random,
+    stats: Dict[str, List[int]],
+) -> int:
+    """Plays `games` games and returns how many player one won."""
+    strategies = (strategy_one, strategy_two)
+    stride = HISTORY_CAP + 1
+    perfect_cut = timing_mix[0]
+    good_cut = timing_mix[0] + timing_mix[1]
+    wins = 0
+    for _ in range(games):
+        scores = [0, 0]
+        histories = ([], [])
+        recent = deque(maxlen=10)
+        counts = [0, 0, 0, 0]
+        contest = 1  # default defense is LIGHT everywhere
+        offense = 0
+        for _turn in range(MAX_TURNS):
+            made_history = histories[offense]
+            history_len = min(len(made_history), HISTORY_CAP)
+            streak = 1
+            if len(made_history) >= 3:
+                if sum(made_history[-3:]) >= 2:
+                    streak = 2
+                elif len(made_history) >= 5 and sum(made_history[-5:]) <= 1:
+                    streak = 0
+            
+            strategy = strategies[offense]
+            if strategy == "mixed":
+                shot = rng.randrange(4)
+            elif strategy == "greedy":
+                shot = max(
+                    range(4),
+                    key=lambda s: table[(((s * 3 + contest) * 3 + streak) * stride) + history_len] * SHOT_POINTS[s]
+                )
+            else:
+                shot = STRATEGIES.index(strategy)
+            
+            roll = rng.random()
+            grade = 0 if roll < perfect_cut else (1 if roll < good_cut else 2)
+            modifier = timing[grade * ERROR_BUCKETS + rng.randrange(ERROR_BUCKETS)]
+            p_make = table[(((shot * 3 + contest) * 3 + streak) * stride) + history_len] + modifier
+            made = rng.random() < max(0.01, min(0.99, p_make))
+            
+            attempts, points = stats[SHOT_TYPES[shot].value]
+            stats[SHOT_TYPES[shot].value] = [attempts + 1, points + (SHOT_POINTS[shot] if made else 0)]
+            
+            made_history.append(made)
+            if made:
+                scores[offense] += SHOT_POINTS[shot]
+            if len(recent) == recent.maxlen:
+                counts[recent[0]] -= 1
+            recent.append(shot)
+            counts[shot] += 1
+            contest = _wing_contest(tuple(counts))
+            
+            if scores[offense] >= WIN_SCORE:
+                break
+            offense = 1 - offense
+        if scores[0] > scores[1]:
+            wins += 1
+    return wins
+
+
+def simulate_point(params: Dict[str, float], settings: Dict) -> Dict:
+    """Runs the full strategy round robin for one parameter point."""
+    rng = random.Random(int(params_hash(params, settings)[:16], 16) ^ settings["seed"])
+    table = build_probability_table(params)
+    timing = build_timing_table(params)
+    timing_mix = [settings["timing_mix"][grade] for grade in TIMING_GRADES]
+    games = settings["games"]
+    
+    stats = {shot_type.value: [0, 0] for shot_type in SHOT_TYPES}
+    win_rates: Dict[str, Dict[str, float]] = {}
+    for one, two in itertools.product(STRATEGIES, STRATEGIES):
+        wins = _simulate_matchup(one, two, games, table, timing, timing_mix, rng, stats)
+        win_rates.setdefault(one, {})[two] = wins / games
+    
+    # Analytic expected points for a fresh player with average timing
+    average_timing = sum(
+        timing_mix[g] * sum(timing[g * ERROR_BUCKETS:(g + 1) * ERROR_BUCKETS]) / ERROR_BUCKETS
+        for g in range(len(TIMING_GRADES))
+    )
+    expected_points = {}
+    for shot_idx, shot_type in enumerate(SHOT_TYPES):
+        by_contest = {
+            contest.value: round(
+                max(0.01, min(0.99, table[_table_index(shot_idx, c, 1, 0)] + average_timing))
+                * SHOT_POINTS[shot_idx], 4
+            )
+            for c, contest in enumerate(CONTESTS)
+        }
+        attempts, points = stats[shot_type.value]
+        by_contest["simulated"] = round(points / attempts, 4) if attempts else None
+        expected_points[shot_type.value] = by_contest
+    
+    # Symmetrise over seat order so first-player advantage doesn't leak in
+    head_to_head = {
+        a: {b: round((win_rates[a][b] + 1 - win_rates[b][a]) / 2, 4) for b in STRATEGIES if b != a}
+        for a in STRATEGIES
+    }
+    first_player_skew = sum(
+        win_rates[a][b] for a in STRATEGIES for b in STRATEGIES
+    ) / (len(STRATEGIES) ** 2) - 0.5
+    dominant = [a for a in STRATEGIES if all(wr > 0.5 for wr in head_to_head[a].values())]
+    
+    return {
+        "params": params,
+        "expected_points": expected_points,
+        "win_rates": win_rates,
+        "head_to_head": head_to_head,
+        "first_player_skew": round(first_player_skew, 4),
+        "max_matchup_skew": round(
+            max(abs(wr - 0.5) for row in head_to_head.values() for wr in row.values()), 4
+        ),
+        "dominant_strategy": dominant[0] if dominant else None,
+        "strategy_strength": {
+            a: round(sum(row.values()) / len(row), 4) for a, row in head_to_head.items()
+        },
+    }
+
+
+class SweepRunner:
+    """Runs parameter points in parallel, caching results by parameter hash."""
+    
+    def __init__(self, settings: Dict, cache_dir: str, workers: Optional[int] = None):
+        self.settings = settings
+        self.cache_dir = cache_dir
+        self.workers = workers
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def run(self, points: List[Dict[str, float]]) -> List[Dict]:
+        results: Dict[str, Dict] = {}
+        pending = []
+        for params in points:
+            key = params_hash(params, self.settings)
+            path = self._cache_path(key)
+            if os.path.exists(path):
+                with open(path) as f:
+                    results[key] = {**json.load(f), "cached": True}
+            elif key not in results:
+                results[key] = None
+                pending.append((key, params))
+        
+        if pending:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    key: pool.submit(simulate_point, params, self.settings)
+                    for key, params in pending
+                }
+                for key, future in futures.items():
+                    result = future.result()
+                    with open(self._cache_path(key), "w") as f:
+                        json.dump(result, f)
+                    results[key] = {**result, "cached": False}
+        
+        return [results[params_hash(params, self.settings)] for params in points]
+
+
+def grid_points(base: Dict[str, float], grid: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """Cartesian product of the grid axes over the base parameters."""
+    keys = sorted(grid)
+    return [
+        {**base, **dict(zip(keys, values))}
+        for values in itertools.product(*(grid[k] for k in keys))
+    ]
+
+
+def random_points(
+    base: Dict[str, float],
+    ranges: Dict[str, Tuple[float, float]],
+    count: int,
+    seed: int
+) -> List[Dict[str, float]]:
+    """Uniform random search over the given parameter ranges."""
+    rng = random.Random(seed)
+    return [
+        {**base, **{k: round(rng.uniform(lo, hi), 4) for k, (lo, hi) in sorted(ranges.items())}}
+        for _ in range(count)
+    ]
+
+
+def _parse_assignments(values: List[str], parse) -> Dict:
+    parsed = {}
+    for value in values:
+        key, _, spec = value.partition("=")
+        parsed[key.strip()] = parse(spec)
+    return parsed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sweep shot probability constants")
+    parser.add_argument("--grid", action="append", default=[],
+                        help="Grid axis, e.g. contest.heavy=0.6,0.7,0.8")
+    parser.add_argument("--range", action="append", default=[],
+                        help="Random search range, e.g. baseline.three=0.30:0.42")
+    parser.add_argument("--random", type=int, default=0, help="Number of random points")
+    parser.add_argument("--games", type=int, default=400, help="Games per strategy matchup")
+    parser.add_argument("--timing-mix", default="PERFECT=0.2,GOOD=0.5,MISS=0.3")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=".sweep_cache")
+    parser.add_argument("--output", help="Write the full results as JSON")
+    args = parser.parse_args(argv)
+    
+    base = default_params()
+    unknown = [
+        key for key in _parse_assignments(args.grid + args.range, str) if key not in base
+    ]
+    if unknown:
+        parser.error(f"Unknown parameters: {', '.join(unknown)} (known: {', '.join(sorted(base))})")
+    
+    grid = _parse_assignments(args.grid, lambda spec: [float(v) for v in spec.split(",")])
+    ranges = _parse_assignments(args.range, lambda spec: tuple(float(v) for v in spec.split(":")))
+    points = grid_points(base, grid)
+    if args.random:
+        points += random_points(base, ranges, args.random, args.seed)
+    
+    settings = {
+        "games": args.games,
+        "seed": args.seed,
+        "timing_mix": {
+            grade: float(share)
+            for grade, share in (item.split("=") for item in args.timing_mix.split(","))
+        },
+    }
+    results = SweepRunner(settings, args.cache_dir, args.workers).run(points)
+    
+    swept = sorted(set(grid) | set(ranges))
+    for result in sorted(results, key=lambda r: r["max_matchup_skew"]):
+        label = ", ".join(f"{k}={result['params'][k]}" for k in swept) or "defaults"
+        ep = ", ".join(f"{shot}={v['simulated']}" for shot, v in result["expected_points"].items())
+        print(f"{label}{' (cached)' if result['cached'] else ''}")
+        print(f"  points/shot: {ep}")
+        print(f"  first-player skew: {result['first_player_skew']:+.3f}  "
+              f"max matchup skew: {result['max_matchup_skew']:.3f}  "
+              f"dominant: {result['dominant_strategy'] or '-'}")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
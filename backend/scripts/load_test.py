@@ -0,0 +1,353 @@
+"""Load generator that plays full games over REST and WebSocket.
+
+Each simulated client creates a game, opens `/ws/game/{room_id}` and plays
+turns through the shot / defense / power / animation-finished / next-turn
+endpoints, recording request latency and the end-to-end time until the
+matching broadcast arrives on its socket.
+
+Usage (from the backend directory):
+    python -m scripts.load_test --spawn --clients 1000
+    python -m scripts.load_test --url http://localhost:8000 --clients 200 --save-baseline baseline.json
+    python -m scripts.load_test --spawn --clients 200 --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import websockets
+
+# Action -> (method, path suffix, body factory, state the broadcast should carry)
+ACTIONS = [
+    ("shot", "/shot", lambda: {"shot_type": random.choice(
+        ["layup", "midrange", "three_pointer", "half_court"])}, "waiting_for_defense"),
+    ("defense", "/defense", lambda: {"defense_type": random.choice(
+        ["block", "steal", "contest"])}, "waiting_for_power"),
+    ("power", "/power", lambda: {"power": random.randint(30, 70), "timing_grade": random.choice(
+        ["PERFECT", "GOOD", "MISS"]), "timing_error": random.random()}, "animating"),
+    ("animation_finished", "/animation-finished", lambda: None, "shot_result"),
+    ("next_turn", "/next-turn", lambda: None, None),
+]
+
+PERCENTILES = (50, 95, 99)
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 JSON client on asyncio streams.
+    
+    Keeps the harness self-contained: one connection per simulated client,
+    no client library beyond `websockets`.
+    """
+    
+    # Reopen instead of reusing connections idle longer than this; uvicorn
+    # closes keep-alive connections after 5 seconds by default
+    IDLE_REOPEN_SECONDS = 4.0
+    
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._last_used = 0.0
+    
+    async def _open(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+    
+    async def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, dict]:
+        reused = not (
+            self._writer is None
+            or self._writer.is_closing()
+            or time.monotonic() - self._last_used > self.IDLE_REOPEN_SECONDS
+        )
+        if not reused:
+            await self._open()
+        try:
+            return await self._send(method, path, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            if not reused:
+                raise
+            # The server dropped an idle keep-alive connection before reading
+            # the request; retry once on a fresh connection
+            await self._open()
+            return await self._send(method, path, body)
+    
+    async def _send(self, method: str, path: str, body: Optional[dict]) -> Tuple[int, dict]:
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+        )
+        self._writer.write(head.encode() + payload)
+        await self._writer.drain()
+        
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        data = await self._reader.readexactly(int(headers.get("content-length", "0")))
+        self._last_used = time.monotonic()
+        if headers.get("connection", "").lower() == "close":
+            self._writer.close()
+        return status, json.loads(data) if data else {}
+    
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class Stats:
+    """Collects latency samples per action and counts outcomes."""
+    
+    def __init__(self):
+        self.http: Dict[str, List[float]] = defaultdict(list)
+        self.e2e: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.turns = 0
+        self.games_finished = 0
+        self.actions = 0
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sample list."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _read_socket(ws, inbox: asyncio.Queue) -> None:
+    try:
+        async for raw in ws:
+            message = json.loads(raw)
+            if message.get("type") == "game_state":
+                await inbox.put((time.perf_counter(), message["data"]))
+            elif message.get("type") == "ping":
+                # Answer like a browser would, so heartbeat RTTs cover load-test sockets
+                await ws.send(json.dumps({"type": "pong", "t": message.get("t")}))
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def _await_broadcast(inbox: asyncio.Queue, expected: Optional[str], timeout: float) -> float:
+    """Waits for the broadcast carrying the expected state; returns its arrival time."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        arrived, data = await asyncio.wait_for(inbox.get(), remaining)
+        if expected is None or data.get("state") == expected:
+            return arrived
+
+
+async def run_client(client_id: int, args, stats: Stats) -> None:
+    target = urlsplit(args.url)
+    http = HttpConnection(target.hostname, target.port or 80)
+    ws_url = f"ws://{target.hostname}:{target.port or 80}"
+    try:
+        for game_number in range(args.games):
+            status, game = await http.request("POST", "/api/game/create", {
+                "player_one_name": f"load-{client_id}-{game_number}-a",
+                "player_two_name": f"load-{client_id}-{game_number}-b",
+            })
+            if status != 200:
+                stats.errors["create"] += 1
+                return
+            room_id = game["room_id"]
+            inbox: asyncio.Queue = asyncio.Queue()
+            async with websockets.connect(f"{ws_url}/ws/game/{room_id}", max_queue=None) as ws:
+                reader = asyncio.create_task(_read_socket(ws, inbox))
+                await _await_broadcast(inbox, "waiting_for_shot", args.timeout)
+                game_over = False
+                for _turn in range(args.max_turns):
+                    for name, suffix, body, expected in ACTIONS:
+                        if args.think_time:
+                            await asyncio.sleep(random.uniform(0, args.think_time))
+                        start = time.perf_counter()
+                        status, result = await http.request("POST", f"/api/game/{room_id}{suffix}", body())
+                        responded = time.perf_counter()
+                        if status != 200:
+                            stats.errors[name] += 1
+                            break
+                        stats.http[name].append(responded - start)
+                        stats.actions += 1
+                        try:
+                            arrived = await _await_broadcast(inbox, expected, args.timeout)
+                            stats.e2e[name].append(arrived - start)
+                        except asyncio.TimeoutError:
+                            stats.errors[f"{name}_broadcast_timeout"] += 1
+                        game_over = result.get("game_state", {}).get("game_over", False)
+                    else:
+                        stats.turns += 1
+                        if game_over:
+                            stats.games_finished += 1
+                            break
+                        continue
+                    break
+                reader.cancel()
+    except (OSError, websockets.WebSocketException, asyncio.TimeoutError) as e:
+        stats.errors[type(e).__name__] += 1
+    finally:
+        await http.close()
+
+
+def build_report(stats: Stats, elapsed: float, args) -> Dict:
+    report = {
+        "clients": args.clients,
+        "elapsed_seconds": round(elapsed, 3),
+        "turns": stats.turns,
+        "games_finished": stats.games_finished,
+        "throughput": {
+            "actions_per_second": round(stats.actions / elapsed, 2) if elapsed else 0.0,
+            "turns_per_second": round(stats.turns / elapsed, 2) if elapsed else 0.0,
+        },
+        "errors": dict(stats.errors),
+        "latency_ms": {},
+    }
+    for name, *_ in ACTIONS:
+        report["latency_ms"][name] = {
+            kind: {f"p{p}": round(percentile(samples[name], p) * 1000, 3) for p in PERCENTILES}
+            for kind, samples in (("http", stats.http), ("e2e", stats.e2e))
+        }
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(f"clients={report['clients']} elapsed={report['elapsed_seconds']}s "
+          f"turns={report['turns']} games={report['games_finished']}")
+    print(f"throughput: {report['throughput']['actions_per_second']} actions/s, "
+          f"{report['throughput']['turns_per_second']} turns/s")
+    print(f"{'action':<20}{'http p50':>10}{'p95':>10}{'p99':>10}{'e2e p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for name, kinds in report["latency_ms"].items():
+        row = [kinds[kind][f"p{p}"] for kind in ("http", "e2e") for p in PERCENTILES]
+        print(f"{name:<20}" + "".join(f"{value:>10.2f}" for value in row))
+    if report["errors"]:
+        print(f"errors: {report['errors']}")
+
+
+def compare_reports(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Returns human-readable regressions of `report` against `baseline`."""
+    regressions = []
+    for name, kinds in report["latency_ms"].items():
+        for kind, values in kinds.items():
+            for key, value in values.items():
+                base = baseline.get("latency_ms", {}).get(name, {}).get(kind, {}).get(key)
+                if base and value > base * (1 + tolerance):
+                    regressions.append(f"{name} {kind} {key}: {base:.2f}ms -> {value:.2f}ms")
+    for key, value in report["throughput"].items():
+        base = baseline.get("throughput", {}).get(key)
+        if base and value < base * (1 - tolerance):
+            regressions.append(f"{key}: {base} -> {value}")
+    return regressions
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Starts `uvicorn app.main:app` and waits until it accepts connections."""
+    env = {**os.environ, "EVENT_LOG_SINK": os.environ.get("EVENT_LOG_SINK", "none")}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def run_load(args) -> Dict:
+    stats = Stats()
+    start = time.perf_counter()
+    
+    async def staggered(client_id: int):
+        if args.ramp:
+            await asyncio.sleep(args.ramp * client_id / args.clients)
+        await run_client(client_id, args, stats)
+    
+    await asyncio.gather(*(staggered(i) for i in range(args.clients)))
+    return build_report(stats, time.perf_counter() - start, args)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive full games against the backend")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="Start a local uvicorn instance")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--games", type=int, default=1, help="Games per client")
+    parser.add_argument("--max-turns", type=int, default=40, help="Turn cap per game")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds to spread client starts over")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random delay before each action")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Broadcast wait timeout")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--save-baseline", help="Save the report as a baseline file")
+    parser.add_argument("--compare", help="Compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression ratio")
+    args = parser.parse_args(argv)
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    server = None
+    if args.spawn:
+        port = _free_port()
+        server = spawn_server(port)
+        args.url = f"http://127.0.0.1:{port}"
+    try:
+        report = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    
+    print_report(report)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_reports(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"REGRESSIONS (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
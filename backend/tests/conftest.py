@@ -0,0 +1,46 @@
+"""Shared fixtures: games played through the GameService singleton."""
+import os
+import random
+from typing import Callable, List
+
+import pytest
+
+# Keep structured events out of the test output
+os.environ.setdefault("EVENT_LOG_SINK", "none")
+
+from app.models.defense import DefenseType
+from app.models.offense import ShotType
+from app.services.game_service import game_service
+
+
+def play_turns(room_id: str, turns: int, rng: random.Random) -> None:
+    """Plays whole turns (shot to next turn) with random choices."""
+    for _ in range(turns):
+        if game_service.get_game(room_id).state == "game_over":
+            return
+        game_service.select_shot(room_id, rng.choice([ShotType.LAYUP, ShotType.MIDRANGE, ShotType.THREE_POINTER]))
+        game_service.select_defense(room_id, rng.choice([DefenseType.BLOCK, DefenseType.STEAL, DefenseType.CONTEST]))
+        game_service.select_power(room_id, rng.randint(0, 100), timing_grade="GOOD", timing_error=rng.random())
+        game_service.finish_animation(room_id)
+        game_service.next_turn(room_id)
+
+
+@pytest.fixture
+def games() -> Callable[..., List[str]]:
+    """Creates games played to assorted points; deleted after the test."""
+    created: List[str] = []
+    
+    def create(count: int = 8, seed: int = 1) -> List[str]:
+        rng = random.Random(seed)
+        for i in range(count):
+            room_id = game_service.create_game(f"p{i}", f"q{i}")
+            created.append(room_id)
+            play_turns(room_id, rng.randint(0, 12), rng)
+            # Leave some games mid-turn
+            if i % 3 == 1:
+                game_service.select_shot(room_id, ShotType.LAYUP)
+        return created[-count:]
+    
+    yield create
+    for room_id in created:
+        game_service.delete_game(room_id)
@@ -0,0 +1,163 @@
+"""Columnar shot store: aggregates against a row-by-row reference."""
+import random
+import threading
+from collections import defaultdict
+
+import pytest
+
+from app.services.analytics import DIMENSIONS, ShotStore
+
+
+def _rows(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    rows = []
+    timestamp = 1_700_000_000.0
+    for _ in range(count):
+        timestamp += rng.random() * 120
+        made = rng.random() < 0.45
+        rows.append((
+            timestamp,
+            rng.choice(["ann", "bob", "cy"]),
+            rng.choice(DIMENSIONS["archetype"]),
+            rng.choice(DIMENSIONS["subtype"]),
+            rng.choice(DIMENSIONS["zone"]),
+            rng.choice(DIMENSIONS["contest"]),
+            made,
+            rng.choice([2, 3]),
+        ))
+    return rows
+
+
+_FIELDS = ("timestamp", "player", "archetype", "subtype", "zone", "contest", "made", "points")
+
+
+def _reference(rows, group_by, since=None, until=None, filters=None, interval=None):
+    groups = defaultdict(lambda: [0, 0, 0])
+    for row in rows:
+        values = dict(zip(_FIELDS, row))
+        if since is not None and values["timestamp"] < since:
+            continue
+        if until is not None and values["timestamp"] >= until:
+            continue
+        if any(values[name] != value for name, value in (filters or {}).items()):
+            continue
+        key = tuple(values[dimension] for dimension in group_by)
+        if interval is not None:
+            key = (int(values["timestamp"] // interval) * interval, *key)
+        group = groups[key]
+        group[0] += 1
+        group[1] += values["made"]
+        group[2] += values["points"] if values["made"] else 0
+    return {key: tuple(value) for key, value in groups.items()}
+
+
+def _result(rows, group_by, time=False):
+    names = (["time"] if time else []) + list(group_by)
+    return {
+        tuple(row[name] for name in names): (row["attempts"], row["makes"], row["points"])
+        for row in rows
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Small partitions so queries cross sealed, spilled and active ones
+    store = ShotStore(str(tmp_path), rows=100, max_resident=2)
+    rows = _rows(1050)
+    for row in rows:
+        store.append(*row)
+    yield store, rows
+    store.close()
+
+
+@pytest.mark.parametrize("group_by", [(), ("zone", "contest"), ("player",), ("archetype", "subtype")])
+def test_query_matches_reference(store, group_by):
+    store, rows = store
+    assert store.mapped
+    assert _result(store.query(group_by), group_by) == _reference(rows, group_by)
+
+
+def test_query_time_range_and_filters(store):
+    store, rows = store
+    since, until = rows[200][0], rows[900][0]
+    filters = {"contest": "open", "player": "bob"}
+    result = store.query(["zone"], since=since, until=until, filters=filters)
+    assert _result(result, ["zone"]) == _reference(rows, ["zone"], since, until, filters)
+    assert store.query(["zone"], filters={"player": "nobody"}) == []
+
+
+def test_trend_matches_reference(store):
+    store, rows = store
+    result = store.trend(1800, ["archetype"])
+    assert _result(result, ["archetype"], time=True) == _reference(rows, ["archetype"], interval=1800)
+
+
+def test_reopened_store_serves_spilled_history(store, tmp_path):
+    store, rows = store
+    store.close()
+    reopened = ShotStore(str(tmp_path), rows=100, max_resident=2)
+    try:
+        assert _result(reopened.query(["zone", "contest"]), ["zone", "contest"]) == _reference(rows, ["zone", "contest"])
+        assert reopened.dashboard()["zone_contest"] == store.dashboard()["zone_contest"]
+    finally:
+        reopened.close()
+
+
+def test_scans_see_whole_rows_while_appending(tmp_path):
+    store = ShotStore(str(tmp_path), rows=64, max_resident=1)
+    rows = _rows(4000, seed=3)
+    appended = 0
+    errors = []
+    done = threading.Event()
+    
+    def scan():
+        try:
+            while not done.is_set():
+                before = appended
+                result = store.query(["zone"])
+                total = sum(row["attempts"] for row in result)
+                # The row being appended may or may not be counted yet
+                assert before <= total <= appended + 1
+                assert all(row["makes"] <= row["attempts"] for row in result)
+        except Exception as e:
+            errors.append(e)
+    
+    scanner = threading.Thread(target=scan)
+    scanner.start()
+    for row in rows:
+        store.append(*row)
+        appended += 1
+    done.set()
+    scanner.join()
+    assert not errors
+    assert store.mapped
+    assert _result(store.query(["zone"]), ["zone"]) == _reference(rows, ["zone"])
+    store.close()
+
+
+def test_close_waits_for_running_scans(tmp_path):
+    store = ShotStore(str(tmp_path), rows=10, max_resident=0)
+    for row in _rows(25):
+        store.append(*row)
+    scanning, release = threading.Event(), threading.Event()
+    
+    def scan():
+        with store._scan() as partitions:
+            scanning.set()
+            release.wait()
+            # Still mapped: close() hasn't run yet
+            assert sum(rows for _, rows in partitions) == 25
+            store._aggregate(["zone"], partitions)
+    
+    scanner = threading.Thread(target=scan)
+    scanner.start()
+    scanning.wait()
+    closer = threading.Thread(target=store.close)
+    closer.start()
+    closer.join(0.1)
+    assert closer.is_alive()
+    release.set()
+    scanner.join()
+    closer.join(1.0)
+    assert not closer.is_alive()
+    assert store.mapped == []
@@ -0,0 +1,82 @@
+"""Bot seats: moves share the HTTP actions' lock and publish path."""
+import asyncio
+
+import pytest
+
+from app.api import game as game_api
+from app.models.offense import ShotType
+from app.services.backplane import get_backplane
+from app.services.bot_service import bot_service
+from app.services.game_service import game_service
+from app.services.room_concurrency import room_locks
+from app.websocket.game_handler import frame_seq
+
+
+@pytest.fixture
+def bot_room(monkeypatch):
+    """A room whose player two is a bot that acts at once; frames it publishes are recorded."""
+    frames = []
+    
+    async def record(room_id: str, frame: str) -> None:
+        frames.append(frame_seq(frame))
+    
+    monkeypatch.setattr(get_backplane(), "subscriber", record)
+    monkeypatch.setattr(bot_service, "run_move", game_api.apply_bot_move)
+    game_service.add_listener(bot_service.on_game_event)
+    room_id = game_service.create_game("human", "bot")
+    yield room_id, frames
+    bot_service.remove_seat(room_id)
+    game_service.remove_listener(bot_service.on_game_event)
+    game_service.delete_game(room_id)
+
+
+async def _settle() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+    await get_backplane().drain()
+
+
+def test_bot_waits_for_the_room_lock(bot_room):
+    room_id, frames = bot_room
+    
+    async def scenario():
+        game_service.select_shot(room_id, ShotType.LAYUP)
+        version = game_service.get_game(room_id).version
+        async with room_locks.hold(room_id):
+            bot_service.add_seat(room_id, "bot", think_time=0)
+            await asyncio.sleep(0.01)
+            # The seat's timer fired, but the move queues behind the lock
+            assert game_service.get_game(room_id).version == version
+        await _settle()
+        game = game_service.get_game(room_id)
+        assert game.version == version + 1
+        assert game.state == "waiting_for_power"
+        assert frames == [game.version]
+    
+    asyncio.run(scenario())
+
+
+def test_human_and_bot_frames_go_out_in_version_order(bot_room):
+    room_id, frames = bot_room
+    
+    async def scenario():
+        bot_service.add_seat(room_id, "bot", think_time=0)
+        start = game_service.get_game(room_id).version
+        await game_api.apply_action(
+            room_id, "select_shot", None,
+            lambda: game_service.select_shot(room_id, ShotType.MIDRANGE),
+            error="", message="", span="shot",
+        )
+        # The bot defends as soon as the shot's frame is queued; the human's
+        # power goes in right behind it
+        await _settle()
+        assert game_service.get_game(room_id).state == "waiting_for_power"
+        await game_api.apply_action(
+            room_id, "select_power", None,
+            lambda: game_service.select_power(room_id, 60, timing_grade="GOOD", timing_error=0.1),
+            error="", message="", span="power",
+        )
+        await _settle()
+        assert frames == [start + 1, start + 2, start + 3]
+    
+    asyncio.run(scenario())
@@ -0,0 +1,120 @@
+"""Room broadcasts: publish order, and player sockets that stop reading."""
+import asyncio
+import contextvars
+
+from app.services.backplane import InProcessBackplane
+from app.websocket import fanout, game_handler
+from app.websocket.game_handler import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self, stuck: bool = False):
+        self.stuck = stuck
+        self.frames = []
+        self.closed = None
+    
+    async def send_text(self, frame: str) -> None:
+        if self.stuck:
+            # A peer that stopped reading: the send buffer never drains
+            await asyncio.Event().wait()
+        self.frames.append(frame)
+    
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.closed = code
+
+
+def _frame(seq: int) -> str:
+    return f'{game_handler.GAME_STATE_FRAME_PREFIX}{seq},"data":{{}}}}'
+
+
+def _room(manager: ConnectionManager, room_id: str, *sockets: FakeSocket) -> None:
+    manager.active_connections[room_id] = list(sockets)
+
+
+def test_stuck_player_socket_is_dropped(monkeypatch):
+    monkeypatch.setattr(fanout, "SEND_TIMEOUT", 0.05)
+    
+    async def scenario():
+        manager = ConnectionManager()
+        stuck, healthy = FakeSocket(stuck=True), FakeSocket()
+        _room(manager, "r1", stuck, healthy)
+        await asyncio.wait_for(manager.send_frame("r1", _frame(1)), 1.0)
+        assert healthy.frames == [_frame(1)]
+        assert manager.active_connections["r1"] == [healthy]
+        await asyncio.sleep(0)
+        assert stuck.closed == 1008
+        await manager.send_frame("r1", _frame(2))
+        assert healthy.frames == [_frame(1), _frame(2)]
+    
+    asyncio.run(scenario())
+
+
+def test_publish_returns_before_sends_and_keeps_order(monkeypatch):
+    monkeypatch.setattr(fanout, "SEND_TIMEOUT", 0.05)
+    
+    async def scenario():
+        manager = ConnectionManager()
+        backplane = InProcessBackplane()
+        backplane.subscriber = manager.send_frame
+        stuck, healthy = FakeSocket(stuck=True), FakeSocket()
+        _room(manager, "r1", stuck, healthy)
+        for seq in range(1, 6):
+            # A stuck socket must not hold up the publisher (e.g. under a room lock)
+            await asyncio.wait_for(backplane.publish("r1", _frame(seq)), 0.01)
+        assert healthy.frames == []
+        await asyncio.wait_for(backplane.drain(), 1.0)
+        assert healthy.frames == [_frame(seq) for seq in range(1, 6)]
+        assert manager.active_connections["r1"] == [healthy]
+    
+    asyncio.run(scenario())
+
+
+class SlowSocket(FakeSocket):
+    async def send_text(self, frame: str) -> None:
+        await asyncio.sleep(0.03)
+        self.frames.append(frame)
+
+
+class BrokenSocket(FakeSocket):
+    async def send_text(self, frame: str) -> None:
+        raise ConnectionError("gone")
+
+
+def test_send_each_times_out_only_overdue_sends(monkeypatch):
+    monkeypatch.setattr(fanout, "SEND_TIMEOUT", 0.05)
+    
+    async def scenario():
+        # Five slow sends overrun one deadline together, but none does alone
+        sockets = [SlowSocket() for _ in range(5)]
+        sockets[1:1] = [FakeSocket(stuck=True)]
+        sockets.insert(4, BrokenSocket())
+        sockets.append(FakeSocket(stuck=True))
+        failed = await asyncio.wait_for(fanout.send_each([(socket, "f") for socket in sockets], yield_every=2), 2.0)
+        assert failed == [1, 4, 7]
+        assert [socket.frames for socket in sockets if isinstance(socket, SlowSocket)] == [["f"]] * 5
+    
+    asyncio.run(scenario())
+
+
+def test_queued_frames_keep_their_publishers_context():
+    request = contextvars.ContextVar("request", default=None)
+    
+    async def scenario():
+        backplane = InProcessBackplane()
+        delivered = []
+        release = asyncio.Event()
+        
+        async def subscriber(room_id: str, frame: str) -> None:
+            await release.wait()
+            delivered.append((frame, request.get()))
+        
+        backplane.subscriber = subscriber
+        for name in ("a", "b", "c"):
+            token = request.set(name)
+            await backplane.publish("r1", name)
+            request.reset(token)
+        release.set()
+        await backplane.drain()
+        assert delivered == [("a", "a"), ("b", "b"), ("c", "c")]
+    
+    asyncio.run(scenario())
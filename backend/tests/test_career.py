@@ -0,0 +1,110 @@
+"""Career store: batched writes, cached reads and reloads from SQLite."""
+import sqlite3
+
+import pytest
+
+from app.models.events import GameOver, ShotResolved
+from app.services.career import BATCH_SIZE, CareerProfile, CareerStore
+
+
+def _shots(name: str, *shots):
+    profile = CareerProfile(name)
+    for archetype, zone, contest, made in shots:
+        profile.add_shot(archetype, zone, contest, made)
+    return profile
+
+
+def _shot(room_id: str, player: str, made: bool, zone: str = "paint") -> ShotResolved:
+    return ShotResolved(
+        room_id=room_id, to_state="shot_resolved", player=player, power=50, archetype="layup",
+        subtype="finger_roll", zone=zone, contest_level="open", points=2, make_probability=0.6, made=made,
+    )
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "career.db")
+
+
+def test_write_then_load(db_path):
+    store = CareerStore(db_path)
+    store.record_game(
+        "ann", "bob",
+        _shots("ann", ("layup", "paint", "open", True), ("layup", "paint", "open", False)),
+        _shots("bob", ("jumper", "wing", "heavy", True)),
+        timestamp=10.0,
+    )
+    assert store.flush() == 2
+    store.close()
+    
+    reopened = CareerStore(db_path)
+    ann = reopened.load("ann")
+    assert (ann.games_played, ann.games_won, ann.updated_at) == (1, 1, 10.0)
+    assert ann.splits == {("layup", "paint", "open"): [2, 1]}
+    bob = reopened.get("bob")
+    assert (bob.games_played, bob.games_won) == (1, 0)
+    assert bob.splits == {("jumper", "wing", "heavy"): [1, 1]}
+    assert reopened.get("nobody").to_dict()["fg_pct"] is None
+    reopened.close()
+
+
+def test_games_batch_into_one_row_per_player(db_path):
+    store = CareerStore(db_path)
+    observations = BATCH_SIZE.count()
+    for game in range(5):
+        store.record_game(
+            "ann", "bob",
+            _shots("ann", ("layup", "paint", "open", True)),
+            _shots("bob", ("layup", "paint", "open", game % 2 == 0)),
+            timestamp=float(game),
+        )
+    assert len(store._pending) == 2
+    assert store.flush() == 2
+    assert BATCH_SIZE.count() == observations + 1
+    assert store.flush() == 0
+    bob = store.load("bob")
+    assert (bob.games_played, bob.games_won, bob.updated_at) == (5, 0, 4.0)
+    assert bob.splits == {("layup", "paint", "open"): [5, 3]}
+    store.close()
+
+
+def test_reads_include_queued_games(db_path):
+    store = CareerStore(db_path)
+    store.record_game("ann", "bob", _shots("ann"), _shots("bob"))
+    store.flush()
+    cached = store.load("ann")
+    store.record_game("ann", "cy", _shots("ann", ("dunk", "rim", "open", True)), _shots("cy"))
+    # The cached profile is updated in place; a fresh read merges the queue
+    assert store.cached("ann") is cached
+    assert cached.games_played == 2
+    assert store.load("ann").games_played == 2
+    assert store.load("cy").games_played == 1
+    store.close()
+
+
+def test_failed_write_keeps_the_batch(db_path, monkeypatch):
+    store = CareerStore(db_path)
+    store.record_game("ann", "bob", _shots("ann"), _shots("bob"))
+    monkeypatch.setattr("app.services.career.UPSERT_SPLIT", "INSERT INTO missing VALUES (?)")
+    with pytest.raises(sqlite3.Error):
+        store.flush()
+    store.record_game("ann", "bob", _shots("ann"), _shots("bob"))
+    monkeypatch.undo()
+    assert store.flush() == 2
+    assert store.load("ann").games_won == 2
+    store.close()
+
+
+def test_listener_folds_shots_in_at_game_over(db_path):
+    store = CareerStore(db_path)
+    store.start()
+    for made in (True, False, True):
+        store.on_game_event(_shot("r1", "ann", made))
+    store.on_game_event(_shot("r1", "bob", False, zone="wing"))
+    store.on_game_event(_shot("r2", "ann", True))  # Never finishes
+    store.on_game_event(GameOver(room_id="r1", to_state="game_over", winner="ann", loser="bob", player_one_score=4, player_two_score=0))
+    store.stop()
+    assert store.load("ann").splits == {("layup", "paint", "open"): [3, 2]}
+    assert store.load("bob").splits == {("layup", "wing", "open"): [1, 0]}
+    assert store.export_room("r2") == {"ann": [["layup", "paint", "open", 1, 1]]}
+    store.close()
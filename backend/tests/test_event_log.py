@@ -0,0 +1,70 @@
+"""EventLog batching and shutdown."""
+import json
+import threading
+import time
+from typing import List
+
+import pytest
+
+from app.models.events import GameDeleted
+from app.services.event_log import EventLog, EventSink
+
+
+class ListSink(EventSink):
+    def __init__(self):
+        self.lines: List[str] = []
+        self.closed = False
+    
+    def write_batch(self, lines: List[str]) -> None:
+        assert not self.closed, "write after close"
+        self.lines.extend(lines)
+    
+    def close(self) -> None:
+        self.closed = True
+
+
+class BlockedSink(ListSink):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+    
+    def write_batch(self, lines: List[str]) -> None:
+        self.release.wait()
+
+
+def test_event_sink_is_abstract():
+    with pytest.raises(TypeError):
+        EventSink()
+
+
+def test_stop_flushes_queued_events():
+    sink = ListSink()
+    log = EventLog(sink=sink)
+    for i in range(1000):
+        log.emit(GameDeleted(room_id=f"room-{i}"))
+    log.stop()
+    assert sink.closed
+    assert [json.loads(line)["room_id"] for line in sink.lines] == [f"room-{i}" for i in range(1000)]
+
+
+def test_emit_after_stop_is_dropped():
+    sink = ListSink()
+    log = EventLog(sink=sink)
+    log.emit(GameDeleted(room_id="before"))
+    log.stop()
+    log.emit(GameDeleted(room_id="after"))
+    log.start()
+    log.stop()
+    assert len(sink.lines) == 1
+    assert log.dropped == 1
+
+
+def test_stop_does_not_hang_on_a_stuck_sink():
+    sink = BlockedSink()
+    log = EventLog(sink=sink, max_queue=4)
+    for i in range(20):
+        log.emit(GameDeleted(room_id=f"room-{i}"))
+    start = time.monotonic()
+    log.stop(timeout=0.2)
+    assert time.monotonic() - start < 2
+    sink.release.set()
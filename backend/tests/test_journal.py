@@ -0,0 +1,86 @@
+"""Journal replay, recovery and compaction."""
+import random
+
+import pytest
+
+from app.models.offense import ShotType
+from app.services.game_service import game_service
+from app.services.journal import Journal
+
+from conftest import play_turns
+
+
+@pytest.fixture
+def journal(tmp_path):
+    # Tiny segments: every flush seals the previous segment
+    journal = Journal(str(tmp_path), segment_bytes=1, fsync=False)
+    game_service.add_listener(journal.on_game_event)
+    yield journal
+    game_service.remove_listener(journal.on_game_event)
+    journal.stop()
+
+
+def _live(room_id: str) -> dict:
+    return game_service.get_game(room_id).to_dict()
+
+
+def test_replay_matches_the_live_game(journal, games):
+    room_ids = games()
+    journal.flush()
+    for room_id in room_ids:
+        assert journal.replay(room_id).to_dict() == _live(room_id)
+    recovered = {game.room_id: game.to_dict() for game in journal.recover()}
+    assert recovered == {room_id: _live(room_id) for room_id in room_ids}
+
+
+def test_replay_at_an_earlier_version(journal, games):
+    (room_id,) = games(1)
+    journal.flush()
+    version = game_service.get_game(room_id).version
+    play_turns(room_id, 2, random.Random(5))
+    journal.flush()
+    assert journal.replay(room_id, version=version).version == version
+    assert journal.replay(room_id).to_dict() == _live(room_id)
+
+
+def test_compaction_drops_deleted_rooms(journal, games, tmp_path):
+    kept, deleted = games(2)
+    journal.flush()
+    game_service.delete_game(deleted)
+    journal.flush()
+    play_turns(kept, 1, random.Random(3))
+    journal.flush()  # Seals the segment with the deletion
+    
+    assert journal.compact() > 0
+    assert not journal.has_records(deleted)
+    assert journal.replay(kept).to_dict() == _live(kept)
+    
+    reopened = Journal(str(tmp_path), fsync=False)
+    assert [game.room_id for game in reopened.recover()] == [kept]
+
+
+def test_room_handed_back_survives_compaction(journal, games, tmp_path):
+    (room_id,) = games(1)
+    journal.flush()
+    game = game_service.get_game(room_id)
+    game_service.hand_off_game(room_id)
+    journal.flush()
+    
+    # The room comes back, e.g. after a remove-then-add of a worker
+    game_service.restore_game(game)
+    journal.checkpoint(game)
+    play_turns(room_id, 3, random.Random(9))
+    journal.flush()
+    game_service.select_shot(room_id, ShotType.LAYUP)
+    journal.flush()  # Seals the segment above
+    
+    assert journal.compact() > 0
+    assert journal.has_records(room_id)
+    assert journal.replay(room_id).to_dict() == _live(room_id)
+    assert [game.to_dict() for game in journal.recover()] == [_live(room_id)]
+    
+    # A second compaction has nothing left to drop
+    journal.flush()
+    assert journal.compact() == 0
+    reopened = Journal(str(tmp_path), fsync=False)
+    assert [game.to_dict() for game in reopened.recover()] == [_live(room_id)]
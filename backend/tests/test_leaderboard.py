@@ -0,0 +1,86 @@
+"""Leaderboard ratings and the ranked skip list behind them."""
+import bisect
+import random
+
+import pytest
+
+from app.services.leaderboard import INITIAL_RATING, Leaderboard, RankedSkipList
+
+
+def test_skip_list_matches_sorted_reference():
+    rng = random.Random(5)
+    ranking = RankedSkipList()
+    reference = []
+    for step in range(3000):
+        if reference and rng.random() < 0.4:
+            key = reference.pop(rng.randrange(len(reference)))
+            ranking.remove(key)
+        else:
+            key = (-rng.uniform(1000, 2000), f"p{step}")
+            ranking.insert(key)
+            bisect.insort(reference, key)
+        if step % 100 == 0:
+            assert list(ranking) == reference
+            for index in rng.sample(range(len(reference)), min(10, len(reference))):
+                assert ranking.rank(reference[index]) == index
+                assert next(ranking.iter_from(index)) == reference[index]
+    assert len(ranking) == len(reference)
+    assert list(ranking) == reference
+
+
+def test_skip_list_bulk_build_and_missing_keys():
+    keys = sorted((-float(rating), f"p{rating}") for rating in range(500))
+    ranking = RankedSkipList(keys)
+    assert list(ranking) == keys
+    assert [ranking.rank(key) for key in keys[::37]] == list(range(0, 500, 37))
+    assert list(ranking.iter_from(498)) == keys[498:]
+    assert list(ranking.iter_from(500)) == []
+    with pytest.raises(KeyError):
+        ranking.rank((0.5, "nobody"))
+    with pytest.raises(KeyError):
+        ranking.remove((0.5, "nobody"))
+
+
+def _play(board: Leaderboard, count: int, seed: int = 3) -> None:
+    rng = random.Random(seed)
+    names = [f"player{i}" for i in range(40)]
+    for game in range(count):
+        winner, loser = rng.sample(names, 2)
+        board.record_result(winner, loser, timestamp=float(game))
+
+
+def test_ranks_follow_ratings():
+    board = Leaderboard()
+    _play(board, 400)
+    players = sorted(board._players.values(), key=lambda player: (-player.rating, player.name))
+    assert [entry["name"] for entry in board.top(limit=len(players))] == [player.name for player in players]
+    for rank, player in enumerate(players, 1):
+        assert board.rank_of(player.name) == rank
+    assert sum(player.wins for player in players) == sum(player.losses for player in players) == 400
+    assert sum(player.rating for player in players) == pytest.approx(INITIAL_RATING * len(players))
+    assert [entry["rank"] for entry in board.top(limit=3, offset=10)] == [11, 12, 13]
+
+
+def test_around_and_unknown_players():
+    board = Leaderboard()
+    _play(board, 200)
+    name = board.top(limit=1, offset=20)[0]["name"]
+    assert [entry["rank"] for entry in board.around(name, radius=2)] == [19, 20, 21, 22, 23]
+    top = board.top(limit=1)[0]["name"]
+    assert [entry["rank"] for entry in board.around(top, radius=2)] == [1, 2, 3]
+    assert board.rank_of("nobody") is None
+    assert board.around("nobody") is None
+    board.record_result("solo", "solo")
+    assert board.rank_of("solo") is None
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "leaderboard.json")
+    board = Leaderboard(path)
+    _play(board, 300)
+    assert board.save() == len(board)
+    restored = Leaderboard(path)
+    assert restored.top(limit=len(board)) == board.top(limit=len(board))
+    _play(restored, 50, seed=9)
+    _play(board, 50, seed=9)
+    assert restored.top(limit=len(board)) == board.top(limit=len(board))
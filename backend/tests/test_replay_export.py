@@ -0,0 +1,92 @@
+"""Replay export encodings."""
+import json
+import math
+import struct
+
+import pytest
+
+from app.services.game_service import game_service
+from app.services.journal import Journal
+from app.services.replay_export import (
+    _FILE_HEADER,
+    _RECORD_HEADER,
+    _SHOT_RESOLVED,
+    FORMAT_VERSION,
+    KINDS,
+    MAGIC,
+    encode_binary,
+    iter_replay,
+)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = Journal(str(tmp_path), fsync=False)
+    game_service.add_listener(journal.on_game_event)
+    yield journal
+    game_service.remove_listener(journal.on_game_event)
+    journal.stop()
+
+
+def _binary_records(data: bytes):
+    magic, version, length = _FILE_HEADER.unpack_from(data)
+    assert (magic, version) == (MAGIC, FORMAT_VERSION)
+    offset = _FILE_HEADER.size + length
+    records = []
+    while offset < len(data):
+        size, kind, seq, timestamp, state = _RECORD_HEADER.unpack_from(data, offset)
+        payload = data[offset + _RECORD_HEADER.size:offset + 2 + size]
+        records.append((KINDS[kind], seq, timestamp, payload))
+        offset += 2 + size
+    assert offset == len(data)
+    return records
+
+
+def test_binary_and_ndjson_cover_every_record(journal, games):
+    (room_id,) = games(1)
+    journal.flush()
+    expected = list(journal.records(room_id))
+    
+    lines = b"".join(iter_replay(journal, room_id, "ndjson")).splitlines()
+    assert [json.loads(line)["seq"] for line in lines] == list(range(len(expected)))
+    
+    records = _binary_records(b"".join(iter_replay(journal, room_id, "binary")))
+    assert [(kind, seq, timestamp) for kind, seq, timestamp, _ in records] == [
+        (record["event"], seq, record["timestamp"]) for seq, record in enumerate(expected)
+    ]
+    
+    tail = _binary_records(b"".join(iter_replay(journal, room_id, "binary", offset=2, limit=3)))
+    assert [seq for _, seq, _, _ in tail] == [2, 3, 4]
+
+
+@pytest.mark.parametrize("power", [-5, 0, 100, 40000])
+def test_shot_resolved_power_round_trips(power):
+    record = {
+        "event": "shot_resolved", "timestamp": 1.5, "to_state": "animating", "player": "a",
+        "power": power, "timing_grade": None, "timing_error": None, "archetype": "rim",
+        "contest_level": "open", "make_probability": 0.5, "made": True,
+    }
+    encoded = encode_binary(7, record)
+    decoded = _SHOT_RESOLVED.unpack_from(encoded, _RECORD_HEADER.size)
+    assert decoded[0] == power
+    assert math.isnan(decoded[1])
+
+
+def test_long_names_are_clipped_to_fit():
+    long_name = "é" * 40000  # 80000 bytes: more than a u16 length holds
+    record = {
+        "event": "game_created", "timestamp": 1.0, "to_state": "waiting_for_shot",
+        "player_one": long_name, "player_two": "b",
+    }
+    encoded = encode_binary(1, record)
+    payload = encoded[_RECORD_HEADER.size:]
+    (length,) = struct.unpack_from("<H", payload)
+    assert 0 < length <= 1024
+    assert payload[2:2 + length].decode() == "é" * (length // 2)
+    assert payload[2 + length:] == b"\x01\x00b"
+    
+    # Names the API accepts go through whole
+    name = "\U0001F3C0" * 50
+    record.update(player_one=name)
+    payload = encode_binary(1, record)[_RECORD_HEADER.size:]
+    assert payload[2:202].decode() == name
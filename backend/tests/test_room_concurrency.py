@@ -0,0 +1,87 @@
+"""Per-room locks and the idempotency cache."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.game import apply_action
+from app.models.events import GameDeleted
+from app.services.game_service import game_service
+from app.services.room_concurrency import (
+    IdempotencyCache,
+    IdempotencyKeyConflict,
+    RoomLocks,
+    idempotency_cache,
+)
+
+
+def test_room_lock_serializes_a_room_and_is_dropped_when_idle():
+    locks = RoomLocks()
+    order = []
+    
+    async def action(room_id: str, name: str, delay: float):
+        async with locks.hold(room_id):
+            order.append(f"{name} start")
+            await asyncio.sleep(delay)
+            order.append(f"{name} end")
+    
+    async def run():
+        await asyncio.gather(action("a", "first", 0.05), action("a", "second", 0), action("b", "other", 0))
+    
+    asyncio.run(run())
+    # Same room one at a time; another room doesn't wait
+    assert order.index("first end") < order.index("second start")
+    assert order.index("other end") < order.index("first end")
+    assert not locks._locks
+
+
+def test_idempotency_cache_replays_and_rejects_conflicts():
+    cache = IdempotencyCache()
+    assert cache.get("room", "select_shot", "k1") is None
+    cache.put("room", "select_shot", "k1", {"message": "Shot selected"})
+    assert cache.get("room", "select_shot", "k1") == {"message": "Shot selected"}
+    assert cache.get("other-room", "select_shot", "k1") is None
+    with pytest.raises(IdempotencyKeyConflict):
+        cache.get("room", "select_power", "k1")
+
+
+def test_idempotency_cache_evicts_oldest_and_round_trips():
+    cache = IdempotencyCache()
+    for i in range(IdempotencyCache.MAX_KEYS_PER_ROOM + 1):
+        cache.put("room", "next_turn", f"k{i}", i)
+    assert cache.get("room", "next_turn", "k0") is None
+    assert cache.get("room", "next_turn", "k1") == 1
+    
+    restored = IdempotencyCache()
+    restored.load("room", cache.export("room"))
+    assert restored.export("room") == cache.export("room")
+    
+    restored.on_game_event(GameDeleted(room_id="room"))
+    assert restored.export("room") == []
+
+
+def test_retried_action_is_not_applied_twice():
+    room_id = game_service.create_game("a", "b")
+    applied = []
+    
+    def mutate() -> bool:
+        applied.append(1)
+        return True
+    
+    async def send(key: str):
+        return await apply_action(room_id, "next_turn", key, mutate, error="Invalid state", message="ok", span="test")
+    
+    async def run():
+        first = await send("retry-me")
+        retried = await send("retry-me")
+        assert retried is first
+        with pytest.raises(HTTPException) as conflict:
+            await apply_action(room_id, "select_power", "retry-me", mutate, error="x", message="y", span="test")
+        assert conflict.value.status_code == 422
+    
+    try:
+        asyncio.run(run())
+        assert len(applied) == 1
+    finally:
+        game_service.delete_game(room_id)
+        idempotency_cache.on_game_event(GameDeleted(room_id=room_id))
@@ -0,0 +1,82 @@
+"""Handing a room to another worker is not a deletion."""
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.events import GameDeleted, GameOver, RoomHandedOff, ShotResolved
+from app.services.career import CareerStore, get_career_store
+from app.services.game_service import game_service
+
+
+def _shot(room_id: str, player: str, made: bool) -> ShotResolved:
+    return ShotResolved(
+        room_id=room_id, to_state="animating", player=player, power=50,
+        archetype="rim", subtype="layup", zone="paint", contest_level="open",
+        points=2, make_probability=0.6, made=made,
+    )
+
+
+def _game_over(room_id: str) -> GameOver:
+    return GameOver(
+        room_id=room_id, to_state="game_over", winner="a", loser="b",
+        player_one_score=11, player_two_score=4,
+    )
+
+
+def test_hand_off_emits_room_handed_off():
+    events = []
+    game_service.add_listener(events.append)
+    try:
+        room_id = game_service.create_game("a", "b")
+        assert game_service.hand_off_game(room_id)
+        assert room_id not in game_service.games
+        assert not game_service.hand_off_game(room_id)
+    finally:
+        game_service.remove_listener(events.append)
+    assert isinstance(events[-1], RoomHandedOff)
+    assert not any(isinstance(event, GameDeleted) for event in events)
+
+
+def test_career_tallies_move_with_the_room():
+    source, target = CareerStore(), CareerStore()
+    source.on_game_event(_shot("room", "a", True))
+    source.on_game_event(_shot("room", "b", False))
+    exported = source.export_room("room")
+    source.on_game_event(RoomHandedOff(room_id="room"))
+    assert source.export_room("room") == {}
+    
+    target.load_room("room", exported)
+    target.on_game_event(_shot("room", "a", False))
+    target.on_game_event(_game_over("room"))
+    target.flush()
+    
+    winner = target.get("a")
+    assert (winner.games_played, winner.games_won) == (1, 1)
+    assert winner.splits == {("rim", "paint", "open"): [2, 1]}
+    assert target.get("b").splits == {("rim", "paint", "open"): [1, 0]}
+    source.close()
+    target.close()
+
+
+def test_handoff_endpoints_carry_career_tallies(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    store = get_career_store()
+    game_service.add_listener(store.on_game_event)
+    try:
+        room_id = game_service.create_game("a", "b")
+        store.on_game_event(_shot(room_id, "a", True))
+        client = TestClient(app)
+        
+        response = client.post(f"/admin/shard/rooms/{room_id}/handoff", headers=headers)
+        assert response.status_code == 200
+        handoff = response.json()
+        assert handoff["career"] == {"a": [["rim", "paint", "open", 1, 1]]}
+        assert store.export_room(room_id) == {}
+        
+        response = client.post("/admin/shard/rooms", json=handoff, headers=headers)
+        assert response.status_code == 200
+        assert room_id in game_service.games
+        assert store.export_room(room_id) == handoff["career"]
+    finally:
+        game_service.remove_listener(store.on_game_event)
+        game_service.delete_game(room_id)
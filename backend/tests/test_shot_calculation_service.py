@@ -0,0 +1,56 @@
+"""The batch shot API must match the scalar legacy path exactly."""
+import random
+
+import pytest
+
+from app.models.defense import DefenseType
+from app.models.offense import ShotType
+from app.models.player import Player
+from app.services.shot_calculation_service import ShotCalculationService
+
+
+def _shots(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    shot_types = [rng.choice(list(ShotType)) for _ in range(count)]
+    # Includes out-of-range powers, which always miss
+    powers = [rng.randint(0, 100) for _ in range(count)]
+    defense_types = [rng.choice(list(DefenseType)) for _ in range(count)]
+    return shot_types, powers, defense_types
+
+
+def test_make_percentages_match_scalar():
+    shot_types, powers, defense_types = _shots(2000)
+    batch = ShotCalculationService.calculate_make_percentages(shot_types, powers, defense_types)
+    scalar = [
+        ShotCalculationService.calculate_make_percentage(shot_type, power, defense_type)
+        for shot_type, power, defense_type in zip(shot_types, powers, defense_types)
+    ]
+    assert batch == scalar
+
+
+def test_shot_results_match_scalar_with_seeded_rng():
+    shot_types, powers, defense_types = _shots(2000)
+    
+    random.seed(1234)
+    scalar_player = Player(name="scalar")
+    scalar = [
+        ShotCalculationService.determine_shot_result(shot_type, power, defense_type, scalar_player)
+        for shot_type, power, defense_type in zip(shot_types, powers, defense_types)
+    ]
+    
+    batch_player = Player(name="batch")
+    percentages, outcomes = ShotCalculationService.determine_shot_results(
+        shot_types, powers, defense_types,
+        players=[batch_player] * len(shot_types),
+        rng=random.Random(1234),
+    )
+    
+    assert outcomes == scalar
+    assert any(outcomes) and not all(outcomes)
+    assert batch_player.score == scalar_player.score
+    assert percentages == ShotCalculationService.calculate_make_percentages(shot_types, powers, defense_types)
+
+
+def test_mismatched_lengths_rejected():
+    with pytest.raises(ValueError):
+        ShotCalculationService.calculate_make_percentages([ShotType.LAYUP], [50, 60], [DefenseType.CONTEST])
@@ -0,0 +1,98 @@
+"""Binary room snapshots and the shutdown path that writes them."""
+import json
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.services.career import get_career_store
+from app.services.event_log import EventLog, EventSink
+from app.services.game_service import game_service
+from app.services.snapshot import SnapshotError, read_snapshot, write_snapshot
+
+
+def test_snapshot_round_trip(games, tmp_path):
+    room_ids = games()
+    originals = [game_service.get_game(room_id) for room_id in room_ids]
+    path = str(tmp_path / "rooms.snap")
+    
+    assert write_snapshot(path, originals, {"bots": []}) == len(originals)
+    restored, extras = read_snapshot(path)
+    
+    assert extras == {"bots": []}
+    assert [game.to_dict() for game in restored] == [game.to_dict() for game in originals]
+    assert [game.version for game in restored] == [game.version for game in originals]
+
+
+def test_corrupt_snapshot_is_rejected(games, tmp_path):
+    path = tmp_path / "rooms.snap"
+    write_snapshot(str(path), [game_service.get_game(room_id) for room_id in games(2)])
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError):
+        read_snapshot(str(path))
+
+
+def test_power_out_of_range_is_rejected():
+    room_id = game_service.create_game("a", "b")
+    try:
+        client = TestClient(main.app)
+        client.post(f"/api/game/{room_id}/shot", json={"shot_type": "layup"})
+        client.post(f"/api/game/{room_id}/defense", json={"defense_type": "contest"})
+        for power in (40000, -1):
+            assert client.post(f"/api/game/{room_id}/power", json={"power": power}).status_code == 422
+        assert client.post(f"/api/game/{room_id}/power", json={"power": 100}).status_code == 200
+    finally:
+        game_service.delete_game(room_id)
+
+
+def test_long_player_names_are_rejected():
+    client = TestClient(main.app)
+    name = "\U0001F3C0" * 51
+    assert client.post("/api/game/create", json={"player_one_name": name}).status_code == 422
+    assert client.post("/api/game/create-bot", json={"bot_name": name}).status_code == 422
+
+
+def test_longest_names_round_trip(tmp_path):
+    # 50 four-byte characters: the most a name can take in UTF-8
+    name = "\U0001F3C0" * 50
+    room_id = game_service.create_game(name, name[:-1] + "!")
+    try:
+        path = str(tmp_path / "rooms.snap")
+        write_snapshot(path, [game_service.get_game(room_id)])
+        restored, _ = read_snapshot(path)
+        assert [restored[0].player_one.name, restored[0].player_two.name] == [name, name[:-1] + "!"]
+    finally:
+        game_service.delete_game(room_id)
+
+
+class ListSink(EventSink):
+    def __init__(self):
+        self.lines: List[str] = []
+    
+    def write_batch(self, lines: List[str]) -> None:
+        self.lines.extend(lines)
+
+
+def test_failed_snapshot_does_not_skip_shutdown(monkeypatch, tmp_path):
+    sink = ListSink()
+    monkeypatch.setattr(main, "get_event_log", lambda: EventLog(sink=sink))
+    monkeypatch.setenv("SNAPSHOT_PATH", str(tmp_path / "rooms.snap"))
+    
+    def broken_save(path: str) -> int:
+        raise OverflowError("signed short integer is greater than maximum")
+    
+    monkeypatch.setattr(main, "save_rooms", broken_save)
+    closed = []
+    monkeypatch.setattr(get_career_store(), "close", lambda: closed.append("career"))
+    
+    with TestClient(main.app):
+        pass
+    
+    assert closed == ["career"]
+    errors = [json.loads(line) for line in sink.lines]
+    assert [(error["event"], error["service"], error["error_type"]) for error in errors] == [
+        ("service_error", "snapshot", "OverflowError"),
+    ]
@@ -0,0 +1,61 @@
+"""Spectator fan-out: ticks, coalescing and dropping stuck sockets."""
+import asyncio
+
+from app.websocket import fanout
+from app.websocket.spectators import SpectatorHub
+
+
+class FakeSocket:
+    def __init__(self, stuck: bool = False):
+        self.stuck = stuck
+        self.frames = []
+        self.closed = None
+    
+    async def send_text(self, frame: str) -> None:
+        if self.stuck:
+            # A peer that stopped reading: the send buffer never drains
+            await asyncio.Event().wait()
+        self.frames.append(frame)
+    
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.closed = code
+
+
+def test_tick_sends_newest_frame_once():
+    async def scenario():
+        hub = SpectatorHub(shards=2)
+        sockets = [FakeSocket() for _ in range(3)]
+        for socket in sockets:
+            hub.add(socket, "r1", frame="v0")
+        hub.offer("r1", "v1")
+        hub.offer("r1", "v2")
+        hub.offer("r2", "nobody watching")
+        assert hub.tick() == 1
+        assert sum([await shard.deliver() for shard in hub.shards]) == 3
+        assert [socket.frames for socket in sockets] == [["v2"]] * 3
+        assert hub.tick() == 0
+    
+    asyncio.run(scenario())
+
+
+def test_stuck_socket_is_dropped(monkeypatch):
+    monkeypatch.setattr(fanout, "SEND_TIMEOUT", 0.05)
+    
+    async def scenario():
+        hub = SpectatorHub(shards=1)
+        stuck, healthy = FakeSocket(stuck=True), FakeSocket()
+        hub.add(stuck, "r1")
+        hub.add(healthy, "r1")
+        hub.offer("r1", "v1")
+        hub.tick()
+        await asyncio.wait_for(hub.shards[0].deliver(), 1.0)
+        assert healthy.frames == ["v1"]
+        assert len(hub) == 1
+        await asyncio.sleep(0)
+        assert stuck.closed == 1008
+        hub.offer("r1", "v2")
+        hub.tick()
+        await hub.shards[0].deliver()
+        assert healthy.frames == ["v1", "v2"]
+    
+    asyncio.run(scenario())
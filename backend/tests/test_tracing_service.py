@@ -0,0 +1,80 @@
+"""Turn tracing: request spans, broadcasts and lock wait."""
+import asyncio
+
+from app.api.game import apply_action
+from app.models.events import GameCreated, TurnAdvanced
+from app.services.game_service import game_service
+from app.services.room_concurrency import room_locks
+from app.services.tracing_service import TracingService, tracer
+
+
+def _new_turn(service: TracingService, room_id: str, event=GameCreated, **fields) -> None:
+    service.on_game_event(event(room_id=room_id, to_state="waiting_for_shot", **fields))
+
+
+def test_concurrent_requests_keep_their_own_turn():
+    service = TracingService()
+    _new_turn(service, "room", player_one="a", player_two="b")
+    first_turn = service.get_turns("room")[0]
+    
+    async def run():
+        first_entered, first_done = asyncio.Event(), asyncio.Event()
+        
+        async def first():
+            with service.request_span("room", "first"):
+                first_entered.set()
+                await asyncio.sleep(0)
+            first_done.set()
+        
+        async def second():
+            await first_entered.wait()
+            with service.request_span("room", "second"):
+                # The room moves on and the other request finishes meanwhile
+                _new_turn(service, "room", event=TurnAdvanced, offensive_player="b")
+                await first_done.wait()
+                service.record_broadcast("room", 1.0, 2.0, recipients=2)
+        
+        await asyncio.gather(first(), second())
+    
+    asyncio.run(run())
+    assert [span.name for span in first_turn.spans if span.category != "state"] == [
+        "server:first", "broadcast", "server:second",
+    ]
+    assert not [span for span in service.get_turns("room")[1].spans if span.category != "state"]
+
+
+def test_broadcast_outside_a_request_goes_to_current_turn():
+    service = TracingService()
+    _new_turn(service, "room", player_one="a", player_two="b")
+    service.record_broadcast("room", 1.0, 2.0, recipients=1)
+    assert [span.category for span in service.get_turns("room")[0].spans] == ["state", "broadcast"]
+
+
+def test_lock_wait_is_not_server_time():
+    game_service.add_listener(tracer.on_game_event)
+    room_id = game_service.create_game("a", "b")
+    try:
+        async def run():
+            holding = asyncio.Event()
+            
+            async def other_request():
+                async with room_locks.hold(room_id):
+                    holding.set()
+                    await asyncio.sleep(0.2)
+            
+            other = asyncio.create_task(other_request())
+            await holding.wait()
+            await apply_action(
+                room_id, "next_turn", None, lambda: True,
+                error="Invalid state", message="ok", span="test",
+            )
+            await other
+        
+        asyncio.run(run())
+        spans = {span.name: span for span in tracer.get_turns(room_id)[-1].spans}
+        assert spans["lock_wait"].duration >= 0.15
+        assert spans["server:test"].start >= spans["lock_wait"].end
+        assert spans["server:test"].duration < 0.15
+    finally:
+        game_service.remove_listener(tracer.on_game_event)
+        game_service.delete_game(room_id)
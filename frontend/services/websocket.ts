@@ -9,15 +9,24 @@ export class WebSocketClient {
   private maxReconnectAttempts: number = 5
   private reconnectTimeout: NodeJS.Timeout | null = null
   private shouldReconnect: boolean = true
+  // seq of the last game_state received; sent on reconnect so the server
+  // replays only the updates missed while disconnected
+  private lastSeq: number | null = null
+  // Spectators get a read-only socket updated at the server's tick rate
+  private spectate: boolean
 
-  constructor(roomId: string) {
+  constructor(roomId: string, spectate: boolean = false) {
     this.roomId = roomId
+    this.spectate = spectate
   }
 
   connect(): Promise<void> {
     return new Promise((resolve, reject) => {
       const wsUrl = process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000'
-      this.ws = new WebSocket(`${wsUrl}/ws/game/${this.roomId}`)
+      const path = this.spectate
+        ? `/ws/game/${this.roomId}/spectate`
+        : `/ws/game/${this.roomId}${this.lastSeq !== null ? `?last_seq=${this.lastSeq}` : ''}`
+      this.ws = new WebSocket(`${wsUrl}${path}`)
 
       let resolved = false
       const timeout = setTimeout(() => {
@@ -38,8 +47,22 @@ export class WebSocketClient {
       this.ws.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data)
-          if (data.type === 'game_state' && this.onMessageCallback) {
-            this.onMessageCallback(data.data)
+          if (data.type === 'ping') {
+            // Server heartbeat: sockets that don't answer get closed
+            this.send({ type: 'pong', t: data.t })
+            return
+          }
+          if (data.type === 'game_state') {
+            // Replayed frames can interleave with live ones; keep only newer states
+            if (typeof data.seq === 'number') {
+              if (this.lastSeq !== null && data.seq <= this.lastSeq) {
+                return
+              }
+              this.lastSeq = data.seq
+            }
+            if (this.onMessageCallback) {
+              this.onMessageCallback(data.data)
+            }
           }
         } catch (error) {
           console.error('Error parsing WebSocket message:', error)